@@ -1,13 +1,18 @@
 import streamlit as st
 
+from nourishwell.debug_panel import begin_rerun_trace, end_rerun_trace
+from nourishwell.tracing import section
+
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
     page_title="NourishWell: Home",
     layout="centered", # Centered layout for a minimalist home page
     initial_sidebar_state="collapsed" # Sidebar not needed on home
 )
+rerun_trace = begin_rerun_trace("Home") # no-op unless ?debug=1 / ?profile=<token> or their env flags are set
 
 # --- CUSTOM CSS FOR MODERN UI (Repeated for consistency across pages) ---
+section('css')
 st.markdown("""
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
@@ -159,6 +164,7 @@ st.markdown("""
 
 
 # --- HOME PAGE CONTENT ---
+section('content')
 st.markdown("""
 <div class="home-container">
     <h1 class="home-headline">NourishWell: Your Guide to Anti-Inflammatory Eating 🌿</h1>
@@ -195,3 +201,5 @@ st.markdown("""
     </div>
 </div>
 """, unsafe_allow_html=True)
+
+end_rerun_trace(rerun_trace)
@@ -0,0 +1 @@
+# Performance benchmarks; run from the repository root, e.g. python -m benchmarks.scaling
@@ -0,0 +1,356 @@
+"""Concurrent-session load test: rerun latency, throughput and memory as sessions pile up.
+
+Each concurrency level runs in a fresh subprocess that plays the part of one Streamlit server: N
+simulated users (threads) each drive their own session through Streamlit's AppTest, over and over,
+for --duration seconds. A session opens Food Discovery, filters by category and score, searches,
+adds a few foods, opens the Meal Plan page and generates an AI plan. The plan comes from the local
+stub Gemini endpoint (nourishwell/stub_server.py), run as a separate process with the configured
+latency, so the LLM round trip occupies the job pool the way the real API would.
+
+    python -m benchmarks.load_test --concurrency 1,4,16 --duration 30
+    python -m benchmarks.load_test --concurrency 8 --llm-latency 2 --chunk-delay 0.1 --size 10000 --out .cache/bench/load.json
+
+Reported per level: p50/p95/p99/max rerun latency (overall and per step), time from clicking
+Generate to the finished plan, reruns and sessions per second, errors, and the peak RSS of the
+server process. Rerun latency is the page's own rerun trace (nourishwell/tracing.py): from the start
+of the script to the end of the render, so it leaves out the Meal Plan page's deliberate wait before
+its next job-status poll. Every trace is also written to <data-dir>/load_traces_<users>.jsonl for a
+per-section breakdown.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.scaling import REPO_ROOT, dataset_path, run_metadata
+
+DISCOVERY_PAGE = REPO_ROOT / 'pages' / '1_Food_Discovery.py'
+MEAL_PLAN_PAGE = REPO_ROOT / 'pages' / '2_Meal_Plan.py'
+SEARCH_TERMS = ('salmon', 'omega', 'magnesium', 'vitamin d', 'pcos', 'turmric', 'iron', 'fiber', 'seeds')
+PERCENTILES = (50, 95, 99)
+POLL_STEP = 'plan_poll'
+PLAN_TIMEOUT = 120  # seconds a session waits for its plan before counting it as an error
+
+
+def share_apptest_runtime():
+    # AppTest assumes one test at a time. It installs a mock Runtime for each run and clears it
+    # afterwards, which pulls it out from under any other session that is mid-run: install one
+    # for the whole process instead, and give AppTest a subclass to assign its per-run mock to.
+    # It also resets Streamlit's single, process-wide page list before each run, so concurrent
+    # sessions on different pages could run each other's script: keep one list per main script.
+    # And it compiles the page on every run, which races in CPython 3.11 ("AST constructor
+    # recursion depth mismatch"): share one script cache, as the real server does.
+    from unittest.mock import MagicMock
+
+    from streamlit import source_util
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    app_test.Runtime = type('PerRunRuntime', (Runtime,), {})
+
+    build_pages = source_util.get_pages
+    pages_by_script = {}
+
+    def get_pages(main_script_path):
+        with source_util._pages_cache_lock:  # an RLock; AppTest swaps the cached list under it too
+            if main_script_path not in pages_by_script:
+                source_util._cached_pages = None
+                pages_by_script[main_script_path] = build_pages(main_script_path)
+            return pages_by_script[main_script_path]
+
+    source_util.get_pages = get_pages
+
+    script_cache = ScriptCache()
+    local_script_runner.ScriptCache = lambda: script_cache
+
+
+def last_trace(at):
+    from nourishwell.debug_panel import HISTORY_KEY
+
+    return at.session_state[HISTORY_KEY][-1] if HISTORY_KEY in at.session_state else None
+
+
+class SessionRecorder:
+    # Rerun timings of every simulated session in this process: (step, seconds) pairs
+
+    def __init__(self):
+        self.samples = []
+        self.plan_times = []
+        self.sessions = 0
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def rerun(self, at, step, action=None):
+        previous = last_trace(at)
+        if action is not None:
+            action()
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"{step}: {at.exception[0].value}")
+        trace = last_trace(at)
+        if trace is None or trace is previous:
+            raise RuntimeError(f"{step}: the page stopped before it finished rendering")
+        with self._lock:
+            self.samples.append((step, trace.total_ms / 1000))
+
+    def plan_ready(self, seconds):
+        with self._lock:
+            self.plan_times.append(seconds)
+
+    def session_done(self):
+        with self._lock:
+            self.sessions += 1
+
+    def error(self, message):
+        with self._lock:
+            self.errors.append(message)
+
+
+def pause(rng, think_time):
+    if think_time:
+        time.sleep(rng.uniform(0, think_time))
+
+
+def run_session(recorder, rng, foods_per_plan, think_time):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(DISCOVERY_PAGE), default_timeout=PLAN_TIMEOUT)
+    recorder.rerun(at, 'open_discovery')
+    pause(rng, think_time)
+
+    categories = at.selectbox(key='discovery_category_filter').options
+    recorder.rerun(at, 'filter_category', lambda: at.selectbox(key='discovery_category_filter').select_index(
+        rng.randrange(len(categories))))
+    pause(rng, think_time)
+    recorder.rerun(at, 'filter_min_score', lambda: at.slider(key='discovery_min_score').set_value(rng.randint(0, 7)))
+    pause(rng, think_time)
+    recorder.rerun(at, 'search', lambda: at.text_input(key='discovery_search_term').input(rng.choice(SEARCH_TERMS)))
+    pause(rng, think_time)
+
+    if len(add_buttons(at)) < foods_per_plan:
+        recorder.rerun(at, 'reset_filters', lambda: at.button(key='discovery_reset_filters').click())
+        pause(rng, think_time)
+    for button in rng.sample(add_buttons(at), min(foods_per_plan, len(add_buttons(at)))):
+        recorder.rerun(at, 'add_food', lambda: at.button(key=button.key).click())
+        pause(rng, think_time)
+
+    # Switching pages keeps the session state, so the plan carries over
+    plan = AppTest.from_file(str(MEAL_PLAN_PAGE), default_timeout=PLAN_TIMEOUT)
+    plan.session_state['selected_foods_for_plan'] = dict(at.session_state['selected_foods_for_plan'])
+    recorder.rerun(plan, 'open_plan')
+    pause(rng, think_time)
+
+    generate = next(button for button in plan.button if button.label.startswith('Generate'))
+    started = time.perf_counter()
+    recorder.rerun(plan, 'generate_click', generate.click)
+    # The page polls the background job with short reruns until the plan is written
+    while not plan.session_state['generated_meal_plan_llm']:
+        if time.perf_counter() - started > PLAN_TIMEOUT:
+            raise TimeoutError(f"no plan after {PLAN_TIMEOUT}s")
+        recorder.rerun(plan, POLL_STEP)
+    recorder.plan_ready(time.perf_counter() - started)
+    if plan.session_state['generated_meal_plan_llm'].startswith('Error'):
+        raise RuntimeError(plan.session_state['generated_meal_plan_llm'][:200])
+    recorder.session_done()
+
+
+def add_buttons(at):
+    return [button for button in at.button if button.label == 'Add to Plan']
+
+
+def simulated_user(recorder, seed, deadline, foods_per_plan, think_time):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        try:
+            run_session(recorder, rng, foods_per_plan, think_time)
+        except Exception as e:  # one failed session shouldn't stop the user, but it is reported
+            recorder.error(f"{type(e).__name__}: {e}")
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    stats = {f'p{p}_ms': round(float(np.percentile(values, p)) * 1000, 2) for p in PERCENTILES}
+    stats['max_ms'] = round(max(values) * 1000, 2)
+    stats['count'] = len(values)
+    return stats
+
+
+def load_worker(users, duration, seed, foods_per_plan, think_time):
+    # Runs inside a subprocess with LLM_API_BASE pointing at the stub
+    import streamlit as st
+    from streamlit.runtime.secrets import Secrets
+
+    from nourishwell.data import get_catalog
+
+    st.page_link = lambda *args, **kwargs: None  # AppTest runs a page as the main script, so page links cannot resolve
+    st.rerun = lambda *args, **kwargs: None  # the harness does the Meal Plan page's polling reruns itself
+    st.secrets = Secrets([])
+    st.secrets._secrets = {'GOOGLE_API_KEY': 'load-test'}  # any key will do for the stub
+    share_apptest_runtime()
+    get_catalog()  # the server process loads it once, before the first user arrives
+    baseline_rss = peak_rss_mb()
+
+    recorder = SessionRecorder()
+    started = time.perf_counter()
+    deadline = started + duration
+    threads = [
+        threading.Thread(target=simulated_user, args=(recorder, seed * 1000 + user, deadline, foods_per_plan, think_time), daemon=True)
+        for user in range(users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started  # includes finishing the sessions still running at the deadline
+
+    reruns = [seconds for _, seconds in recorder.samples]
+    steps = sorted({step for step, _ in recorder.samples})
+    return {
+        'users': users,
+        'elapsed_s': round(elapsed, 2),
+        'sessions': recorder.sessions,
+        'sessions_per_s': round(recorder.sessions / elapsed, 3),
+        'reruns': len(reruns),
+        'reruns_per_s': round(len(reruns) / elapsed, 2),
+        'polls': sum(step == POLL_STEP for step, _ in recorder.samples),
+        'rerun_latency': percentiles(reruns),
+        'steps': {step: percentiles([seconds for name, seconds in recorder.samples if name == step]) for step in steps},
+        'time_to_plan': percentiles(recorder.plan_times),
+        'errors': len(recorder.errors),
+        'error_samples': recorder.errors[:5],
+        'rss_before_users_mb': round(baseline_rss, 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_stub(latency, chunk_delay, fail_rate):
+    port = free_port()
+    stub = subprocess.Popen(
+        [sys.executable, '-m', 'nourishwell.stub_server', '--port', str(port), '--latency', str(latency),
+         '--chunk-delay', str(chunk_delay), '--fail-rate', str(fail_rate)],
+        cwd=REPO_ROOT, env=dict(os.environ, PYTHONPATH=str(REPO_ROOT)), stdout=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return stub, f"http://127.0.0.1:{port}/v1beta"
+        except OSError:
+            time.sleep(0.05)
+    stub.kill()
+    raise RuntimeError("the stub LLM server did not start")
+
+
+def run_level(args, users, catalog_path, stub_url, work_dir):
+    trace_log = Path(args.data_dir) / f'load_traces_{users}.jsonl'
+    trace_log.unlink(missing_ok=True)
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(REPO_ROOT),
+        LLM_API_BASE=stub_url,
+        NOURISHWELL_PLAN_CACHE=str(Path(work_dir) / f'plan_cache_{users}.db'),  # fresh per level: every plan reaches the LLM
+        NOURISHWELL_TRACE='1',  # every rerun is traced; its total is the latency sample
+        NOURISHWELL_TRACE_LOG=str(trace_log),
+    )
+    if catalog_path is not None:
+        env['NOURISHWELL_CATALOG'] = str(catalog_path)
+        env['NOURISHWELL_SNAPSHOT_DIR'] = str(Path(args.data_dir) / 'snapshots')
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.load_test', '--load-worker', str(users), '--duration', str(args.duration),
+         '--seed', str(args.seed), '--foods-per-plan', str(args.foods_per_plan), '--think-time', str(args.think_time)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"load test failed with {users} users:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def print_summary(levels):
+    print(f"{'users':>5}{'reruns/s':>10}{'sessions/s':>12}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'plan p50 s':>12}{'plan p95 s':>12}{'errors':>8}{'peak RSS MB':>13}", file=sys.stderr)
+    for level in levels:
+        latency, plan = level['rerun_latency'], level['time_to_plan']
+        print(f"{level['users']:>5}{level['reruns_per_s']:>10}{level['sessions_per_s']:>12}"
+              f"{latency.get('p50_ms', 0):>9}{latency.get('p95_ms', 0):>9}{latency.get('p99_ms', 0):>9}"
+              f"{plan.get('p50_ms', 0) / 1000:>12.2f}{plan.get('p95_ms', 0) / 1000:>12.2f}"
+              f"{level['errors']:>8}{level['peak_rss_mb']:>13}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', default='1,4,16', help="comma-separated numbers of simultaneous users")
+    parser.add_argument('--duration', type=float, default=30, help="seconds each level keeps starting new sessions")
+    parser.add_argument('--think-time', type=float, default=0.2, help="max seconds a user pauses between actions")
+    parser.add_argument('--foods-per-plan', type=int, default=3)
+    parser.add_argument('--llm-latency', type=float, default=1.0, help="stub seconds before the first byte")
+    parser.add_argument('--chunk-delay', type=float, default=0.05, help="stub seconds between streamed chunks")
+    parser.add_argument('--llm-fail-rate', type=float, default=0.0, help="fraction of stub requests answered with 503")
+    parser.add_argument('--size', type=int, default=0, help="synthetic catalog size (default: the bundled CSV)")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--data-dir', default=str(REPO_ROOT / '.cache' / 'bench'), help="where synthetic catalogs are kept")
+    parser.add_argument('--out', help="write the JSON report here (default: print it)")
+    parser.add_argument('--load-worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load_worker:
+        print(json.dumps(load_worker(args.load_worker, args.duration, args.seed, args.foods_per_plan, args.think_time)))
+        return 0
+
+    levels = [int(users) for users in args.concurrency.split(',') if users.strip()]
+    catalog_path = dataset_path(args.data_dir, args.size, args.seed) if args.size else None
+    stub, stub_url = start_stub(args.llm_latency, args.chunk_delay, args.llm_fail_rate)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            for users in levels:
+                print(f"Running {users} simultaneous users for {args.duration:g}s", file=sys.stderr)
+                results.append(run_level(args, users, catalog_path, stub_url, work_dir))
+    finally:
+        stub.terminate()
+        stub.wait()
+    print_summary(results)
+
+    settings = {name: getattr(args, name) for name in (
+        'duration', 'think_time', 'foods_per_plan', 'llm_latency', 'chunk_delay', 'llm_fail_rate', 'size', 'seed')}
+    settings['llm_workers'] = int(os.environ.get('NOURISHWELL_LLM_WORKERS', '4'))
+    report = {'meta': dict(run_metadata(), **settings), 'levels': results}
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + '\n', encoding='utf-8')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""Scaling benchmarks for the food catalog: load, filter, search, sort and full page runs.
+
+Synthetic catalogs (see nourishwell/synthetic.py) are generated once per size under --data-dir and
+reused, and compiled once into snapshots (nourishwell/snapshot.py) beside them. Page runs drive
+pages/1_Food_Discovery.py through Streamlit's AppTest in a fresh subprocess per size, so the first
+run includes a warm start from the snapshot.
+
+    python -m benchmarks.scaling --sizes 1000,10000,100000 --out .cache/bench/report.json
+    python -m benchmarks.scaling --sizes 1000,10000 --compare .cache/bench/baseline.json --threshold 1.25
+
+The report is JSON: run metadata plus one entry per (size, benchmark) with min/median/mean seconds.
+--compare prints the median ratio against an earlier report and exits with status 1 when any
+benchmark got slower than --threshold (and by more than --min-delta seconds).
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DISCOVERY_PAGE = REPO_ROOT / 'pages' / '1_Food_Discovery.py'
+SEARCH_QUERIES = ('omega', 'pcos', 'vitamin d', 'anti infl', 'salmon', 'magnesium iron', 'magensium', 'turmric')
+CONCERNS = ('PCOS / Hormonal Balance', 'Endometriosis')
+NUTRIENTS = ('Magnesium', 'Folate')
+MIN_SAMPLE_SECONDS = 0.02  # fast steps are looped until one sample takes at least this long
+
+
+def timed(fn, repeats, autorange=True):
+    # Returns per-call wall times in seconds; one untimed warm-up call first. With `autorange`,
+    # each sample averages over enough calls to rise above timer noise (like timeit).
+    started = time.perf_counter()
+    fn()
+    warmup = time.perf_counter() - started
+    loops = max(1, int(MIN_SAMPLE_SECONDS / max(warmup, 1e-7))) if autorange else 1
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        times.append((time.perf_counter() - started) / loops)
+    return times
+
+
+def result(size, name, times):
+    return {
+        'size': size,
+        'benchmark': name,
+        'repeats': len(times),
+        'min_s': round(min(times), 6),
+        'median_s': round(statistics.median(times), 6),
+        'mean_s': round(statistics.fmean(times), 6),
+    }
+
+
+def dataset_path(data_dir, size, seed):
+    from nourishwell.data import CATALOG_PATH
+    from nourishwell.synthetic import csv_header, write_catalog
+
+    path = Path(data_dir) / f'foods_{size}_seed{seed}.csv'
+    if not path.exists() or csv_header(path) != csv_header(CATALOG_PATH):  # also regenerates files from an older schema
+        write_catalog(path, size, seed)
+    return path
+
+
+def bench_catalog(path, size, repeats, snapshot_dir):
+    from nourishwell.api import encode_body, foods_body
+    from nourishwell.data import CATEGORY_COL, FOOD_COL, SCORE_COL, load_catalog
+    from nourishwell.query import FoodQuery, ResultCache, compute_rows, query_rows
+    from nourishwell.snapshot import load_compiled_catalog
+    from nourishwell.suggest import PlanCoverage, suggestion_model
+
+    results = []
+    load_times = []
+    for _ in range(max(1, min(repeats, 3))):  # loading is the slowest step; a few samples are enough
+        started = time.perf_counter()
+        catalog = load_catalog(path)
+        load_times.append(time.perf_counter() - started)
+    results.append(result(size, 'load_catalog', load_times))
+    load_compiled_catalog(path, snapshot_dir)  # compile once, then time warm starts from the snapshot
+    results.append(result(size, 'load_snapshot', timed(lambda: load_compiled_catalog(path, snapshot_dir), repeats, autorange=False)))
+
+    df = catalog.df
+    category = catalog.categories[0]
+    queries = itertools.cycle(SEARCH_QUERIES)
+
+    def search_mask():
+        mask = np.zeros(len(df), dtype=bool)
+        rows = catalog.search_index.search(next(queries))
+        if rows is not None:
+            mask[rows] = True
+        return mask
+
+    def full_pipeline():
+        # Uncached mask + search + sort_values pipeline with every filter active, for comparison
+        mask = (df[CATEGORY_COL] == category).to_numpy() & (df[SCORE_COL].to_numpy() >= 7)
+        mask &= catalog.flag_index.match(CONCERNS[:1])
+        mask &= search_mask()
+        return df[mask].sort_values(by=SCORE_COL, ascending=False).head(25)
+
+    def presorted_pipeline():
+        # Same filters read through the load-time permutation; only the first page becomes a DataFrame
+        mask = (df[CATEGORY_COL] == category).to_numpy() & (df[SCORE_COL].to_numpy() >= 7)
+        mask &= catalog.flag_index.match(CONCERNS[:1])
+        mask &= search_mask()
+        order = catalog.sort_orders['desc']
+        return df.iloc[order[mask[order]][:25]]
+
+    broad_query = FoodQuery.build(min_score=5, search='ome')
+    narrow_query = FoodQuery.build(min_score=5, search='omega')
+    ranked_query = FoodQuery.build(min_score=5, search='magnesum iron', sort='relevance')
+    broad_rows = compute_rows(catalog, broad_query)
+    warm_cache = ResultCache()
+    query_rows(catalog, narrow_query, cache=warm_cache)
+
+    plan_coverage = PlanCoverage(suggestion_model(catalog))
+    for food_id in list(catalog.id_rows)[::max(1, len(df) // 20)][:20]:  # a 20-food plan
+        plan_coverage.add(food_id)
+    toggled_food = next(food_id for food_id in catalog.id_rows if food_id not in plan_coverage.food_rows)
+
+    def suggest_after_change():
+        # One "Add to Plan" click and its undo, each followed by a fresh "Suggested next" ranking
+        plan_coverage.add(toggled_food)
+        plan_coverage.suggest()
+        plan_coverage.remove(toggled_food)
+        return plan_coverage.suggest()
+
+    def narrowed_query():
+        # The user typed "ome" (cached) and then "omega"
+        cache = ResultCache()
+        cache.put((catalog.version, broad_query), broad_rows.copy())
+        return query_rows(catalog, narrow_query, cache=cache)
+
+    benchmarks = {
+        'filter_category': lambda: (df[CATEGORY_COL] == category).to_numpy(),
+        'filter_min_score': lambda: df[SCORE_COL].to_numpy() >= 7,
+        'filter_concerns_any': lambda: catalog.flag_index.match(CONCERNS, mode='any'),
+        'filter_concerns_all': lambda: catalog.flag_index.match(CONCERNS, mode='all'),
+        'filter_nutrients_all': lambda: catalog.nutrient_index.match(NUTRIENTS, mode='all'),
+        'search': search_mask,
+        'sort_score_desc': lambda: df.sort_values(by=SCORE_COL, ascending=False),
+        'sort_alpha': lambda: df.sort_values(by=FOOD_COL, ascending=True),
+        'filter_sort_page': full_pipeline,
+        'filter_presorted_page': presorted_pipeline,
+        'query_cold': lambda: query_rows(catalog, narrow_query, cache=ResultCache()),
+        'query_best_match': lambda: query_rows(catalog, ranked_query, cache=ResultCache()),
+        'query_cached': lambda: query_rows(catalog, narrow_query, cache=warm_cache),
+        'query_narrowed': narrowed_query,
+        # A JSON API page for a cached query: records, JSON and gzip (the API's response cache is bypassed)
+        'api_foods_page': lambda: encode_body(foods_body(catalog, narrow_query, 25, None)),
+        'suggest_next_change': suggest_after_change,
+        'suggest_next_unchanged': plan_coverage.suggest,
+    }
+    for name, fn in benchmarks.items():
+        results.append(result(size, name, timed(fn, repeats)))
+    return results
+
+
+def page_worker(path, size, repeats):
+    # Runs inside a subprocess with NOURISHWELL_CATALOG pointing at `path`
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    st.page_link = lambda *args, **kwargs: None  # AppTest runs a page as the main script, so page links cannot resolve
+
+    at = AppTest.from_file(str(DISCOVERY_PAGE), default_timeout=600)
+    started = time.perf_counter()
+    at.run()
+    results = [result(size, 'page_first_run', [time.perf_counter() - started])]
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+    def interaction(apply):
+        def run():
+            apply()
+            at.run()
+        return run
+
+    queries = itertools.cycle(SEARCH_QUERIES)
+    scenarios = {
+        'page_rerun': interaction(lambda: None),
+        'page_search': interaction(lambda: at.text_input(key='discovery_search_term').input(next(queries))),
+        'page_category': interaction(lambda: at.selectbox(key='discovery_category_filter').select_index(
+            1 + len(at.selectbox(key='discovery_category_filter').options) // 2)),
+        'page_sort_alpha': interaction(lambda: at.selectbox(key='discovery_sort_by').select('Alphabetical (A-Z)')),
+        'page_reset': interaction(lambda: at.button(key='discovery_reset_filters').click()),
+        'page_next_page': interaction(lambda: at.button(key='discovery_next_page').click()),
+    }
+    for name, fn in scenarios.items():
+        results.append(result(size, name, timed(fn, repeats, autorange=False)))
+    return results
+
+
+def bench_pages(path, size, repeats, snapshot_dir):
+    env = dict(os.environ, NOURISHWELL_CATALOG=str(path), NOURISHWELL_SNAPSHOT_DIR=str(snapshot_dir), PYTHONPATH=str(REPO_ROOT))
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.scaling', '--page-worker', str(path), '--sizes', str(size), '--repeats', str(repeats)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"page benchmark failed for {size} foods:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_metadata():
+    import pandas as pd
+    import streamlit
+
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'streamlit': streamlit.__version__,
+    }
+
+
+def compare(report, baseline, threshold, min_delta):
+    # Prints median ratios (new / baseline); returns the benchmarks slower than `threshold` by more
+    # than `min_delta` seconds (microsecond steps jitter by more than 25% between runs)
+    previous = {(entry['size'], entry['benchmark']): entry for entry in baseline['results']}
+    regressions = []
+    print(f"{'size':>9}  {'benchmark':<22}{'baseline':>12}{'now':>12}{'ratio':>8}")
+    for entry in report['results']:
+        before = previous.get((entry['size'], entry['benchmark']))
+        if before is None:
+            continue
+        ratio = entry['median_s'] / before['median_s'] if before['median_s'] else float('inf')
+        slower = ratio > threshold and entry['median_s'] - before['median_s'] > min_delta
+        marker = '  <-- slower' if slower else ''
+        print(f"{entry['size']:>9}  {entry['benchmark']:<22}{before['median_s']:>12.6f}{entry['median_s']:>12.6f}{ratio:>8.2f}{marker}")
+        if slower:
+            regressions.append(entry)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000', help="comma-separated catalog sizes")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--data-dir', default=str(REPO_ROOT / '.cache' / 'bench'), help="where synthetic catalogs are kept")
+    parser.add_argument('--no-pages', action='store_true', help="skip the AppTest page runs")
+    parser.add_argument('--out', help="write the JSON report here (default: print it)")
+    parser.add_argument('--compare', help="earlier report to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25, help="median slowdown ratio counted as a regression")
+    parser.add_argument('--min-delta', type=float, default=0.001, help="ignore slowdowns smaller than this many seconds")
+    parser.add_argument('--page-worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+
+    if args.page_worker:
+        print(json.dumps(page_worker(args.page_worker, sizes[0], args.repeats)))
+        return 0
+
+    results = []
+    for size in sizes:
+        path = dataset_path(args.data_dir, size, args.seed)
+        print(f"Benchmarking {size} foods ({path.name})", file=sys.stderr)
+        results.extend(bench_catalog(path, size, args.repeats, Path(args.data_dir) / 'snapshots'))
+        if not args.no_pages:
+            results.extend(bench_pages(path, size, args.repeats, Path(args.data_dir) / 'snapshots'))
+    report = {'meta': dict(run_metadata(), sizes=sizes, repeats=args.repeats, seed=args.seed), 'results': results}
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(text + '\n', encoding='utf-8')
+    else:
+        print(text)
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        if compare(report, baseline, args.threshold, args.min_delta):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
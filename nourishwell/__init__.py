@@ -0,0 +1,2 @@
+# Shared, Streamlit-independent building blocks for the NourishWell pages (debug_panel.py is the one
+# Streamlit-aware helper: it renders the rerun timings collected by tracing.py).
@@ -0,0 +1,326 @@
+"""JSON API over the food catalog and meal plan generation, for partners and scripts (no Streamlit).
+
+    python -m nourishwell.api --port 8080
+    curl 'http://127.0.0.1:8080/v1/foods?q=salmon&sort=relevance&limit=10'
+
+    GET  /v1/catalog           dataset version, categories, health concerns, nutrients, sort modes
+    GET  /v1/foods             category, min_score, concern (repeatable), concern_mode=any|all,
+                               nutrient (repeatable, all must match), q,
+                               sort=desc|asc|alpha_asc|relevance, limit (max 100), cursor
+    GET  /v1/foods/<id>        one food
+    GET  /v1/foods/<id>/similar
+                               the most similar foods, best first; limit (max 10)
+    POST /v1/plans             {"food_ids": [...], "offline": false}: 202 and a job to poll
+                               (200 and the plan right away when offline); AI plans need
+                               `Authorization: Bearer <NOURISHWELL_API_TOKEN>`
+    GET  /v1/plans/<job id>    job status, the text written so far, and the plan once done
+
+Lists are paged with the opaque `next_cursor`. Catalog responses carry an ETag tied to the dataset
+version (If-None-Match answers 304), and bodies are gzipped for clients that accept it. AI plans
+spend the server's Gemini key, so they are only generated for callers presenting the API token;
+without a token configured every plan is the offline one.
+"""
+import argparse
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from nourishwell import engine
+from nourishwell.data import FOOD_ID_COL, get_catalog
+from nourishwell.jobs import DONE, QueueFullError, default_executor
+from nourishwell.lru import LRUCache
+from nourishwell.offline_plan import build_offline_meal_plan
+from nourishwell.query import SORT_MODES, FoodQuery
+from nourishwell.servers import serve_in_background
+from nourishwell.similar import SIMILAR_K
+
+RESPONSE_CACHE_SIZE = int(os.environ.get('NOURISHWELL_API_CACHE_SIZE', '1024'))
+GZIP_MIN_BYTES = 1024  # smaller bodies aren't worth the CPU
+GZIP_LEVEL = 6
+MAX_BODY_BYTES = 64 * 1024
+CONCERN_MODES = ('any', 'all')
+# Bearer token for AI plans; empty means AI plans are never generated through the API
+API_TOKEN = os.environ.get('NOURISHWELL_API_TOKEN', '')
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def encode_body(body):
+    data = json.dumps(body, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return data, gzip.compress(data, GZIP_LEVEL) if len(data) >= GZIP_MIN_BYTES else None
+
+
+def make_etag(catalog, *parts):
+    # Weak: the gzipped and plain bodies are the same resource, not byte-identical
+    digest = hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=8).hexdigest()
+    return f'W/"{catalog.version}-{digest}"'
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(',')]
+    return '*' in candidates or any(tag.removeprefix('W/') == etag.removeprefix('W/') for tag in candidates)
+
+
+def single_param(params, name, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def int_param(params, name, default, low, high):
+    value = single_param(params, name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be an integer.") from None
+    if not low <= number <= high:
+        raise ApiError(400, f"'{name}' must be between {low} and {high}.")
+    return number
+
+
+def parse_food_query(catalog, params):
+    category = single_param(params, 'category')
+    if category is not None and category not in catalog.categories:
+        raise ApiError(400, f"Unknown category '{category}'. See /v1/catalog.")
+    concern_mode = single_param(params, 'concern_mode', 'any')
+    if concern_mode not in CONCERN_MODES:
+        raise ApiError(400, f"'concern_mode' must be one of {', '.join(CONCERN_MODES)}.")
+    sort = single_param(params, 'sort', 'desc')
+    if sort not in SORT_MODES:
+        raise ApiError(400, f"'sort' must be one of {', '.join(SORT_MODES)}.")
+    return FoodQuery.build(
+        category=category,
+        min_score=int_param(params, 'min_score', 0, 0, 10),
+        concerns=params.get('concern', ()),
+        concern_mode=concern_mode,
+        nutrients=params.get('nutrient', ()),
+        search=single_param(params, 'q', ''),
+        sort=sort,
+    )
+
+
+def catalog_body(catalog):
+    return {
+        'version': catalog.version,
+        'foods': len(catalog),
+        'categories': list(catalog.categories),
+        'health_concerns': list(catalog.health_flags),
+        'nutrients': list(catalog.nutrients),
+        'sort_modes': list(SORT_MODES),
+        'max_page_size': engine.MAX_PAGE_SIZE,
+    }
+
+
+def foods_body(catalog, query, limit, cursor):
+    try:
+        page = engine.find_foods(catalog, query, limit=limit, cursor=cursor)
+    except engine.CursorError as e:
+        raise ApiError(400, str(e)) from None
+    return {'total': page.total, 'next_cursor': page.next_cursor, 'foods': page.foods}
+
+
+def job_body(job):
+    body = {'job_id': job.id, 'status': job.status}
+    if job.status == DONE:
+        body['plan'] = job.result
+    elif job.error:
+        body['error'] = job.error
+    else:
+        body['partial'] = job.partial_text
+    return body
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive: clients paging through results reuse one connection
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def accepts_gzip(self):
+        return 'gzip' in (self.headers.get('Accept-Encoding') or '')
+
+    def send_body(self, status, data, gzipped=None, headers=()):
+        use_gzip = gzipped is not None and self.accepts_gzip()
+        payload = gzipped if use_gzip else data
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Vary', 'Accept-Encoding')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def send_json(self, status, body, headers=()):
+        self.send_body(status, *encode_body(body), headers=headers)
+
+    def send_catalog_json(self, etag, build_body):
+        # Catalog data only changes with the dataset version, so it can be revalidated and cached
+        headers = (('ETag', etag), ('Cache-Control', 'no-cache'))
+        if etag_matches(self.headers.get('If-None-Match'), etag):
+            self.send_response(304)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+        responses = self.server.responses
+        entry = responses.get(etag)
+        if entry is None:
+            entry = encode_body(build_body())
+            responses.put(etag, entry)
+        self.send_body(200, *entry, headers=headers)
+
+    def handle_errors(self, handler):
+        try:
+            handler()
+        except ApiError as e:
+            self.send_json(e.status, {'error': {'code': e.status, 'message': e.message}})
+        except Exception:
+            # A bug, not the client's fault: still answer in JSON, and don't reuse the connection
+            traceback.print_exc()
+            self.close_connection = True
+            self.send_json(500, {'error': {'code': 500, 'message': "Internal server error."}})
+
+    def do_GET(self):
+        self.handle_errors(self.route_get)
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        self.handle_errors(self.route_post)
+
+    def route_get(self):
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        catalog = self.server.catalog
+        if parts == ['v1', 'catalog']:
+            self.send_catalog_json(make_etag(catalog, 'catalog'), lambda: catalog_body(catalog))
+        elif parts == ['v1', 'foods']:
+            params = parse_qs(url.query)
+            query = parse_food_query(catalog, params)
+            limit = int_param(params, 'limit', engine.DEFAULT_PAGE_SIZE, 1, engine.MAX_PAGE_SIZE)
+            cursor = single_param(params, 'cursor')
+            self.send_catalog_json(make_etag(catalog, 'foods', query, limit, cursor),
+                                   lambda: foods_body(catalog, query, limit, cursor))
+        elif len(parts) == 3 and parts[:2] == ['v1', 'foods']:
+            food = engine.get_food(catalog, int(parts[2])) if parts[2].isdigit() else None
+            if food is None:
+                raise ApiError(404, f"No food with id {parts[2]}.")
+            self.send_catalog_json(make_etag(catalog, 'food', food['id']), lambda: food)
+        elif len(parts) == 4 and parts[:2] == ['v1', 'foods'] and parts[3] == 'similar':
+            limit = int_param(parse_qs(url.query), 'limit', 5, 1, SIMILAR_K)
+            foods = engine.similar_foods(catalog, int(parts[2]), limit) if parts[2].isdigit() else None
+            if foods is None:
+                raise ApiError(404, f"No food with id {parts[2]}.")
+            self.send_catalog_json(make_etag(catalog, 'similar', int(parts[2]), limit), lambda: {'foods': foods})
+        elif len(parts) == 3 and parts[:2] == ['v1', 'plans']:
+            job = self.server.executor.get(parts[2])
+            if job is None:
+                raise ApiError(404, f"No plan job {parts[2]} (finished jobs are kept for {self.server.executor.retention_seconds}s).")
+            self.send_json(200, job_body(job))
+        else:
+            raise ApiError(404, f"Unknown path {url.path}")
+
+    def read_json(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            raise ApiError(400, "Invalid Content-Length header.")
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True  # the unread body would be parsed as the next request
+            raise ApiError(413, f"Request body is over {MAX_BODY_BYTES} bytes.")
+        try:
+            return json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError:
+            raise ApiError(400, "Request body is not valid JSON.") from None
+
+    def check_token(self):
+        scheme, _, token = (self.headers.get('Authorization') or '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode('utf-8'),
+                                                                 self.server.api_token.encode('utf-8')):
+            raise ApiError(401, "AI plans need 'Authorization: Bearer <API token>'; send \"offline\": true for an instant plan.")
+
+    def route_post(self):
+        body = self.read_json()
+        if urlsplit(self.path).path.rstrip('/') != '/v1/plans':
+            raise ApiError(404, f"Unknown path {self.path}")
+        food_ids = body.get('food_ids') if isinstance(body, dict) else None
+        if not isinstance(food_ids, list) or not all(
+                isinstance(food_id, int) and not isinstance(food_id, bool) for food_id in food_ids):
+            raise ApiError(400, "'food_ids' must be a list of food ids.")
+        catalog = self.server.catalog
+        plan_df, unknown = engine.selected_foods(catalog, list(dict.fromkeys(food_ids)))
+        if plan_df.empty:
+            raise ApiError(400, "None of the food ids are in the catalog.")
+        extra = {'unknown_food_ids': unknown} if unknown else {}
+
+        if body.get('offline') or not (self.server.api_key and self.server.api_token):
+            # Local and deterministic, like the page's instant plan: no job needed
+            self.send_json(200, {'status': DONE, 'source': 'offline', 'plan': build_offline_meal_plan(plan_df), **extra})
+            return
+        self.check_token()
+        try:
+            job = engine.submit_meal_plan(catalog, plan_df[FOOD_ID_COL].tolist(), self.server.api_key,
+                                          executor=self.server.executor)
+        except QueueFullError as e:
+            raise ApiError(503, str(e)) from None
+        self.send_json(202, {**job_body(job), **extra}, headers=(('Location', f'/v1/plans/{job.id}'),))
+
+
+def make_server(host='127.0.0.1', port=0, api_key=None, catalog=None, executor=None, verbose=False, api_token=None):
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    server.catalog = get_catalog() if catalog is None else catalog  # loaded before the first request
+    server.api_key = api_key
+    server.api_token = API_TOKEN if api_token is None else api_token
+    server.executor = default_executor() if executor is None else executor
+    # Encoded catalog responses by ETag: (JSON bytes, gzipped bytes or None). The ETag covers the
+    # dataset version and every request parameter, so a hit is always the right answer.
+    server.responses = LRUCache(RESPONSE_CACHE_SIZE)
+    server.verbose = verbose
+    return server
+
+
+def start_in_background(**kwargs):
+    return serve_in_background(make_server(**kwargs), '/v1')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--api-key', default=os.environ.get('GOOGLE_API_KEY'),
+                        help="Gemini key for AI plans (defaults to $GOOGLE_API_KEY; without one, plans are offline)")
+    parser.add_argument('--api-token', default=API_TOKEN,
+                        help="bearer token callers need for AI plans (defaults to $NOURISHWELL_API_TOKEN; without one, plans are offline)")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.api_key, verbose=args.verbose, api_token=args.api_token)
+    print(f"NourishWell API listening on http://{args.host}:{args.port}/v1 ({len(server.catalog)} foods)")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
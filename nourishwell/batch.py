@@ -0,0 +1,218 @@
+"""Generate meal plans for many selection profiles without the Streamlit UI.
+
+Profiles are JSONL ({"id": ..., "foods": [...]}) or CSV with `id` and `foods` columns
+(foods separated by ';'). Results are appended to the output JSONL as each job finishes,
+so an interrupted run picks up where it stopped when started again with the same output.
+
+    python -m nourishwell.batch profiles.jsonl --out plans.jsonl --concurrency 8 --rate 4
+    LLM_API_BASE=http://127.0.0.1:8765/v1beta python -m nourishwell.batch profiles.csv --out plans.jsonl --api-key stub
+"""
+import argparse
+import csv
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from nourishwell.data import FOOD_COL, get_catalog
+from nourishwell.llm_client import LLM_API_BASE, LLMClient
+from nourishwell.meal_plan import MealPlanError, generate_meal_plan
+from nourishwell.plan_cache import NullPlanCache, default_plan_cache
+
+
+class TokenBucket:
+    # Blocking token-bucket rate limiter: sustained `rate` acquisitions per second, bursts up to `capacity`
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0")
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def parse_foods(value):
+    if isinstance(value, list):
+        return [str(food).strip() for food in value if str(food).strip()]
+    return [food.strip() for food in str(value or '').split(';') if food.strip()]
+
+
+def read_profiles(path):
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        with path.open(newline='', encoding='utf-8-sig') as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with path.open(encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    return [
+        # Only a missing id falls back to the line number; 0 or '' are ids like any other
+        {'id': str(line_number if row.get('id') is None else row['id']), 'foods': parse_foods(row.get('foods'))}
+        for line_number, row in enumerate(rows, start=1)
+    ]
+
+
+def completed_profile_ids(out_path):
+    # Profiles that already have a successful result; a torn last line from a crash, or any line
+    # that isn't a result object, is ignored
+    done = set()
+    if not Path(out_path).exists():
+        return done
+    with open(out_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(result, dict) and result.get('status') == 'ok' and 'id' in result:
+                done.add(result['id'])
+    return done
+
+
+def run_profile(profile, catalog, api_key, cache, client, limiter):
+    df = catalog.df
+    started = time.perf_counter()
+    result = {'id': profile['id'], 'foods': profile['foods']}
+    selected = df[df[FOOD_COL].isin(profile['foods'])]
+    unknown = sorted(set(profile['foods']) - set(selected[FOOD_COL]))
+    if unknown:
+        result['unknown_foods'] = unknown
+    if selected.empty:
+        result.update(status='error', error='No known foods in profile.')
+    else:
+        waited = 0.0
+
+        def acquire():
+            # Every request sent to the API takes a token, retries included; the wait isn't counted as latency
+            nonlocal waited
+            wait_started = time.perf_counter()
+            limiter.acquire()
+            waited += time.perf_counter() - wait_started
+
+        try:
+            plan, cached = generate_meal_plan(selected, api_key, cache=cache, client=client, before_request=acquire)
+            result.update(status='ok', cached=cached, plan=plan)
+        except MealPlanError as e:
+            result.update(status='error', error=str(e))
+        except Exception as e:
+            # Anything else is still one failed profile, not the end of the batch
+            result.update(status='error', error=f"{type(e).__name__}: {e}")
+        result['rate_wait_s'] = round(waited, 4)
+        started += waited
+    result['latency_s'] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(results, skipped, wall_time):
+    latencies = [result['latency_s'] for result in results]
+    errors = Counter(result['error'][:80] for result in results if result['status'] != 'ok')
+    return {
+        'processed': len(results),
+        'ok': sum(1 for result in results if result['status'] == 'ok'),
+        'cached': sum(1 for result in results if result.get('cached')),
+        'errors': sum(errors.values()),
+        'skipped_already_done': skipped,
+        'wall_time_s': round(wall_time, 3),
+        'throughput_per_s': round(len(results) / wall_time, 3) if wall_time else 0.0,
+        'latency_s': {
+            'mean': round(statistics.fmean(latencies), 4) if latencies else 0.0,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies, default=0.0),
+        },
+        'error_breakdown': dict(errors.most_common()),
+    }
+
+
+def run_batch(profiles_path, out_path, api_key, concurrency=4, rate=2.0, burst=None, use_cache=True, api_base=LLM_API_BASE):
+    catalog = get_catalog()
+    profiles = read_profiles(profiles_path)
+    done = completed_profile_ids(out_path)
+    pending = [profile for profile in profiles if profile['id'] not in done]
+
+    client = LLMClient(api_base, pool_size=concurrency)
+    cache = default_plan_cache() if use_cache else NullPlanCache()
+    limiter = TokenBucket(rate, burst)
+    write_lock = threading.Lock()
+    results = []
+
+    started = time.perf_counter()
+    with open(out_path, 'a', encoding='utf-8') as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(run_profile, profile, catalog, api_key, cache, client, limiter) for profile in pending]
+        for future in as_completed(futures):
+            result = future.result()
+            with write_lock:
+                out.write(json.dumps(result, ensure_ascii=False) + '\n')
+                out.flush()
+                os.fsync(out.fileno())
+            results.append(result)
+    return summarize(results, len(profiles) - len(pending), time.perf_counter() - started)
+
+
+def positive_float(value):
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
+def positive_int(value):
+    number = int(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('profiles', help="JSONL or CSV file of selection profiles")
+    parser.add_argument('--out', required=True, help="results JSONL (appended to; reused to resume)")
+    parser.add_argument('--concurrency', type=positive_int, default=4, help="max plans in flight")
+    parser.add_argument('--rate', type=positive_float, default=2.0, help="max upstream requests per second")
+    parser.add_argument('--burst', type=positive_float, default=None, help="token bucket size (default: max(1, rate))")
+    parser.add_argument('--no-cache', action='store_true', help="always call the API, ignore the shared plan cache")
+    parser.add_argument('--api-key', default=os.environ.get('GOOGLE_API_KEY'), help="defaults to $GOOGLE_API_KEY")
+    parser.add_argument('--api-base', default=LLM_API_BASE, help="defaults to $LLM_API_BASE or the Gemini API")
+    parser.add_argument('--stats-json', help="also write the final stats to this file")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("no API key: pass --api-key or set GOOGLE_API_KEY")
+    stats = run_batch(args.profiles, args.out, args.api_key, args.concurrency, args.rate, args.burst,
+                      use_cache=not args.no_cache, api_base=args.api_base)
+    report = json.dumps(stats, indent=2)
+    print(report)
+    if args.stats_json:
+        Path(args.stats_json).write_text(report + '\n', encoding='utf-8')
+    return 0 if stats['errors'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+import hashlib
+import io
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from nourishwell.flags import FlagIndex
+from nourishwell.nutrients import build_nutrient_index
+from nourishwell.search import SearchIndex
+from nourishwell.similar import SimilarityIndex
+
+# The catalog can be swapped (e.g. for a larger synthetic one) without touching the pages
+CATALOG_PATH = Path(os.environ.get(
+    'NOURISHWELL_CATALOG',
+    Path(__file__).resolve().parent.parent / 'anti_inflammatory_foods.csv',
+))
+
+# --- COLUMN NAMES ---
+CATEGORY_COL = 'Category'
+FOOD_COL = 'Food Item'
+SUBCATEGORY_COL = 'Sub-category'
+FORM_COL = 'Best Type/Form'
+MECHANISM_COL = 'Why Anti-Inflammatory (for Women)'
+NUTRIENTS_COL = 'Key Vitamins & Minerals'
+SCORE_COL = 'Score (0–10)'
+FLAGS_COL = 'Flags (Female Health Issues)'
+BEST_FOR_COL = 'Best For'
+REGION_COL = 'Regional Availability'
+CAUTIONS_COL = 'Cautions'
+USAGE_COL = 'Sample Recipe/Usage'
+FOOD_ID_COL = 'Food ID'  # added at load time, not in the CSV
+
+FOOD_ID_MASK = (1 << 53) - 1  # ids stay exact as JSON numbers in JavaScript clients
+
+TEXT_COLUMNS = (
+    FOOD_COL, SUBCATEGORY_COL, FORM_COL, MECHANISM_COL, NUTRIENTS_COL,
+    FLAGS_COL, BEST_FOR_COL, REGION_COL, CAUTIONS_COL, USAGE_COL,
+)
+
+
+@dataclass(frozen=True)
+class Catalog:
+    # One immutable copy of the food catalog per process, shared by every session.
+    # Treat `df` as read-only: filter with masks / positional indexing, never assign into it.
+    df: pd.DataFrame
+    version: str  # content hash of the source file
+    categories: tuple
+    health_flags: tuple  # sorted, de-duplicated flag names
+    nutrients: tuple  # sorted canonical nutrient names (see nourishwell/nutrients.py)
+    sort_orders: dict  # sort mode -> read-only permutation of row positions (see SORT_MODES)
+    flag_index: FlagIndex
+    nutrient_index: FlagIndex  # food x nutrient bit matrix
+    search_index: SearchIndex
+    similar_index: SimilarityIndex  # precomputed "similar foods" per food
+    id_rows: dict  # food id -> row position
+
+    def __len__(self):
+        return len(self.df)
+
+    def rows_for(self, food_ids):
+        # Row positions of `food_ids`, in their order; ids this catalog doesn't have are skipped
+        id_rows = self.id_rows
+        return np.fromiter((id_rows[food_id] for food_id in food_ids if food_id in id_rows), dtype=np.int64)
+
+
+def split_flags(value):
+    if not isinstance(value, str):
+        return ()
+    # Some rows end their list with a full stop ("..., Fertility.")
+    return tuple(flag for flag in (part.strip().rstrip('.').strip() for part in value.split(',')) if flag)
+
+
+def read_catalog_csv(raw):
+    # Decode once and parse once (the old fallback could parse the whole file twice)
+    try:
+        text = raw.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = raw.decode('ISO-8859-1')
+    return pd.read_csv(io.StringIO(text), low_memory=False)
+
+
+def prepare_frame(df):
+    df = df.reset_index(drop=True)
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].fillna('').astype(str)
+    # The CSV only fills Category on the first food of each group (spreadsheet-style merged cells)
+    df[CATEGORY_COL] = df[CATEGORY_COL].ffill().fillna('Uncategorized').astype('category')
+    df[SCORE_COL] = pd.to_numeric(df[SCORE_COL], errors='coerce').fillna(0).astype(np.int16)
+    df[FOOD_ID_COL] = assign_food_ids(df[FOOD_COL].tolist())
+    return df
+
+
+def assign_food_ids(food_names):
+    # Derived from the name and how many earlier rows share it, not from the row position, so ids
+    # survive reloads and edits elsewhere in the CSV, and two foods with the same name differ
+    seen = {}
+    taken = set()
+    ids = np.empty(len(food_names), dtype=np.int64)
+    for pos, name in enumerate(food_names):
+        occurrence = seen[name] = seen.get(name, -1) + 1
+        digest = hashlib.blake2b(f'{name}\x1f{occurrence}'.encode('utf-8'), digest_size=8).digest()
+        food_id = int.from_bytes(digest, 'big') & FOOD_ID_MASK
+        while food_id in taken:  # a hash collision; vanishingly rare, but ids must be unique
+            food_id = (food_id + 1) & FOOD_ID_MASK
+        taken.add(food_id)
+        ids[pos] = food_id
+    return ids
+
+
+def index_food_ids(df):
+    return dict(zip(df[FOOD_ID_COL].tolist(), range(len(df))))
+
+
+def build_sort_orders(df):
+    # Computed once per dataset; stable, so ties keep catalog order in every mode
+    scores = df[SCORE_COL].to_numpy().astype(np.int32)
+    orders = {
+        'desc': np.argsort(-scores, kind='stable'),
+        'asc': np.argsort(scores, kind='stable'),
+        'alpha_asc': np.argsort(df[FOOD_COL].to_numpy(), kind='stable'),
+    }
+    for mode, order in orders.items():
+        orders[mode] = order.astype(np.int32)
+        orders[mode].flags.writeable = False
+    return orders
+
+
+def build_catalog(df, version):
+    df = prepare_frame(df)
+    flag_index = FlagIndex.from_flag_lists([split_flags(value) for value in df[FLAGS_COL].tolist()])
+    nutrient_index = build_nutrient_index(df[NUTRIENTS_COL].tolist())
+    return Catalog(
+        df=df,
+        version=version,
+        categories=tuple(sorted(df[CATEGORY_COL].cat.categories.tolist())),
+        health_flags=tuple(sorted(flag_index.flag_bits)),
+        nutrients=tuple(sorted(nutrient_index.flag_bits)),
+        sort_orders=build_sort_orders(df),
+        flag_index=flag_index,
+        nutrient_index=nutrient_index,
+        search_index=SearchIndex.from_frame(df),
+        similar_index=SimilarityIndex.from_frame(df, flag_index, nutrient_index),
+        id_rows=index_food_ids(df),
+    )
+
+
+def catalog_version(raw):
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def load_catalog(path=CATALOG_PATH):
+    raw = Path(path).read_bytes()
+    return build_catalog(read_catalog_csv(raw), catalog_version(raw))
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(path=CATALOG_PATH):
+    # Unlike st.cache_data (which unpickles a fresh DataFrame copy on every call), this hands
+    # every session and rerun the very same object. The first call per process memory-maps the
+    # compiled snapshot of the CSV, compiling it first if the CSV changed (see nourishwell/snapshot.py).
+    from nourishwell.snapshot import load_compiled_catalog  # snapshot builds on this module
+
+    key = Path(path).resolve()
+    catalog = _catalogs.get(key)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.get(key)
+            if catalog is None:
+                catalog = _catalogs[key] = load_compiled_catalog(key)
+    return catalog
@@ -0,0 +1,89 @@
+import hmac
+import time
+
+import streamlit as st
+
+from nourishwell.profiling import PROFILE_ALL, PROFILE_TOKEN, start_profile, stop_profile
+from nourishwell.tracing import TRACE_ALL, finish_trace, new_history, start_trace
+
+# Open any page with ?debug=1 to trace this session's reruns and show the timings panel, and with
+# ?profile=<NOURISHWELL_PROFILE_TOKEN> to cProfile each rerun (ignored when no token is configured)
+DEBUG_QUERY_PARAM = 'debug'
+PROFILE_QUERY_PARAM = 'profile'
+HISTORY_KEY = 'debug_rerun_traces'
+
+
+def debug_requested():
+    return st.query_params.get(DEBUG_QUERY_PARAM, '') not in ('', '0')
+
+
+def profiling_requested():
+    if PROFILE_ALL:
+        return True
+    if not PROFILE_TOKEN:
+        return False  # profiles are written to disk and show server paths: never on for anonymous visitors
+    value = st.query_params.get(PROFILE_QUERY_PARAM, '')
+    return hmac.compare_digest(value.encode('utf-8'), PROFILE_TOKEN.encode('utf-8'))
+
+
+class RerunProbe:
+    # What begin_rerun_trace() switched on for this rerun
+
+    def __init__(self, trace, profile):
+        self.trace = trace
+        self.profile = profile
+
+
+def begin_rerun_trace(page):
+    profile = start_profile(page) if profiling_requested() else None
+    return RerunProbe(start_trace(page, enabled=TRACE_ALL or debug_requested()), profile)
+
+
+def end_rerun_trace(probe):
+    # Call once the page has rendered (before any st.rerun()); the panels themselves are not measured
+    profile = stop_profile(probe.profile)
+    if HISTORY_KEY not in st.session_state:
+        st.session_state[HISTORY_KEY] = new_history()
+    finish_trace(probe.trace, st.session_state[HISTORY_KEY])
+    if debug_requested():
+        render_debug_panel(st.session_state[HISTORY_KEY])
+    if profile is not None:
+        render_profile_panel(profile)
+
+
+def render_debug_panel(history):
+    if not history:
+        return
+    latest = history[-1]
+    with st.expander(f"🛠 Rerun timings: {latest.page} took {latest.total_ms:.1f} ms"):
+        st.table([
+            {
+                'Span': '\u2003' * depth + name,  # em spaces survive the table's whitespace collapsing
+                'ms': f"{duration or 0.0:.2f}",
+                'Share': f"{(duration or 0.0) / latest.total_ms:.0%}" if latest.total_ms else '–',
+            }
+            for name, depth, start, duration in latest.spans
+        ])
+        if latest.counts:
+            st.caption(' · '.join(f"{name}: {value}" for name, value in latest.counts.items()))
+
+        st.markdown(f"**Last {len(history)} reruns**")
+        st.table([
+            {
+                'At': time.strftime('%H:%M:%S', time.localtime(trace.started_at)),
+                'Page': trace.page,
+                'Total ms': f"{trace.total_ms:.1f}",
+                'Slowest section': max(
+                    ((name, duration or 0.0) for name, depth, start, duration in trace.spans if depth == 0),
+                    key=lambda item: item[1], default=('–', 0.0),
+                )[0],
+                **{name: value for name, value in trace.counts.items()},
+            }
+            for trace in reversed(history)
+        ])
+
+
+def render_profile_panel(profile):
+    with st.expander(f"🔬 Profile of this rerun saved to {profile.paths[0]}"):
+        st.caption(' · '.join(str(path) for path in profile.paths))
+        st.code(profile.summary, language=None)
@@ -0,0 +1,145 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+
+from nourishwell.data import (
+    BEST_FOR_COL, CATEGORY_COL, CAUTIONS_COL, FLAGS_COL, FOOD_COL, FOOD_ID_COL, FORM_COL, MECHANISM_COL,
+    NUTRIENTS_COL, REGION_COL, SCORE_COL, SUBCATEGORY_COL, USAGE_COL, split_flags,
+)
+from nourishwell.jobs import default_executor
+from nourishwell.meal_plan import meal_plan_job, selection_fingerprint
+from nourishwell.offline_plan import build_offline_meal_plan
+from nourishwell.query import FoodQuery, query_rows
+
+# The pages' filtering, sorting, search and plan generation without Streamlit, for the JSON API
+# (nourishwell/api.py) and scripts. Results come from the same process-wide result cache.
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+# Public field name -> catalog column, in the order foods are serialized
+FOOD_FIELDS = {
+    'id': FOOD_ID_COL,
+    'name': FOOD_COL,
+    'category': CATEGORY_COL,
+    'subcategory': SUBCATEGORY_COL,
+    'score': SCORE_COL,
+    'form': FORM_COL,
+    'why': MECHANISM_COL,
+    'nutrients': NUTRIENTS_COL,
+    'flags': FLAGS_COL,
+    'best_for': BEST_FOR_COL,
+    'regions': REGION_COL,
+    'cautions': CAUTIONS_COL,
+    'usage': USAGE_COL,
+}
+
+
+class CursorError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class FoodPage:
+    foods: list  # food_record() dicts
+    total: int  # matches across all pages
+    next_cursor: str = None  # None on the last page
+
+
+_field_arrays = {}
+_field_arrays_lock = threading.Lock()
+
+
+def field_arrays(catalog):
+    # Column arrays per dataset version, so a page of records is a few fancy-index reads rather than
+    # df.iloc (the category column would otherwise be converted to objects on every request)
+    arrays = _field_arrays.get(catalog.version)
+    if arrays is None:
+        with _field_arrays_lock:
+            arrays = _field_arrays.get(catalog.version)
+            if arrays is None:
+                df = catalog.df
+                arrays = _field_arrays[catalog.version] = {
+                    field: df[col].astype(object).to_numpy() if col == CATEGORY_COL else df[col].to_numpy()
+                    for field, col in FOOD_FIELDS.items() if col in df.columns
+                }
+    return arrays
+
+
+def food_records(catalog, rows):
+    # JSON-ready dicts for the rows, in their order
+    columns = {field: values[rows].tolist() for field, values in field_arrays(catalog).items()}
+    records = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    for record in records:
+        record['flags'] = list(split_flags(record.get('flags')))
+    return records
+
+
+def get_food(catalog, food_id):
+    rows = catalog.rows_for([food_id])
+    return food_records(catalog, rows)[0] if len(rows) else None
+
+
+def similar_foods(catalog, food_id, k=5):
+    # Records of the foods most like `food_id`, best first, each with its 'similarity'; None for an unknown id
+    rows = catalog.rows_for([food_id])
+    if not len(rows):
+        return None
+    similar_rows, scores = catalog.similar_index.similar(rows[0], k)
+    records = food_records(catalog, similar_rows)
+    for record, score in zip(records, scores.tolist()):
+        record['similarity'] = round(score, 4)
+    return records
+
+
+def cursor_signature(catalog, query):
+    return hashlib.blake2b(repr((catalog.version, query)).encode('utf-8'), digest_size=6).hexdigest()
+
+
+def encode_cursor(catalog, query, offset):
+    # Opaque to clients: the offset of the next page, signed with the query and dataset version so a
+    # cursor can't be replayed against other filters or a catalog whose order has since changed
+    return f'{offset}.{cursor_signature(catalog, query)}'
+
+
+def decode_cursor(catalog, query, cursor):
+    offset, _, signature = (cursor or '').partition('.')
+    if not offset.isdigit() or signature != cursor_signature(catalog, query):
+        raise CursorError("Invalid cursor: it belongs to another query or an older catalog version. Start again without it.")
+    return int(offset)
+
+
+def find_foods(catalog, query, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    # One page of the foods matching `query` (a FoodQuery), in display order
+    limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+    start = decode_cursor(catalog, query, cursor) if cursor else 0
+    rows = query_rows(catalog, query)
+    end = min(start + limit, len(rows))
+    return FoodPage(
+        foods=food_records(catalog, rows[start:end]) if start < end else [],
+        total=len(rows),
+        next_cursor=encode_cursor(catalog, query, end) if end < len(rows) else None,
+    )
+
+
+def search_foods(catalog, search='', limit=DEFAULT_PAGE_SIZE, cursor=None, **filters):
+    # find_foods() with the Food Discovery filters as keyword arguments (see FoodQuery.build)
+    return find_foods(catalog, FoodQuery.build(search=search, **filters), limit=limit, cursor=cursor)
+
+
+def selected_foods(catalog, food_ids):
+    # (catalog rows of the known ids in their order, ids the catalog doesn't have)
+    known = catalog.id_rows
+    return catalog.df.iloc[catalog.rows_for(food_ids)], [food_id for food_id in food_ids if food_id not in known]
+
+
+def offline_meal_plan(catalog, food_ids):
+    return build_offline_meal_plan(selected_foods(catalog, food_ids)[0])
+
+
+def submit_meal_plan(catalog, food_ids, api_key, executor=None):
+    # Starts an AI plan for the foods on the shared job pool and returns the Job to poll, exactly as
+    # the Meal Plan page does (cached plans return at once; an unreachable AI gives the offline plan)
+    executor = default_executor() if executor is None else executor
+    plan_df = selected_foods(catalog, food_ids)[0]
+    return executor.submit(meal_plan_job, plan_df, api_key, key=selection_fingerprint(plan_df))
@@ -0,0 +1,52 @@
+import numpy as np
+
+WORD_BITS = 64
+
+
+class FlagIndex:
+    # Health-concern flags packed into one bitset per food: bit `flag_bits[flag]` of row i is set
+    # when food i carries that flag. Rows are stored as uint64 words (one word covers 64 flags).
+
+    def __init__(self, flag_bits, bitsets):
+        self.flag_bits = flag_bits
+        self.bitsets = bitsets
+
+    @classmethod
+    def from_flag_lists(cls, flag_lists):
+        flags = sorted({flag for row in flag_lists for flag in row})
+        flag_bits = {flag: bit for bit, flag in enumerate(flags)}
+        n_words = max(1, -(-len(flags) // WORD_BITS))
+        bitsets = np.zeros((len(flag_lists), n_words), dtype=np.uint64)
+        for row, row_flags in enumerate(flag_lists):
+            for flag in row_flags:
+                bit = flag_bits[flag]
+                bitsets[row, bit // WORD_BITS] |= np.uint64(1 << (bit % WORD_BITS))
+        bitsets.flags.writeable = False
+        return cls(flag_bits, bitsets)
+
+    def query_bits(self, flags):
+        query = np.zeros(self.bitsets.shape[1], dtype=np.uint64)
+        for flag in flags:
+            bit = self.flag_bits.get(flag)
+            if bit is not None:
+                query[bit // WORD_BITS] |= np.uint64(1 << (bit % WORD_BITS))
+        return query
+
+    def match(self, flags, mode='any'):
+        # Boolean row mask: 'any' keeps foods with at least one of the flags, 'all' those with every flag
+        query = self.query_bits(flags)
+        if mode == 'all':
+            if any(flag not in self.flag_bits for flag in flags):
+                return np.zeros(len(self.bitsets), dtype=bool)
+            return ((self.bitsets & query) == query).all(axis=1)
+        return ((self.bitsets & query) != 0).any(axis=1)
+
+    def matrix(self, rows=None):
+        # (rows x flags) boolean matrix unpacked from the bitsets (all rows by default); column j is bit j
+        bitsets = np.ascontiguousarray(self.bitsets if rows is None else self.bitsets[rows])
+        bits = np.unpackbits(bitsets.view(np.uint8), axis=1, bitorder='little')
+        return bits[:, :len(self.flag_bits)].astype(bool)
+
+    def counts(self, rows=None):
+        # How many of the rows carry each flag, indexed by bit
+        return self.matrix(rows).sum(axis=0)
@@ -0,0 +1,127 @@
+import functools
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from nourishwell.profiling import profiled
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED_STATES = frozenset({DONE, FAILED, CANCELLED})
+
+LLM_WORKERS = int(os.environ.get('NOURISHWELL_LLM_WORKERS', '4'))
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+class Job:
+    # Handle shared between the worker thread and whichever session polls it. The worker reports
+    # progress through `append_partial` and should stop early once `cancelled` is set.
+
+    def __init__(self, key=None, profile=None):
+        self.id = uuid.uuid4().hex
+        self.key = key  # what the job was computed for, e.g. a selection fingerprint
+        self.profile = profile  # label to cProfile the job under (see nourishwell/profiling.py), or None
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._partial = []
+        self._cancel_event = threading.Event()
+        self._future = None
+
+    @property
+    def done(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def partial_text(self):
+        return ''.join(self._partial)
+
+    def append_partial(self, chunk):
+        self._partial.append(chunk)
+
+
+class JobExecutor:
+    # Process-wide bounded worker pool. At most `max_workers` jobs run at once across all
+    # sessions, and at most `max_pending` may be waiting or running before submit() refuses.
+
+    def __init__(self, max_workers=LLM_WORKERS, max_pending=64, retention_seconds=600):
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='nourishwell-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, key=None, profile=None, **kwargs):
+        # `fn(job, *args, **kwargs)` runs on a worker thread; its return value becomes job.result
+        job = Job(key=key, profile=profile)
+        with self._lock:
+            self._prune()
+            pending = sum(1 for other in self._jobs.values() if not other.done)
+            if pending >= self.max_pending:
+                raise QueueFullError("Too many meal plans are being generated right now. Please try again in a moment.")
+            self._jobs[job.id] = job
+        job._future = self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        # Pollers read jobs without a lock, so `status` is always written last: once a job is done,
+        # its finished_at, result and error are already set
+        if job.cancelled:
+            job.finished_at = time.time()
+            job.status = CANCELLED
+            return
+        job.started_at = time.time()
+        job.status = RUNNING
+        status = FAILED
+        try:
+            with profiled(job.profile or fn.__name__, enabled=job.profile is not None):
+                result = fn(job, *args, **kwargs)
+        except Exception as e:
+            job.error = str(e)
+        else:
+            job.result = result
+            status = CANCELLED if job.cancelled else DONE
+        finally:
+            job.finished_at = time.time()
+            job.status = status
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None or job.done:
+            return
+        job._cancel_event.set()
+        if job._future is not None and job._future.cancel():
+            # Never started: nothing else will mark it finished
+            job.finished_at = time.time()
+            job.status = CANCELLED
+
+    def forget(self, job_id):
+        self.cancel(job_id)
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _prune(self):
+        # Drop finished jobs nobody came back for (e.g. the browser tab was closed)
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done and (job.finished_at or 0) < cutoff]:
+            del self._jobs[job_id]
+
+
+@functools.lru_cache(maxsize=None)
+def default_executor():
+    return JobExecutor()
@@ -0,0 +1,124 @@
+import functools
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Point this at a local stub (python -m nourishwell.stub_server) to run without the real API
+LLM_API_BASE = os.environ.get('LLM_API_BASE', 'https://generativelanguage.googleapis.com/v1beta')
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    # Raised without touching the network while the upstream is considered unhealthy
+    pass
+
+
+class CircuitBreaker:
+    # closed -> (failure_threshold consecutive failures) -> open -> (reset_timeout) -> half-open:
+    # one trial call is let through; success closes the circuit, failure re-opens it.
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class LLMClient:
+    # One pooled keep-alive session per process with connect/read timeouts, exponential backoff
+    # with full jitter on 429/5xx and connection errors, and a circuit breaker in front of it all.
+
+    def __init__(self, base_url=LLM_API_BASE, connect_timeout=3.05, read_timeout=60.0, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, breaker=None, pool_size=32):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def backoff_delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def post(self, path, payload, headers=None, stream=False, before_attempt=None):
+        # `before_attempt()` runs before every request sent, retries included (e.g. a rate limiter)
+        if not self.breaker.allow():
+            raise CircuitOpenError("AI service is temporarily unavailable (too many recent failures). Please try again shortly.")
+
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            if before_attempt is not None:
+                before_attempt()
+            try:
+                response = self.session.post(url, json=payload, headers=headers, timeout=self.timeout, stream=stream)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if last_attempt:
+                    self.breaker.record_failure()
+                    raise
+                time.sleep(self.backoff_delay(attempt))
+                continue
+            except requests.exceptions.RequestException:
+                self.breaker.record_failure()
+                raise
+
+            if response.status_code in RETRY_STATUSES and not last_attempt:
+                response.close()
+                time.sleep(self.backoff_delay(attempt, response))
+                continue
+
+            if response.status_code in RETRY_STATUSES:
+                self.breaker.record_failure()
+            else:
+                # Other 4xx are the caller's fault, not a sign of an unhealthy upstream
+                self.breaker.record_success()
+            return response
+
+
+@functools.lru_cache(maxsize=None)
+def default_client():
+    return LLMClient()
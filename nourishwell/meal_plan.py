@@ -0,0 +1,201 @@
+import contextlib
+import json
+
+import requests
+
+from nourishwell.data import FOOD_ID_COL
+from nourishwell.llm_client import default_client
+from nourishwell.offline_plan import build_offline_meal_plan
+from nourishwell.plan_cache import default_plan_cache, plan_fingerprint
+from nourishwell.prompt import PROMPT_TOKEN_BUDGET, build_food_context
+
+# Bump whenever the prompt wording changes so cached plans from the old prompt are not reused
+PROMPT_VERSION = 2
+GEMINI_MODEL = 'gemini-2.0-flash'
+GENERATION_CONFIG = {
+    "temperature": 0.7, # Moderate creativity
+    "topK": 40,
+    "topP": 0.95,
+    "maxOutputTokens": 1500 # Sufficient length for a detailed plan
+}
+NO_PLAN_MESSAGE = "No meal plan could be generated by the AI at this time. Please try again or adjust your selected foods."
+
+
+class MealPlanError(Exception):
+    # Carries the user-facing message shown in place of a plan
+    pass
+
+
+def build_prompt(selected_foods_df, token_budget=PROMPT_TOKEN_BUDGET):
+    # Only the fields the prompt needs, citation-free and compactly serialized (see nourishwell/prompt.py)
+    food_context = build_food_context(selected_foods_df, token_budget)
+
+    # Constructing a detailed prompt for the LLM
+    return f"""
+    You are an expert nutritionist specializing in anti-inflammatory diets for women's health.
+    Based ONLY on the following list of anti-inflammatory foods selected by the user, create a personalized one-day meal plan.
+    The meal plan should include Breakfast, Lunch, Dinner, and optionally 1-2 snacks.
+    For each meal, suggest a specific dish or usage idea that clearly incorporates 1-3 of the provided foods.
+    Briefly explain *why* the suggested meal is beneficial for women's anti-inflammatory needs, referencing the anti-inflammatory properties of the ingredients from the list.
+    Be creative and practical, using each food's 'usage' idea from the data where appropriate, but feel free to combine ideas.
+    Focus on balancing meals and ensuring they are genuinely anti-inflammatory.
+    The output should be in a clear, easy-to-read Markdown format.
+
+    Selected Anti-Inflammatory Foods (one JSON object per food; 'why' is its anti-inflammatory mechanism, 'helps_with' the women's health concerns it supports):
+    {food_context}
+
+    Please generate the meal plan:
+    """
+
+
+def build_payload(prompt):
+    return {
+        "contents": [
+            {
+                "role": "user",
+                "parts": [{"text": prompt}]
+            }
+        ],
+        "generationConfig": GENERATION_CONFIG
+    }
+
+
+def parse_response(result):
+    if result and 'candidates' in result and result['candidates']:
+        return result['candidates'][0]['content']['parts'][0]['text']
+    return None
+
+
+def parse_stream_chunk(result):
+    # Streamed chunks may carry only metadata (e.g. the final finishReason chunk)
+    parts = (result.get('candidates') or [{}])[0].get('content', {}).get('parts', [])
+    return ''.join(part.get('text', '') for part in parts)
+
+
+def api_headers(api_key):
+    # Key goes in a header rather than the URL so it never shows up in error messages
+    return {
+        'Content-Type': 'application/json',
+        'x-goog-api-key': api_key
+    }
+
+
+def request_meal_plan(prompt, api_key, client=None, before_attempt=None):
+    client = default_client() if client is None else client
+    headers = api_headers(api_key)
+
+    try:
+        response = client.post(f"models/{GEMINI_MODEL}:generateContent", build_payload(prompt), headers=headers,
+                               before_attempt=before_attempt)
+        response.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
+        generated_text = parse_response(response.json())
+    except requests.exceptions.RequestException as e:
+        raise MealPlanError(f"Error communicating with AI: {e}") from e
+    except json.JSONDecodeError as e:
+        raise MealPlanError("Error: Could not decode AI response (invalid JSON).") from e
+    except KeyError as e:
+        raise MealPlanError("Error: Unexpected AI response format.") from e
+    if generated_text is None:
+        raise MealPlanError(NO_PLAN_MESSAGE)
+    return generated_text
+
+
+def request_meal_plan_stream(prompt, api_key, client=None):
+    # Yields text chunks from the server-sent-events endpoint as soon as each one arrives
+    client = default_client() if client is None else client
+
+    try:
+        response = client.post(f"models/{GEMINI_MODEL}:streamGenerateContent?alt=sse", build_payload(prompt),
+                               headers=api_headers(api_key), stream=True)
+        with response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                text = parse_stream_chunk(json.loads(line[len('data:'):]))
+                if text:
+                    yield text
+    except requests.exceptions.RequestException as e:
+        raise MealPlanError(f"Error communicating with AI: {e}") from e
+    except json.JSONDecodeError as e:
+        raise MealPlanError("Error: Could not decode AI response (invalid JSON).") from e
+    except (KeyError, IndexError, AttributeError) as e:
+        raise MealPlanError("Error: Unexpected AI response format.") from e
+
+
+def selection_fingerprint(selected_foods_df):
+    return plan_fingerprint(
+        selected_foods_df[FOOD_ID_COL].tolist(),
+        prompt_version=PROMPT_VERSION,
+        model=GEMINI_MODEL,
+        generation_config=GENERATION_CONFIG,
+        token_budget=PROMPT_TOKEN_BUDGET,
+    )
+
+
+def generate_meal_plan(selected_foods_df, api_key, cache=None, client=None, before_request=None):
+    # Returns (plan Markdown, served_from_cache) or raises MealPlanError. Successful plans are
+    # cached by selection fingerprint, so a repeated selection never reaches the API.
+    # `before_request()` (e.g. a rate limiter) runs before each request actually sent to the API,
+    # so retries of a 429 or 5xx go through it too.
+    if not api_key:
+        raise MealPlanError("Error: API Key not configured.")
+
+    cache = default_plan_cache() if cache is None else cache
+    cache_key = selection_fingerprint(selected_foods_df)
+    cached_plan = cache.get(cache_key)
+    if cached_plan is not None:
+        return cached_plan, True
+
+    generated_text = request_meal_plan(build_prompt(selected_foods_df), api_key, client=client,
+                                       before_attempt=before_request)
+    cache.put(cache_key, generated_text)
+    return generated_text, False
+
+
+def get_gemini_meal_plan(selected_foods_df, api_key, cache=None, client=None):
+    # Returns the plan Markdown, or a user-facing error message
+    try:
+        return generate_meal_plan(selected_foods_df, api_key, cache=cache, client=client)[0]
+    except MealPlanError as e:
+        return str(e)
+
+
+def stream_gemini_meal_plan(selected_foods_df, api_key, cache=None, client=None):
+    # Streaming counterpart of get_gemini_meal_plan: yields Markdown chunks and raises MealPlanError
+    # on failure. A cached plan is yielded in one piece; a freshly streamed one is cached once complete.
+    if not api_key:
+        raise MealPlanError("Error: API Key not configured.")
+
+    cache = default_plan_cache() if cache is None else cache
+    cache_key = selection_fingerprint(selected_foods_df)
+    cached_plan = cache.get(cache_key)
+    if cached_plan is not None:
+        yield cached_plan
+        return
+
+    chunks = []
+    for chunk in request_meal_plan_stream(build_prompt(selected_foods_df), api_key, client=client):
+        chunks.append(chunk)
+        yield chunk
+    if not chunks:
+        raise MealPlanError(NO_PLAN_MESSAGE)
+    cache.put(cache_key, ''.join(chunks))
+
+
+def meal_plan_job(job, selected_foods_df, api_key, fallback=True):
+    # Background-job body (see nourishwell/jobs.py): streams into job's partial text so the
+    # polling page can show progress, and stops reading as soon as the job is cancelled.
+    # With `fallback`, an unreachable AI yields the instant offline plan instead of just an error.
+    stream = stream_gemini_meal_plan(selected_foods_df, api_key)
+    try:
+        with contextlib.closing(stream):
+            for chunk in stream:
+                if job.cancelled:
+                    return None
+                job.append_partial(chunk)
+    except MealPlanError as e:
+        if not fallback:
+            return str(e)
+        return f"> {e} Here is an instant plan built from your selections instead.\n\n{build_offline_meal_plan(selected_foods_df)}"
+    return job.partial_text
@@ -0,0 +1,180 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from nourishwell.flags import FlagIndex
+
+# 'Key Vitamins & Minerals' is free text ("Omega-3 (EPA/DHA), Vitamin D, ..., High-quality Protein.26").
+# At load time each value is parsed into canonical nutrient names, and every food also carries the
+# ancestors of its nutrients ("Omega-3 (ALA)" -> "Omega-3"), so asking for a broad nutrient finds all
+# of its forms. The result is a FlagIndex over nutrient names: a food x nutrient bit matrix.
+
+ITEM_SPLIT_RE = re.compile(r',\s*(?![^()]*\))')  # commas outside parentheses
+CITATION_RE = re.compile(r'\.\d+$')  # source reference glued to the last item: "Protein.26"
+QUALIFIED_RE = re.compile(r'(?P<head>[^(]*)\((?P<inner>[^)]*)')  # "Head (a, b)"
+
+# Child -> parent. Canonical names are the keys and values here, plus the SYNONYMS values.
+NUTRIENT_PARENTS = {
+    'Omega-3 (ALA)': 'Omega-3',
+    'Omega-3 (EPA/DHA)': 'Omega-3',
+    'Oleic Acid': 'Monounsaturated Fats',
+    'Vitamin A': 'Vitamins',
+    'Vitamin C': 'Vitamins',
+    'Vitamin D': 'Vitamins',
+    'Vitamin E': 'Vitamins',
+    'Vitamin K': 'Vitamins',
+    'Vitamin K1': 'Vitamin K',
+    'Vitamin K2': 'Vitamin K',
+    'B Vitamins': 'Vitamins',
+    'Vitamin B1': 'B Vitamins',
+    'Vitamin B2': 'B Vitamins',
+    'Vitamin B3': 'B Vitamins',
+    'Vitamin B6': 'B Vitamins',
+    'Vitamin B12': 'B Vitamins',
+    'Folate': 'B Vitamins',
+    'Calcium': 'Minerals',
+    'Copper': 'Minerals',
+    'Iron': 'Minerals',
+    'Magnesium': 'Minerals',
+    'Manganese': 'Minerals',
+    'Phosphorus': 'Minerals',
+    'Potassium': 'Minerals',
+    'Selenium': 'Minerals',
+    'Zinc': 'Minerals',
+    'Beta-carotene': 'Carotenoids',
+    'Lutein': 'Carotenoids',
+    'Lycopene': 'Carotenoids',
+    'Phytoene': 'Carotenoids',
+    'Zeaxanthin': 'Carotenoids',
+    'Anthocyanins': 'Flavonoids',
+    'Kaempferol': 'Flavonoids',
+    'Proanthocyanidins': 'Flavonoids',
+    'Quercetin': 'Flavonoids',
+    'Flavonoids': 'Polyphenols',
+    'Chlorogenic Acid': 'Polyphenols',
+    'Curcumin': 'Polyphenols',
+    'Ferulic Acid': 'Polyphenols',
+    'Gingerol': 'Polyphenols',
+    'Hydroxytyrosol': 'Polyphenols',
+    'Oleocanthal': 'Polyphenols',
+    'Oleuropein': 'Polyphenols',
+    'Sinapic Acid': 'Polyphenols',
+    'Tyrosol': 'Polyphenols',
+    'Sulforaphane': 'Isothiocyanates',
+    'Allicin': 'Sulfur Compounds',
+    'Diallyl Sulfide': 'Sulfur Compounds',
+    'Bifidobacterium': 'Probiotics',
+    'Lactobacillus': 'Probiotics',
+}
+# Other spellings (lower case) -> canonical name
+SYNONYMS = {
+    'omega 3': 'Omega-3',
+    'omega-3 fatty acids': 'Omega-3',
+    'ala': 'Omega-3 (ALA)',
+    'alpha-linolenic acid': 'Omega-3 (ALA)',
+    'epa': 'Omega-3 (EPA/DHA)',
+    'dha': 'Omega-3 (EPA/DHA)',
+    'epa/dha': 'Omega-3 (EPA/DHA)',
+    'high-quality protein': 'Protein',
+    'complete protein': 'Protein',
+    'fibre': 'Fiber',
+    'dietary fiber': 'Fiber',
+    'monounsaturated fat': 'Monounsaturated Fats',
+    'vitamin b complex': 'B Vitamins',
+    'thiamine': 'Vitamin B1',
+    'riboflavin': 'Vitamin B2',
+    'niacin': 'Vitamin B3',
+    'pyridoxine': 'Vitamin B6',
+    'cobalamin': 'Vitamin B12',
+    'folic acid': 'Folate',
+    'vitamin b9': 'Folate',
+    'beta carotene': 'Beta-carotene',
+    'phenolic compounds': 'Polyphenols',
+    'bifidobacterium strains': 'Bifidobacterium',
+    'lactobacillus strains': 'Lactobacillus',
+}
+# Group names whose parenthesized items are bare letters or numbers: "Vitamins (A, C, K)", "B vitamins (B6, B12)"
+ITEM_PREFIXES = {'vitamins': 'vitamin ', 'b vitamins': 'vitamin '}
+
+# Shown on the Meal Plan page: the nutrients the catalog's mechanisms credit most for women's inflammation
+KEY_NUTRIENTS = (
+    'Omega-3', 'Fiber', 'Polyphenols', 'Magnesium', 'Folate', 'Iron', 'Calcium', 'Zinc', 'Selenium',
+    'Vitamin C', 'Vitamin D', 'Vitamin E', 'Vitamin B12', 'Protein',
+)
+
+_known = {name.lower(): name for pair in NUTRIENT_PARENTS.items() for name in pair}
+_known.update((name.lower(), name) for name in SYNONYMS.values())
+_known.update(SYNONYMS)
+_groups = set(NUTRIENT_PARENTS.values())
+
+
+def clean_name(text):
+    return ' '.join(CITATION_RE.sub('', text.strip()).strip(' .;').split())
+
+
+def known_nutrient(text, prefix=''):
+    # Canonical name for a spelling we know, else None
+    key = clean_name(text).lower()
+    return _known.get(key) or (_known.get(prefix + key) if prefix else None)
+
+
+def canonical_nutrient(text):
+    # Canonical name, or the cleaned text itself for a nutrient the tables don't list yet
+    return known_nutrient(text) or clean_name(text)
+
+
+def with_ancestors(names):
+    expanded = []
+    for name in names:
+        while name is not None and name not in expanded:
+            expanded.append(name)
+            name = NUTRIENT_PARENTS.get(name)
+    return expanded
+
+
+def parse_nutrients(value):
+    # Canonical nutrients in a 'Key Vitamins & Minerals' value, with their ancestors
+    if not isinstance(value, str):
+        return ()
+    names = []
+    for item in ITEM_SPLIT_RE.split(CITATION_RE.sub('', value.strip())):
+        if not clean_name(item):
+            continue
+        match = QUALIFIED_RE.match(item)
+        whole = known_nutrient(item)
+        if whole or not match:
+            names.append(whole or clean_name(item))
+            continue
+        # "Head (a, b)": the head is a nutrient and the known parenthesized items are more specific
+        # ones ("Vitamin A (Beta-carotene)"); qualifiers we don't know ("complete") are dropped
+        head = clean_name(match['head'])
+        if head:
+            names.append(canonical_nutrient(head))
+        prefix = ITEM_PREFIXES.get(head.lower(), '')
+        names.extend(filter(None, (known_nutrient(part, prefix) for part in match['inner'].split(','))))
+    return tuple(with_ancestors(names))
+
+
+def build_nutrient_index(values):
+    # Each distinct text is parsed once (synthetic and real catalogs repeat values a lot)
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    index = FlagIndex.from_flag_lists([parse_nutrients(value) for value in uniques])
+    bitsets = index.bitsets[codes]
+    bitsets.flags.writeable = False
+    return FlagIndex(index.flag_bits, bitsets)
+
+
+def nutrient_coverage(index, rows):
+    # {nutrient: how many of the rows provide it}, for the nutrients at least one of them provides
+    counts = index.counts(rows)
+    return {name: int(counts[bit]) for name, bit in sorted(index.flag_bits.items()) if counts[bit]}
+
+
+def shared_nutrients(index, row, other_row):
+    # Nutrients both foods provide, most specific first: a group is left out when a member is shared,
+    # and groups they share through different members ("Minerals") come last
+    names = sorted(index.flag_bits, key=index.flag_bits.get)
+    shared = [names[bit] for bit in np.flatnonzero(index.matrix([row, other_row]).all(axis=0))]
+    implied = {NUTRIENT_PARENTS.get(name) for name in shared}
+    return sorted((name for name in shared if name not in implied), key=lambda name: name in _groups)
@@ -0,0 +1,138 @@
+from nourishwell.data import split_flags
+from nourishwell.prompt import clean_text, shorten
+
+MEAL_SLOTS = ('Breakfast', 'Lunch', 'Dinner', 'Snack')
+SLOT_CAPACITY = {'Breakfast': 3, 'Lunch': 3, 'Dinner': 3, 'Snack': 2}
+SLOT_ICONS = {'Breakfast': '🌅', 'Lunch': '🥗', 'Dinner': '🍲', 'Snack': '🍎'}
+
+# Which meal a food naturally belongs to, from the top level of its Sub-category ("Fish > Salmon" -> "fish")
+SUBCATEGORY_AFFINITY = {
+    'fish': {'Dinner': 2, 'Lunch': 1},
+    'meat': {'Dinner': 2, 'Lunch': 1},
+    'poultry': {'Breakfast': 1, 'Dinner': 1},
+    'fruit': {'Breakfast': 1, 'Snack': 1},
+    'vegetable': {'Dinner': 1, 'Lunch': 1},
+    'grain': {'Lunch': 2, 'Dinner': 1},
+    'legume': {'Lunch': 2, 'Dinner': 1},
+    'nut': {'Snack': 2, 'Breakfast': 1},
+    'seed': {'Breakfast': 2, 'Snack': 1},
+    'dairy': {'Breakfast': 2, 'Snack': 1},
+}
+# ...and from the words used in its form and recipe ideas
+SLOT_KEYWORDS = {
+    'Breakfast': ('breakfast', 'smoothie', 'oat', 'porridge', 'yogurt', 'parfait', 'scrambled', 'omelet', 'toast', 'granola', 'pudding', 'cereal'),
+    'Lunch': ('salad', 'bowl', 'wrap', 'sandwich', 'soup', 'lunch', 'hummus', 'dressing'),
+    'Dinner': ('dinner', 'roast', 'baked', 'grilled', 'stir-fr', 'curry', 'curries', 'stew', 'broil', 'steak', 'sauté', 'saute'),
+    'Snack': ('snack', 'handful', 'trail mix', 'dip', 'hard-boiled', 'on its own'),
+}
+# Flavour and fat sources are folded into meals as accents instead of taking a meal slot
+ACCENT_SUBCATEGORIES = ('spice', 'herb', 'oil', 'fermented vegetable')
+
+
+def sub_category_root(food):
+    return food['Sub-category'].split('>')[0].strip().lower()
+
+
+def slot_affinity(food):
+    affinity = dict.fromkeys(MEAL_SLOTS, 0)
+    for slot, weight in SUBCATEGORY_AFFINITY.get(sub_category_root(food), {}).items():
+        affinity[slot] += weight
+    text = f"{food['Best Type/Form']} {food['Sample Recipe/Usage']}".lower()
+    for slot, keywords in SLOT_KEYWORDS.items():
+        affinity[slot] += sum(1 for keyword in keywords if keyword in text)
+    return affinity
+
+
+def select_mains(mains, capacity):
+    # Greedy weighted set cover: when there are more foods than meal spots, keep the ones that add
+    # the most not-yet-covered health flags (score breaks ties), the rest become "also try" foods.
+    if len(mains) <= capacity:
+        return mains, []
+    remaining = list(mains)
+    chosen, covered = [], set()
+    while remaining and len(chosen) < capacity:
+        best = max(remaining, key=lambda food: (len(set(food['flags']) - covered), food['score'], food['name']))
+        remaining.remove(best)
+        chosen.append(best)
+        covered.update(best['flags'])
+    return chosen, remaining
+
+
+def assign_meals(selected_foods_df):
+    # Deterministic slotting of the selected foods. Returns ({slot: [food, ...]}, {slot: [accent, ...]}, extras)
+    foods = []
+    for record in selected_foods_df.to_dict(orient='records'):
+        food = {key: clean_text(value) for key, value in record.items()}
+        food['name'] = food['Food Item']
+        food['score'] = int(record.get('Score (0–10)') or 0)
+        food['flags'] = split_flags(record.get('Flags (Female Health Issues)'))
+        food['affinity'] = slot_affinity(food)
+        foods.append(food)
+
+    accents, mains = [], []
+    for food in foods:
+        (accents if sub_category_root(food).startswith(ACCENT_SUBCATEGORIES) else mains).append(food)
+    mains, extras = select_mains(mains, sum(SLOT_CAPACITY.values()))
+
+    meals = {slot: [] for slot in MEAL_SLOTS}
+    slot_flags = {slot: set() for slot in MEAL_SLOTS}
+    # Place the most opinionated foods first so flexible ones fill the gaps
+    for food in sorted(mains, key=lambda food: (-max(food['affinity'].values()), -food['score'], food['name'])):
+        def slot_value(slot):
+            meal = meals[slot]
+            same_category = any(other['Category'] == food['Category'] for other in meal)
+            new_flags = len(set(food['flags']) - slot_flags[slot])
+            return 3 * food['affinity'][slot] - 1.5 * len(meal) - 2 * same_category + 0.5 * new_flags
+        open_slots = [slot for slot in MEAL_SLOTS if len(meals[slot]) < SLOT_CAPACITY[slot]]
+        best_slot = max(open_slots, key=lambda slot: (slot_value(slot), -MEAL_SLOTS.index(slot)))
+        meals[best_slot].append(food)
+        slot_flags[best_slot].update(food['flags'])
+
+    meal_accents = {slot: [] for slot in MEAL_SLOTS}
+    for food in sorted(accents, key=lambda food: food['name']):
+        # Accents go where their usage points, otherwise to the main meal with the fewest accents
+        best_slot = max(('Breakfast', 'Lunch', 'Dinner'), key=lambda slot: (
+            food['affinity'][slot], bool(meals[slot]), -len(meal_accents[slot]), slot == 'Dinner'))
+        meal_accents[best_slot].append(food)
+    return meals, meal_accents, extras
+
+
+def dish_idea(food):
+    # First recipe idea of the food, e.g. "Grilled salmon salad; baked salmon..." -> "Grilled salmon salad"
+    idea = food['Sample Recipe/Usage'].split(';')[0].strip().rstrip('.')
+    return idea or food['name']
+
+
+def build_offline_meal_plan(selected_foods_df):
+    # Markdown one-day plan in the same shape as the AI plan, computed locally in milliseconds
+    meals, meal_accents, extras = assign_meals(selected_foods_df)
+    lines = ["## Your Anti-Inflammatory Day", ""]
+    covered = set()
+    for slot in MEAL_SLOTS:
+        foods = meals[slot] + meal_accents[slot]
+        if not foods:
+            continue
+        lead = meals[slot][0] if meals[slot] else foods[0]
+        lines.append(f"### {SLOT_ICONS[slot]} {slot}: {dish_idea(lead)}")
+        if meals[slot]:
+            line_break = "  " if meal_accents[slot] else "" # Markdown hard line break
+            lines.append(f"**With:** {', '.join(food['name'] for food in meals[slot])}{line_break}")
+        if meal_accents[slot]:
+            boosters = ', '.join(f"{food['name']} ({shorten(dish_idea(food), 60)})" for food in meal_accents[slot])
+            lines.append(f"**Boost it with:** {boosters}")
+        lines.append("")
+        lines.append("**Why it helps:**")
+        for food in foods:
+            lines.append(f"- **{food['name']}**: {shorten(food['Why Anti-Inflammatory (for Women)'], 180)}")
+            covered.update(food['flags'])
+        lines.append("")
+
+    if extras:
+        lines.append("### Also worth working in this week")
+        lines.extend(f"- **{food['name']}**: {dish_idea(food)}" for food in extras)
+        lines.append("")
+    if covered:
+        lines.append(f"**Health concerns supported today:** {', '.join(sorted(covered))}")
+        lines.append("")
+    lines.append("_Instant plan built from your selected foods (no AI call)._")
+    return "\n".join(lines)
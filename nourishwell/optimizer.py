@@ -0,0 +1,130 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+from nourishwell.data import CATEGORY_COL, FOOD_COL, SCORE_COL
+
+# Objective weights: covering a chosen concern dominates, then food score, then variety
+W_COVER = 10.0  # per chosen concern newly covered on the day
+W_SCORE = 1.0  # times Score / 10
+W_BREADTH = 0.05  # per health flag the food carries at all
+W_REPEAT = 0.6  # per earlier day the food was already used
+W_YESTERDAY = 1.5  # extra penalty for serving the same food on consecutive days
+
+
+@dataclass(frozen=True)
+class MultiDayPlan:
+    days: tuple  # one tuple of catalog row positions per day
+    concerns: tuple
+    covered: tuple  # one tuple of covered concerns per day
+
+    @property
+    def coverage(self):
+        # Average share of the chosen concerns covered per day
+        if not self.concerns or not self.days:
+            return 1.0
+        return sum(len(day) for day in self.covered) / (len(self.concerns) * len(self.days))
+
+    def to_markdown(self, catalog):
+        names = catalog.df[FOOD_COL].to_numpy()
+        lines = ["| Day | Foods | Concerns covered |", "|---|---|---|"]
+        for day_number, (rows, covered) in enumerate(zip(self.days, self.covered), start=1):
+            coverage = f"{len(covered)}/{len(self.concerns)}" if self.concerns else "–"
+            lines.append(f"| {day_number} | {', '.join(names[row] for row in rows)} | {coverage} |")
+        uses = np.bincount(np.concatenate([np.asarray(rows, dtype=np.int64) for rows in self.days]), minlength=len(names))
+        lines.append("")
+        lines.append(f"**Average daily concern coverage:** {self.coverage:.0%} · **Distinct foods:** {int((uses > 0).sum())} · "
+                     f"**Most repeated:** {names[int(uses.argmax())]} ({int(uses.max())} days)")
+        return "\n".join(lines)
+
+
+def food_flag_matrix(catalog):
+    # (foods x flags) boolean matrix unpacked from the flag bitsets; column j is flag bit j
+    return catalog.flag_index.matrix()
+
+
+def food_category_matrix(catalog):
+    codes = catalog.df[CATEGORY_COL].cat.codes.to_numpy()
+    return codes[:, None] == np.arange(len(catalog.df[CATEGORY_COL].cat.categories))
+
+
+def optimize_multi_day_plan(catalog, concerns, days=7, foods_per_day=6, max_repeats=None, max_per_category=2,
+                            rows=None, local_search_passes=2):
+    # Greedy day-by-day set cover of `concerns` with swap-based local search. Each day gets up to
+    # `foods_per_day` distinct foods, at most `max_per_category` from one category; a food is used on
+    # at most `max_repeats` days. `rows` restricts the candidates (e.g. to the user's selection).
+    flag_bits = catalog.flag_index.flag_bits
+    concerns = tuple(concern for concern in concerns if concern in flag_bits)
+    candidates = np.arange(len(catalog)) if rows is None else np.unique(np.asarray(list(rows), dtype=np.int64))
+    n_candidates = len(candidates)
+    if n_candidates == 0 or days <= 0:
+        return MultiDayPlan(days=(), concerns=concerns, covered=())
+    per_day = min(foods_per_day, n_candidates)
+    if max_repeats is None:
+        # Roughly every third day at most, but loose enough that small candidate pools can still fill every day
+        max_repeats = max(2, math.ceil(days / 3), math.ceil(days * per_day / n_candidates))
+
+    flags = food_flag_matrix(catalog)[candidates]
+    concern_matrix = flags[:, [flag_bits[concern] for concern in concerns]].astype(np.float32)  # candidates x concerns
+    category_matrix = food_category_matrix(catalog)[candidates].astype(np.float32)  # candidates x categories
+    base_value = (W_SCORE * catalog.df[SCORE_COL].to_numpy()[candidates] / 10.0 + W_BREADTH * flags.sum(axis=1)).astype(np.float32)
+
+    used = np.zeros(n_candidates, dtype=np.int32)
+    last_day = np.full(n_candidates, -2, dtype=np.int32)
+    plan_days, plan_covered = [], []
+
+    for day in range(days):
+        static_value = base_value - W_REPEAT * used - W_YESTERDAY * (last_day == day - 1)
+        repeat_ok = used < max_repeats
+
+        def allowed_mask(in_day, category_counts):
+            category_full = (category_matrix @ (category_counts >= max_per_category).astype(np.float32)) > 0
+            allowed = repeat_ok & ~in_day & ~category_full
+            if not allowed.any():  # relax the category cap, then the repeat cap, rather than leave a gap
+                allowed = repeat_ok & ~in_day
+            if not allowed.any():
+                allowed = ~in_day
+            return allowed
+
+        chosen = []
+        in_day = np.zeros(n_candidates, dtype=bool)
+        uncovered = np.ones(len(concerns), dtype=np.float32)
+        category_counts = np.zeros(category_matrix.shape[1], dtype=np.float32)
+        for _ in range(per_day):
+            allowed = allowed_mask(in_day, category_counts)
+            gain = W_COVER * (concern_matrix @ uncovered) + static_value
+            best = int(np.argmax(np.where(allowed, gain, -np.inf)))
+            chosen.append(best)
+            in_day[best] = True
+            uncovered *= 1.0 - concern_matrix[best]
+            category_counts += category_matrix[best]
+
+        # Local search: swap a chosen food for an outside one whenever that raises the day's objective
+        for _ in range(local_search_passes):
+            improved = False
+            for position, current in enumerate(chosen):
+                others = [food for food in chosen if food != current]
+                covered_by_others = concern_matrix[others].max(axis=0) if others else np.zeros(len(concerns), dtype=np.float32)
+                still_uncovered = 1.0 - covered_by_others
+                others_categories = category_counts - category_matrix[current]
+                in_day[current] = False
+                allowed = allowed_mask(in_day, others_categories)
+                in_day[current] = True
+                value = W_COVER * (concern_matrix @ still_uncovered) + static_value
+                replacement = int(np.argmax(np.where(allowed, value, -np.inf)))
+                if allowed[replacement] and value[replacement] > value[current] + 1e-6:
+                    chosen[position] = replacement
+                    in_day[current], in_day[replacement] = False, True
+                    category_counts = others_categories + category_matrix[replacement]
+                    improved = True
+            if not improved:
+                break
+
+        used[chosen] += 1
+        last_day[chosen] = day
+        day_covered = concern_matrix[chosen].max(axis=0) if concerns else np.zeros(0)
+        plan_days.append(tuple(int(row) for row in candidates[chosen]))
+        plan_covered.append(tuple(concern for concern, hit in zip(concerns, day_covered) if hit))
+
+    return MultiDayPlan(days=tuple(plan_days), concerns=concerns, covered=tuple(plan_covered))
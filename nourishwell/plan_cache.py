@@ -0,0 +1,102 @@
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+PLAN_CACHE_PATH = Path(os.environ.get(
+    'NOURISHWELL_PLAN_CACHE',
+    Path(__file__).resolve().parent.parent / '.cache' / 'meal_plans.sqlite3',
+))
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def plan_fingerprint(food_ids, **settings):
+    # Order-independent key for a selection: the same foods picked in any order share a plan. Keyed
+    # by food id, not name, so two catalog foods that share a name don't share a plan.
+    payload = {'foods': sorted(set(food_ids)), **settings}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class PlanCache:
+    # Disk-backed LRU + TTL cache shared by all sessions, worker threads and processes that
+    # point at the same SQLite file, and it survives server restarts.
+
+    def __init__(self, path=PLAN_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS plans ('
+                ' key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS plans_accessed ON plans (accessed)')
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:  # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute('SELECT value, created FROM plans WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if now - created > self.ttl_seconds:
+                conn.execute('DELETE FROM plans WHERE key = ?', (key,))
+                return None
+            conn.execute('UPDATE plans SET accessed = ? WHERE key = ?', (now, key))
+            return value
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO plans (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+                (key, value, now, now),
+            )
+            conn.execute('DELETE FROM plans WHERE created < ?', (now - self.ttl_seconds,))
+            # Evict least recently used entries beyond the size cap
+            conn.execute(
+                'DELETE FROM plans WHERE key IN ('
+                ' SELECT key FROM plans ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute('DELETE FROM plans')
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM plans').fetchone()[0]
+
+
+class NullPlanCache:
+    # Drop-in for PlanCache that never stores anything (e.g. batch runs that must hit the API)
+
+    def get(self, key):
+        return None
+
+    def put(self, key, value):
+        pass
+
+
+@functools.lru_cache(maxsize=None)
+def default_plan_cache():
+    return PlanCache()
@@ -0,0 +1,138 @@
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Off unless asked for: per rerun with ?profile=<token> (see debug_panel.py), or for every rerun and
+# background job with NOURISHWELL_PROFILE=1. The query parameter only works once
+# NOURISHWELL_PROFILE_TOKEN is set, and then only for people who know the token.
+PROFILE_ALL = os.environ.get('NOURISHWELL_PROFILE', '') not in ('', '0')
+PROFILE_TOKEN = os.environ.get('NOURISHWELL_PROFILE_TOKEN', '')
+PROFILE_DIR = Path(os.environ.get(
+    'NOURISHWELL_PROFILE_DIR',
+    Path(__file__).resolve().parent.parent / '.cache' / 'profiles',
+))
+PROFILE_TOP_N = int(os.environ.get('NOURISHWELL_PROFILE_TOP_N', '30'))
+PROFILE_KEEP = 200  # newest profiles kept on disk; older ones are deleted
+# What ProfileRun writes (<date>-<time>-<label slug>-<thread>.prof|.txt|.html); pruning touches nothing else
+PROFILE_FILE_RE = re.compile(r'\d{8}-\d{6}-[a-z0-9_]+-\d{4}\.(?:prof|txt|html)')
+# 'pyinstrument' uses that sampling profiler when it is installed (HTML + text, no .prof); default cProfile
+PROFILER = os.environ.get('NOURISHWELL_PROFILER', 'cprofile')
+
+_active = threading.local()  # profilers hook the thread they are started on
+_write_lock = threading.Lock()
+
+
+def _pyinstrument_profiler():
+    if PROFILER != 'pyinstrument':
+        return None
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        return None
+    return Profiler(async_mode='disabled')
+
+
+class ProfileRun:
+    # One profiled stretch of code on the current thread; stop() writes it to PROFILE_DIR
+
+    def __init__(self, label):
+        self.label = label
+        self.started_at = time.time()
+        self.paths = []
+        self.summary = ''
+        self._sampler = _pyinstrument_profiler()
+        self._profile = None if self._sampler else cProfile.Profile()
+
+    def start(self):
+        if self._sampler:
+            self._sampler.start()
+        else:
+            self._profile.enable()
+        return self
+
+    def stop(self):
+        if self._sampler:
+            self._sampler.stop()
+        else:
+            self._profile.disable()
+        self._write()
+        return self
+
+    def _write(self):
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', self.label).strip('_').lower() or 'profile'
+        stem = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))}-{slug}-{threading.get_ident() % 10000:04d}"
+        with _write_lock:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            if self._sampler:
+                self.summary = self._sampler.output_text(unicode=True, color=False)
+                html_path = PROFILE_DIR / f'{stem}.html'
+                html_path.write_text(self._sampler.output_html(), encoding='utf-8')
+                self.paths.append(html_path)
+            else:
+                prof_path = PROFILE_DIR / f'{stem}.prof'
+                self._profile.dump_stats(prof_path)  # open with snakeviz, or pstats.Stats(path)
+                self.summary = top_functions(self._profile)
+                self.paths.append(prof_path)
+            summary_path = PROFILE_DIR / f'{stem}.txt'
+            summary_path.write_text(f"{self.label}\n\n{self.summary}", encoding='utf-8')
+            self.paths.append(summary_path)
+            prune_profiles()
+
+
+def top_functions(profile, limit=PROFILE_TOP_N):
+    # Hot functions two ways: by own time (where the CPU went) and by cumulative time (which calls were slow)
+    out = io.StringIO()
+    stats = pstats.Stats(profile, stream=out)
+    stats.strip_dirs()
+    out.write(f"Top {limit} functions by own time\n")
+    stats.sort_stats('tottime').print_stats(limit)
+    out.write(f"Top {limit} functions by cumulative time\n")
+    stats.sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def prune_profiles(keep=PROFILE_KEEP):
+    files = [path for path in PROFILE_DIR.iterdir() if path.is_file() and PROFILE_FILE_RE.fullmatch(path.name)]
+    files.sort(key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in files[keep * 2:]:  # a profile is two files
+        path.unlink(missing_ok=True)
+
+
+def start_profile(label):
+    # Only one profiler per thread: one left running by an interrupted rerun (st.rerun() raises
+    # mid-script) is switched off here rather than slowing every later rerun on this thread
+    leftover = getattr(_active, 'run', None)
+    if leftover is not None:
+        _active.run = None
+        leftover.stop()
+    try:
+        _active.run = ProfileRun(label).start()
+    except (ValueError, RuntimeError):  # another profiler already owns the interpreter (Python 3.12+ allows only one)
+        return None
+    return _active.run
+
+
+def stop_profile(run):
+    if run is None or getattr(_active, 'run', None) is not run:
+        return None
+    _active.run = None
+    return run.stop()
+
+
+@contextmanager
+def profiled(label, enabled=True):
+    # `with profiled('llm job', enabled=...)` for code outside the page script, e.g. worker threads
+    if not (enabled or PROFILE_ALL):
+        yield None
+        return
+    run = start_profile(label)
+    try:
+        yield run
+    finally:
+        stop_profile(run)
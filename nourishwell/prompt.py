@@ -0,0 +1,97 @@
+import json
+import math
+import os
+import re
+
+from nourishwell.search import strip_citations
+
+# Only what the nutritionist prompt actually uses, under short keys (source column -> prompt key)
+PROMPT_FIELDS = {
+    'Food Item': 'food',
+    'Category': 'category',
+    'Best Type/Form': 'form',
+    'Why Anti-Inflammatory (for Women)': 'why',
+    'Key Vitamins & Minerals': 'nutrients',
+    'Flags (Female Health Issues)': 'helps_with',
+    'Cautions': 'cautions',
+    'Sample Recipe/Usage': 'usage',
+}
+# Token budget for the food list part of the prompt
+PROMPT_TOKEN_BUDGET = int(os.environ.get('NOURISHWELL_PROMPT_TOKEN_BUDGET', '3000'))
+CHARS_PER_TOKEN = 4  # rough average for English text with this tokenizer family
+
+# Applied one after another until the food list fits the budget: (per-field character caps, fields to drop)
+SHRINK_STEPS = (
+    ({}, ()),
+    ({'why': 240, 'cautions': 120}, ()),
+    ({'why': 160, 'nutrients': 120, 'cautions': 80, 'usage': 120, 'form': 60}, ()),
+    ({'why': 100, 'nutrients': 80, 'usage': 80, 'form': 40}, ('cautions',)),
+    ({'why': 60, 'nutrients': 50, 'usage': 50}, ('cautions', 'form', 'helps_with')),
+)
+
+WHITESPACE_RE = re.compile(r'\s+')
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s')
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def clean_text(value):
+    if not isinstance(value, str):
+        return '' if value is None or value != value else str(value)  # value != value catches NaN
+    return WHITESPACE_RE.sub(' ', strip_citations(value)).strip()
+
+
+def shorten(text, max_chars):
+    # Prefer whole sentences ("summarize" to the leading ones), then fall back to a word boundary
+    if len(text) <= max_chars:
+        return text
+    kept = ''
+    for sentence in SENTENCE_END_RE.split(text):
+        candidate = f"{kept} {sentence}".strip()
+        if len(candidate) > max_chars:
+            break
+        kept = candidate
+    if kept:
+        return kept
+    return text[:max_chars].rsplit(' ', 1)[0].rstrip(',;:') + '…'
+
+
+def project_foods(selected_foods_df):
+    columns = [col for col in PROMPT_FIELDS if col in selected_foods_df.columns]
+    return [
+        {PROMPT_FIELDS[col]: clean_text(value) for col, value in zip(columns, row)}
+        for row in selected_foods_df[columns].itertuples(index=False, name=None)
+    ]
+
+
+def serialize_foods(records):
+    # One compact JSON object per line: no indentation, no spaces after separators, no empty fields
+    return '\n'.join(
+        json.dumps({key: value for key, value in record.items() if value}, separators=(',', ':'), ensure_ascii=False)
+        for record in records
+    )
+
+
+def build_food_context(selected_foods_df, token_budget=PROMPT_TOKEN_BUDGET):
+    # Returns the serialized food list, shrunk step by step until it fits within `token_budget`
+    records = project_foods(selected_foods_df)
+    for caps, dropped in SHRINK_STEPS:
+        shrunk = [
+            {key: shorten(value, caps[key]) if key in caps else value for key, value in record.items() if key not in dropped}
+            for record in records
+        ]
+        context = serialize_foods(shrunk)
+        if estimate_tokens(context) <= token_budget:
+            return context
+    # Still too long (a very large selection): keep as many foods as fit at the tightest step
+    lines = context.split('\n')
+    kept, used = [], 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget and kept:
+            break
+        kept.append(line)
+        used += cost
+    return '\n'.join(kept)
@@ -0,0 +1,150 @@
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from nourishwell.data import CATEGORY_COL, SCORE_COL
+from nourishwell.lru import LRUCache
+from nourishwell.nutrients import canonical_nutrient
+from nourishwell.search import query_terms, typo_budget
+from nourishwell.tracing import count
+
+# Score high-low, score low-high, food name A-Z (permutations in Catalog.sort_orders), and search
+# relevance, which is ranked per query and falls back to score high-low when there is no search
+SORT_MODES = ('desc', 'asc', 'alpha_asc', 'relevance')
+RESULT_CACHE_SIZE = int(os.environ.get('NOURISHWELL_RESULT_CACHE_SIZE', '512'))
+
+
+@dataclass(frozen=True)
+class FoodQuery:
+    # Everything the Food Discovery filters and sort decide; hashable, so it is the cache key
+    category: str = None  # None = all categories
+    min_score: int = 0
+    concerns: tuple = ()
+    concern_mode: str = 'any'
+    nutrients: tuple = ()  # canonical names; a food must provide all of them
+    search_terms: tuple = ()  # search.query_terms() output: ((term, as_prefix), ...)
+    sort: str = 'desc'
+
+    @classmethod
+    def build(cls, category=None, min_score=0, concerns=(), concern_mode='any', nutrients=(), search='', sort='desc'):
+        return cls(
+            category=category,
+            min_score=int(min_score),
+            concerns=tuple(sorted(concerns)) if concerns else (),
+            concern_mode=concern_mode if concerns else 'any',
+            nutrients=tuple(sorted({canonical_nutrient(name) for name in nutrients})),
+            search_terms=query_terms(search or ''),
+            sort=sort,
+        )
+
+    def without_search(self):
+        return (self.category, self.min_score, self.concerns, self.concern_mode, self.nutrients, self.sort)
+
+
+def refines(terms, broader_terms):
+    # True when every row matching `terms` also matches `broader_terms`. A whole-word term is only
+    # implied by itself; a prefix term by any term here that extends it (typing "omeg" -> "omega", or
+    # adding another word) and is allowed the same number of typos, since a term that gains a typo
+    # matches words its prefix did not
+    return all(
+        any(term.startswith(broader) and typo_budget(term) == typo_budget(broader) if broader_prefix
+            else (term, as_prefix) == (broader, False)
+            for term, as_prefix in terms)
+        for broader, broader_prefix in broader_terms
+    )
+
+
+class ResultCache(LRUCache):
+    # Process-wide LRU of final result row positions (display order, read-only arrays), keyed by
+    # (dataset version, FoodQuery). Shared by all sessions, so a rerun with unchanged filters
+    # (e.g. after "Add to Plan") is a dict lookup.
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE):
+        super().__init__(max_entries)
+
+    def put(self, key, rows):
+        rows.flags.writeable = False
+        super().put(key, rows)
+
+    def narrowest_superset(self, version, query):
+        # Smallest cached result for the same filters and sort whose search this query refines
+        base = query.without_search()
+        best = None
+        for (entry_version, entry_query), rows in self.items():
+            if (entry_version == version and entry_query.without_search() == base
+                    and refines(query.search_terms, entry_query.search_terms)
+                    and (best is None or len(rows) < len(best[1]))):
+                best = (entry_query, rows)
+        return best
+
+
+_result_cache = ResultCache()
+
+
+def filter_mask(catalog, query):
+    # Category, score, health-concern and nutrient filters as one boolean mask (search is applied separately)
+    df = catalog.df
+    mask = df[SCORE_COL].to_numpy() >= query.min_score
+    if query.category is not None:
+        mask &= (df[CATEGORY_COL] == query.category).to_numpy()
+    if query.concerns:
+        mask &= catalog.flag_index.match(query.concerns, mode=query.concern_mode)
+    if query.nutrients:
+        # "Magnesium AND Folate" is one bitwise compare per food word, not a scan of the nutrient text
+        mask &= catalog.nutrient_index.match(query.nutrients, mode='all')
+    return mask
+
+
+def narrow_by_terms(catalog, rows, terms):
+    # Keeps the rows (in their current order) that match every term
+    for term, as_prefix in terms:
+        if len(rows) == 0:
+            break
+        rows = rows[np.isin(rows, catalog.search_index.term_rows(term, as_prefix), assume_unique=True)]
+    return rows
+
+
+def rank_rows(catalog, rows, scores):
+    # Best match first; equally good matches by anti-inflammatory score, then catalog order
+    food_scores = catalog.df[SCORE_COL].to_numpy()[rows]
+    return rows[np.lexsort((rows, -food_scores, -np.round(scores, 4)))]
+
+
+def compute_rows(catalog, query):
+    # Apart from relevance there is no sorting at query time: the mask is read through the
+    # precomputed permutation for the sort mode
+    mask = filter_mask(catalog, query)
+    if query.search_terms:
+        rows, scores = catalog.search_index.rank_terms(query.search_terms)
+        if query.sort == 'relevance':
+            keep = mask[rows]
+            return rank_rows(catalog, rows[keep], scores[keep])
+        search_mask = np.zeros(len(mask), dtype=bool)
+        search_mask[rows] = True
+        mask &= search_mask
+    order = catalog.sort_orders['desc' if query.sort == 'relevance' else query.sort]
+    return order[mask[order]]
+
+
+def query_rows(catalog, query, cache=_result_cache):
+    # Row positions into catalog.df that match `query`, in display order
+    key = (catalog.version, query)
+    rows = cache.get(key)
+    if rows is not None:
+        count('result_cache_hits')
+        return rows
+    # Narrowing keeps the cached order, so it can't serve relevance, which re-ranks every query
+    narrowable = query.search_terms and query.sort != 'relevance'
+    superset = cache.narrowest_superset(catalog.version, query) if narrowable else None
+    if superset is not None:
+        # Only the terms the cached search did not already apply need checking; order is kept
+        broader_query, superset_rows = superset
+        new_terms = [term for term in query.search_terms if term not in broader_query.search_terms]
+        rows = narrow_by_terms(catalog, superset_rows, new_terms)
+        count('result_cache_narrowed')
+    else:
+        rows = compute_rows(catalog, query)
+        count('result_cache_misses')
+    cache.put(key, rows)
+    return rows
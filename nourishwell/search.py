@@ -0,0 +1,298 @@
+import re
+from collections import defaultdict
+
+import numpy as np
+
+from nourishwell.lru import LRUCache
+
+# Columns the Food Discovery search box looks at, with their BM25F field weights: a hit in the
+# food name counts most, then nutrients and health flags, then the "why" text
+SEARCH_FIELDS = {
+    'Food Item': 3.0,
+    'Key Vitamins & Minerals': 2.0,
+    'Flags (Female Health Issues)': 1.5,
+    'Why Anti-Inflammatory (for Women)': 1.0,
+}
+SEARCH_COLUMNS = tuple(SEARCH_FIELDS)
+
+BM25_K1 = 1.2
+BM25_B = 0.75  # length normalization, per field (long "why" texts don't drown short names)
+PREFIX_WEIGHT = 0.8  # "magnes" -> "magnesium": ranks below a whole-word hit
+MIN_PREFIX_LEN = 3  # the last query term matches as a prefix only from this length ("vitamin d" is not "vitamin d*")
+TYPO_WEIGHT = 0.6  # per edit: "salmno" -> "salmon" scores 0.6 of an exact hit
+MIN_TYPO_LEN = (5, 9)  # query terms this long get 1 / 2 typos; shorter ones must match exactly
+EXPAND_CACHE_SIZE = 1024  # query terms whose vocabulary expansion is kept per index
+DENSE_MAX_TERMS = 64  # a term matching up to this many words is scored with per-word scatters
+
+# Inline citation numbers glued to the end of a sentence, e.g. "...markers (CRP).26" or "Zeaxanthin.30"
+CITATION_RE = re.compile(r'(?<=[.)\]])\d+(?=\s|$)')
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def strip_citations(text):
+    return CITATION_RE.sub('', text)
+
+
+def tokenize(text):
+    if not isinstance(text, str):
+        return []
+    return TOKEN_RE.findall(strip_citations(text).lower())
+
+
+def query_terms(text):
+    # ((term, as_prefix), ...) for a query, sorted: only the last word, which may still be being
+    # typed, matches as a prefix, and only once it is MIN_PREFIX_LEN long; the others match whole
+    # words (within their typo budget). Order, case, punctuation and repeats don't matter otherwise.
+    tokens = tokenize(text)
+    terms = {(token, False) for token in tokens}
+    if tokens and len(tokens[-1]) >= MIN_PREFIX_LEN and tokens[-1] not in tokens[:-1]:
+        terms.discard((tokens[-1], False))
+        terms.add((tokens[-1], True))
+    return tuple(sorted(terms))
+
+
+def typo_budget(term):
+    if term.isdigit():
+        return 0
+    return sum(len(term) >= length for length in MIN_TYPO_LEN)
+
+
+def term_grams(term):
+    # Letter pairs of the term with a start marker, so "salmon" -> {"$s", "sa", "al", "lm", "mo", "on"}
+    padded = '$' + term
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def prefix_distance(query, term, limit, whole=False):
+    # Fewest edits (insert, delete, substitute, swap two neighbours) turning `query` into some
+    # prefix of `term`, so a half-typed word with a typo still matches; with `whole`, into all of
+    # `term`. Stops early past `limit`.
+    n = len(query)
+    before = None
+    prev = list(range(n + 1))
+    best = prev[n]
+    if whole and len(term) > n + limit:
+        return limit + 1
+    for j in range(1, min(len(term), n + limit) + 1):
+        char = term[j - 1]
+        cur = [j] + [0] * n
+        for i in range(1, n + 1):
+            d = min(prev[i] + 1, cur[i - 1] + 1, prev[i - 1] + (query[i - 1] != char))
+            if i > 1 and j > 1 and query[i - 1] == term[j - 2] and query[i - 2] == char:
+                d = min(d, before[i - 2] + 1)
+            cur[i] = d
+        best = min(best, cur[n])
+        if min(cur) > limit:
+            return limit + 1 if whole else best
+        before, prev = prev, cur
+    return prev[n] if whole else best
+
+
+def saturate(freqs):
+    # BM25's diminishing returns for repeated occurrences
+    return freqs * (BM25_K1 + 1) / (freqs + BM25_K1)
+
+
+def gather(starts, ends):
+    # Positions of several [start, end) slices, concatenated, without a Python loop
+    lengths = ends - starts
+    shift = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.arange(lengths.sum()) + shift, lengths
+
+
+def best_per_row(rows, scores):
+    # Sorted unique rows with the highest score each one got
+    order = np.argsort(rows, kind='stable')
+    rows, scores = rows[order], scores[order]
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    return rows[starts], np.maximum.reduceat(scores, starts)
+
+
+class SearchIndex:
+    # Inverted index built once per dataset: a sorted vocabulary plus CSR-style postings,
+    # so a term's rows are postings[offsets[i]:offsets[i + 1]] (sorted row positions), and
+    # weights holds each posting's field-weighted, length-normalized BM25F term frequency.
+    # The gram_* arrays are a second CSR index from letter pairs to vocabulary ids, used to find
+    # the few words a mistyped term could be instead of comparing it against the whole vocabulary.
+    # All arrays are plain NumPy arrays, so a compiled snapshot can memory-map them.
+
+    ARRAY_FIELDS = ('vocab', 'offsets', 'postings', 'weights', 'gram_vocab', 'gram_offsets', 'gram_postings')
+
+    def __init__(self, vocab, offsets, postings, weights, gram_vocab, gram_offsets, gram_postings, n_rows):
+        # np.asarray: memory-mapped arrays stay mapped, but slicing a plain view is cheaper than a memmap
+        self.vocab = np.asarray(vocab)
+        self.offsets = np.asarray(offsets)
+        self.postings = np.asarray(postings)
+        self.weights = np.asarray(weights)
+        self.gram_vocab = np.asarray(gram_vocab)
+        self.gram_offsets = np.asarray(gram_offsets)
+        self.gram_postings = np.asarray(gram_postings)
+        self.n_rows = n_rows
+        doc_freq = np.diff(offsets)
+        self.idf = np.log1p((n_rows - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        self._expansions = LRUCache(EXPAND_CACHE_SIZE)
+
+    @classmethod
+    def from_frame(cls, df, fields=SEARCH_FIELDS):
+        n_rows = len(df)
+        term_ids = {}
+        ids, rows, freqs = [], [], []  # per field: one entry per token occurrence
+        for col, field_weight in fields.items():
+            if col not in df.columns:
+                continue
+            cell_tokens = [tokenize(value) for value in df[col].tolist()]
+            lengths = np.fromiter(map(len, cell_tokens), dtype=np.int64, count=n_rows)
+            norm = field_weight / (1 - BM25_B + BM25_B * lengths / (lengths.mean() or 1.0))
+            ids.append(np.fromiter(
+                (term_ids.setdefault(token, len(term_ids)) for tokens in cell_tokens for token in tokens),
+                dtype=np.int64, count=lengths.sum(),
+            ))
+            rows.append(np.repeat(np.arange(n_rows, dtype=np.int64), lengths))
+            freqs.append(np.repeat(norm, lengths))
+        ids, rows, freqs = (np.concatenate(parts) if parts else np.zeros(0) for parts in (ids, rows, freqs))
+
+        tokens = sorted(term_ids)
+        rank = np.empty(len(tokens), dtype=np.int64)
+        rank[[term_ids[token] for token in tokens]] = np.arange(len(tokens))
+        # One key per (term, row), in vocabulary order then row order. Repeats of a token in a row,
+        # in any of its fields, collapse into one posting whose normalized frequencies add up.
+        keys = rank[ids.astype(np.int64)] * max(n_rows, 1) + rows.astype(np.int64)
+        order = np.argsort(keys, kind='stable')
+        keys, freqs = keys[order], freqs[order]
+        if len(keys):
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            keys, freqs = keys[starts], np.add.reduceat(freqs, starts)
+        offsets = np.zeros(len(tokens) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(keys // max(n_rows, 1), minlength=len(tokens)))
+        postings = (keys % max(n_rows, 1)).astype(np.int32)
+
+        # Only words long enough to be a typo match for a MIN_TYPO_LEN[0]-letter query are indexed
+        gram_terms = defaultdict(list)
+        for term_id, token in enumerate(tokens):
+            if len(token) >= MIN_TYPO_LEN[0] - 1 and not token.isdigit():
+                for gram in term_grams(token):
+                    gram_terms[gram].append(term_id)
+        grams = sorted(gram_terms)
+        gram_offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+        gram_offsets[1:] = np.cumsum([len(gram_terms[gram]) for gram in grams])
+        gram_postings = np.fromiter(
+            (term_id for gram in grams for term_id in gram_terms[gram]), dtype=np.int32, count=gram_offsets[-1],
+        )
+        return cls(
+            np.array(tokens, dtype=str), offsets, postings, freqs.astype(np.float32),
+            np.array(grams, dtype=str), gram_offsets, gram_postings, n_rows,
+        )
+
+    def prefix_range(self, prefix):
+        # Every vocabulary entry starting with `prefix` sits in one contiguous slice of the sorted vocab
+        lo, hi = np.searchsorted(self.vocab, [prefix, prefix + '\U0010ffff'])
+        return int(lo), int(hi)
+
+    def typo_candidates(self, term, lo, hi, whole=False):
+        # Vocabulary ids outside the slice [lo, hi) that `term` matches within its typo budget, as a
+        # prefix or, with `whole`, as the whole word.
+        # An edit breaks at most three of the term's letter pairs (two for anything but a swap), so a
+        # real match shares the rest: always at least two for the MIN_TYPO_LEN budgets. Trigrams
+        # would prune harder but a single swap can break every trigram of a five-letter word.
+        budget = typo_budget(term)
+        if not budget:
+            return []
+        grams = sorted(term_grams(term))
+        min_shared = len(grams) - 3 * budget
+        if min_shared < 1:
+            # Repetitive terms ("aaaaa") have too few distinct pairs to prune with; try every indexed word
+            ids = np.unique(self.gram_postings)
+        else:
+            slots = np.searchsorted(self.gram_vocab, grams)
+            slots = np.array([
+                slot for slot, gram in zip(slots.tolist(), grams)
+                if slot < len(self.gram_vocab) and self.gram_vocab[slot] == gram
+            ], dtype=np.int64)
+            if len(slots) == 0:
+                return []
+            positions, _ = gather(self.gram_offsets[slots], self.gram_offsets[slots + 1])
+            ids, shared = np.unique(self.gram_postings[positions], return_counts=True)
+            ids = ids[shared >= min_shared]
+        ids = ids[(ids < lo) | (ids >= hi)]
+        matches = []
+        for term_id in ids.tolist():
+            distance = prefix_distance(term, str(self.vocab[term_id]), budget, whole)
+            if distance <= budget:
+                matches.append((term_id, TYPO_WEIGHT ** distance))
+        return matches
+
+    def expand(self, term, as_prefix=True):
+        # (vocabulary ids, match weights) for every word `term` matches: exactly, as a prefix (when
+        # `as_prefix`), or with typos
+        key = (term, as_prefix)
+        cached = self._expansions.get(key)
+        if cached is not None:
+            return cached
+        lo, hi = self.prefix_range(term)
+        if not as_prefix:
+            hi = lo + 1 if hi > lo and self.vocab[lo] == term else lo
+        ids = np.arange(lo, hi, dtype=np.int64)
+        quality = np.full(hi - lo, PREFIX_WEIGHT, dtype=np.float32)
+        if hi > lo and self.vocab[lo] == term:
+            quality[0] = 1.0
+        typos = self.typo_candidates(term, lo, hi, whole=not as_prefix)
+        if typos:
+            ids = np.concatenate([ids, np.array([term_id for term_id, _ in typos], dtype=np.int64)])
+            quality = np.concatenate([quality, np.array([weight for _, weight in typos], dtype=np.float32)])
+        expansion = (ids, quality)
+        self._expansions.put(key, expansion)
+        return expansion
+
+    def term_matches(self, term, as_prefix=True):
+        # Sorted rows matching one query term, with that term's BM25F score in each row
+        ids, quality = self.expand(term, as_prefix)
+        if len(ids) == 0:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        term_weights = quality * self.idf[ids]
+        if len(ids) == 1:
+            rows = self.postings[self.offsets[ids[0]]:self.offsets[ids[0] + 1]]
+            freqs = self.weights[self.offsets[ids[0]]:self.offsets[ids[0] + 1]]
+            return rows, term_weights[0] * saturate(freqs)
+        if len(ids) <= DENSE_MAX_TERMS:
+            # A row matching several of the words keeps its best one; one scatter per word avoids
+            # sorting what can be most of the catalog's postings for a short prefix
+            best = np.zeros(self.n_rows, dtype=np.float32)
+            for term_id, term_weight in zip(ids.tolist(), term_weights.tolist()):
+                start, end = self.offsets[term_id], self.offsets[term_id + 1]
+                rows = self.postings[start:end]
+                best[rows] = np.maximum(best[rows], term_weight * saturate(self.weights[start:end]))
+            rows = np.flatnonzero(best).astype(np.int32)
+            return rows, best[rows]
+        positions, lengths = gather(self.offsets[ids], self.offsets[ids + 1])
+        scores = np.repeat(term_weights, lengths) * saturate(self.weights[positions])
+        return best_per_row(self.postings[positions], scores)
+
+    def term_rows(self, term, as_prefix=True):
+        return self.term_matches(term, as_prefix)[0]
+
+    def rank(self, query):
+        # Multi-term AND with typo-tolerant matching (see query_terms()). Returns sorted row positions
+        # and their summed BM25F scores, or None if the query has no searchable terms (nothing to filter).
+        return self.rank_terms(query_terms(query))
+
+    def rank_terms(self, terms):
+        # rank() for query_terms() output
+        if not terms:
+            return None
+        matches = sorted((self.term_matches(term, as_prefix) for term, as_prefix in terms), key=lambda match: len(match[0]))
+        rows, scores = matches[0]
+        other_scores = np.zeros(self.n_rows, dtype=np.float32)
+        for other_rows, other in matches[1:]:
+            if len(rows) == 0:
+                break
+            # Rows are unique, so the intersection is a lookup in a dense score array (0 = no match)
+            other_scores[:] = 0
+            other_scores[other_rows] = other
+            found = other_scores[rows]
+            keep = found > 0
+            rows, scores = rows[keep], scores[keep] + found[keep]
+        return rows, scores
+
+    def search(self, query):
+        ranked = self.rank(query)
+        return None if ranked is None else ranked[0]
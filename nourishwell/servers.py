@@ -0,0 +1,9 @@
+import threading
+
+
+def serve_in_background(server, path=''):
+    # Serves an http.server server on a daemon thread. Returns (server, base_url + path); call
+    # server.shutdown() when done.
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}{path}"
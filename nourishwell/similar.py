@@ -0,0 +1,182 @@
+import os
+import zlib
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from nourishwell.search import tokenize
+
+# "Similar foods": every food is a TF-IDF vector over its nutrients, mechanism text, health flags and
+# sub-category path, and its top-k most similar foods (cosine) are computed once per dataset version
+# and stored with the catalog, so a lookup is one row read. Up to EXACT_MAX_ROWS foods the neighbours
+# are exact (blocked matrix products). Above that they are approximate: foods are clustered and each
+# is compared only with the foods in the nearest few clusters, so the build grows as n^1.5, not n^2.
+
+# Column -> weight; nutrients count most ("other omega-3 sources"). Most foods share several health
+# flags, so flags and the sub-category path only break ties between foods with similar nutrients.
+SIMILARITY_FIELDS = {
+    'Key Vitamins & Minerals': 2.0,
+    'Why Anti-Inflammatory (for Women)': 1.0,
+    'Flags (Female Health Issues)': 0.5,
+    'Sub-category': 0.5,
+}
+SIMILAR_K = int(os.environ.get('NOURISHWELL_SIMILAR_K', '10'))  # neighbours stored per food
+EXACT_MAX_ROWS = int(os.environ.get('NOURISHWELL_SIMILAR_EXACT_MAX', '10000'))  # exact build takes ~2 s here
+TEXT_DIMS = 256  # hashed feature buckets for the mechanism text
+PATH_DIMS = 64  # ...and for sub-category paths
+MIN_TOKEN_LEN = 3
+BLOCK_BYTES = 64 << 20  # memory for one block of the exact similarity matrix
+EMBED_DIMS = 128  # random projection the clusters are found in
+KMEANS_ITERATIONS = 6
+IVF_PROBES = int(os.environ.get('NOURISHWELL_SIMILAR_PROBES', '8'))  # clusters searched per food
+SEED = 7  # fixed hyperplanes: the same catalog always gets the same neighbours
+
+
+def text_tokens(value):
+    return [token for token in tokenize(value) if len(token) >= MIN_TOKEN_LEN and not token.isdigit()]
+
+
+def path_tokens(value):
+    # "Fish > Salmon > Wild-caught" -> fish, fish>salmon, fish>salmon>wild-caught
+    parts = [part.strip().lower() for part in str(value).split('>') if part.strip()]
+    return ['>'.join(parts[:depth]) for depth in range(1, len(parts) + 1)]
+
+
+def normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def idf_weights(doc_freq, n_rows):
+    # No +1: a nutrient or word nearly every food has says nothing about which foods are alike
+    return np.log((1 + n_rows) / (1 + doc_freq)).astype(np.float32)
+
+
+def hashed_block(values, dims, tokenizer):
+    # (codes, unit vectors of the distinct values): TF-IDF over hashed tokens, each distinct text once
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    value_rows = np.bincount(codes, minlength=len(uniques))
+    token_counts = [Counter(tokenizer(value)) for value in uniques]
+    doc_freq = {}
+    for rows, counts in zip(value_rows, token_counts):
+        for token in counts:
+            doc_freq[token] = doc_freq.get(token, 0) + rows
+    tokens = list(doc_freq)
+    buckets = {token: zlib.crc32(token.encode('utf-8')) % dims for token in tokens}
+    idf = dict(zip(tokens, idf_weights(np.array([doc_freq[token] for token in tokens], dtype=np.float64), len(codes))))
+    vectors = np.zeros((len(uniques), dims), dtype=np.float32)
+    for unique, counts in enumerate(token_counts):
+        for token, tf in counts.items():
+            vectors[unique, buckets[token]] += (1 + np.log(tf)) * idf[token]
+    return codes, normalize_rows(vectors)
+
+
+def bits_block(values, flag_index):
+    # (codes, unit vectors of the distinct values) from a FlagIndex built over the same column
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    first_rows = np.unique(codes, return_index=True)[1]
+    matrix = flag_index.matrix(first_rows).astype(np.float32)
+    doc_freq = np.bincount(codes, minlength=len(uniques)) @ matrix
+    return codes, normalize_rows(matrix * idf_weights(doc_freq, len(codes)))
+
+
+class SimilarityIndex:
+    ARRAY_FIELDS = ('neighbors', 'scores')
+
+    def __init__(self, neighbors, scores):
+        self.neighbors = neighbors  # (foods x k) row positions of the most similar foods, best first; -1 pads
+        self.scores = scores  # their cosine similarities
+
+    @classmethod
+    def from_frame(cls, df, flag_index, nutrient_index, k=SIMILAR_K):
+        columns = list(SIMILARITY_FIELDS)
+        blocks = [
+            bits_block(df[columns[0]].tolist(), nutrient_index),
+            hashed_block(df[columns[1]].tolist(), TEXT_DIMS, text_tokens),
+            bits_block(df[columns[2]].tolist(), flag_index),
+            hashed_block(df[columns[3]].tolist(), PATH_DIMS, path_tokens),
+        ]
+        # Concatenated, each field scaled by sqrt(weight): a dot product is then the weighted sum of
+        # the per-field cosines, and dividing by the row norms makes it a cosine again
+        blocks = [(codes, vectors * np.sqrt(weight, dtype=np.float32))
+                  for (codes, vectors), weight in zip(blocks, SIMILARITY_FIELDS.values())]
+        norms = np.sqrt(sum(np.einsum('ij,ij->i', vectors, vectors)[codes] for codes, vectors in blocks))
+        all_rows = np.arange(len(df))
+        groups = [(all_rows, all_rows)] if len(df) <= EXACT_MAX_ROWS else cluster_groups(blocks, norms)
+        neighbors, scores = nearest_in_groups(blocks, norms, k, groups)
+        neighbors.flags.writeable = False
+        scores.flags.writeable = False
+        return cls(neighbors, scores)
+
+    def similar(self, row, k=None):
+        # (rows, scores) of the foods most like `row`, best first: a slice of the precomputed table
+        rows = self.neighbors[row, :k]
+        found = rows >= 0
+        return rows[found], self.scores[row, :k][found]
+
+
+def row_features(blocks, norms, rows):
+    # Unit feature vectors of `rows`, assembled from the per-field vectors of their distinct values
+    features = np.hstack([vectors[codes[rows]] for codes, vectors in blocks])
+    row_norms = norms[rows, None]
+    return np.divide(features, row_norms, out=np.zeros_like(features), where=row_norms > 0)
+
+
+def nearest_in_groups(blocks, norms, k, groups):
+    # Top-k cosine neighbours of each query row among its group's candidate rows (sorted), one block
+    # of at most BLOCK_BYTES of similarities at a time
+    n_rows = len(norms)
+    k = min(k, max(n_rows - 1, 0))
+    neighbors = np.full((n_rows, k), -1, dtype=np.int32)
+    scores = np.zeros((n_rows, k), dtype=np.float32)
+    for queries, candidates in groups:
+        candidate_features = row_features(blocks, norms, candidates)
+        take = min(k, len(candidates))
+        chunk = max(1, BLOCK_BYTES // (4 * len(candidates)))
+        for start in range(0, len(queries) if take else 0, chunk):
+            rows = queries[start:start + chunk]
+            block = row_features(blocks, norms, rows) @ candidate_features.T
+            self_pos = np.minimum(np.searchsorted(candidates, rows), len(candidates) - 1)
+            is_self = candidates[self_pos] == rows
+            block[np.flatnonzero(is_self), self_pos[is_self]] = -np.inf  # not its own neighbour
+            top = (np.argpartition(-block, take - 1, axis=1)[:, :take] if take < len(candidates)
+                   else np.argsort(-block, axis=1)[:, :take])
+            top_scores = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind='stable')
+            top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+            found = top_scores > 0
+            neighbors[rows, :take] = np.where(found, candidates[top], -1)
+            scores[rows, :take] = np.where(found, top_scores, 0)
+    return neighbors, scores
+
+
+def cluster_groups(blocks, norms):
+    # Inverted-file partition for large catalogs: k-means on a random projection of the features
+    # (which keeps angles roughly intact) splits the foods into ~sqrt(n) clusters, and each cluster's
+    # foods are compared only with the foods of the IVF_PROBES clusters whose centroids are closest
+    n_rows = len(norms)
+    rng = np.random.default_rng(SEED)
+    embedding = np.zeros((n_rows, EMBED_DIMS), dtype=np.float32)
+    for codes, vectors in blocks:
+        embedding += (vectors @ rng.standard_normal((vectors.shape[1], EMBED_DIMS)).astype(np.float32))[codes]
+    embedding = normalize_rows(embedding)
+
+    n_clusters = max(1, int(np.sqrt(n_rows)))
+    centroids = embedding[rng.choice(n_rows, n_clusters, replace=False)]
+    chunk = max(1, BLOCK_BYTES // (4 * n_clusters))
+    for _ in range(KMEANS_ITERATIONS):
+        assignment = np.concatenate([
+            np.argmax(embedding[start:start + chunk] @ centroids.T, axis=1) for start in range(0, n_rows, chunk)
+        ])
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, embedding)
+        centroids = np.where(np.bincount(assignment, minlength=n_clusters)[:, None] > 0, normalize_rows(sums), centroids)
+
+    order = np.argsort(assignment, kind='stable')
+    members = np.split(order, np.searchsorted(assignment[order], np.arange(1, n_clusters)))
+    probes = np.argsort(-(centroids @ centroids.T), axis=1, kind='stable')[:, :IVF_PROBES]
+    return [
+        (members[cluster], np.sort(np.concatenate([members[probe] for probe in probes[cluster]])))
+        for cluster in range(n_clusters) if len(members[cluster])
+    ]
@@ -0,0 +1,200 @@
+"""Compiled binary snapshots of the food catalog for fast cold starts.
+
+Parsing the CSV and building the flag and search indexes takes seconds on large catalogs. A
+snapshot keeps the prepared frame as uncompressed Feather and every index array as .npy, so a new
+process memory-maps the indexes and reads the frame instead of re-parsing and re-indexing.
+
+Snapshots live under NOURISHWELL_SNAPSHOT_DIR (default .cache/catalog; set it to an empty string to
+always load from CSV). Each is stored under the CSV's content hash and the snapshot format, so a
+format bump compiles a new snapshot beside the old one, which is then pruned. A small pointer file
+remembers the CSV's mtime and size, so an unchanged CSV is never even read. When either changes the
+CSV is hashed, and it is recompiled only if the content really changed. Snapshots need pyarrow;
+without it every start parses the CSV.
+
+    python -m nourishwell.snapshot
+    python -m nourishwell.snapshot .cache/bench/foods_100000_seed7.csv
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # optional: without it every start parses the CSV
+    feather = None
+
+from nourishwell.data import CATALOG_PATH, CATEGORY_COL, Catalog, build_catalog, catalog_version, index_food_ids, load_catalog, read_catalog_csv
+from nourishwell.flags import FlagIndex
+from nourishwell.search import SearchIndex
+from nourishwell.similar import SimilarityIndex
+
+SNAPSHOT_DIR = os.environ.get('NOURISHWELL_SNAPSHOT_DIR', str(Path(__file__).resolve().parent.parent / '.cache' / 'catalog'))
+SNAPSHOT_FORMAT = 6  # bump whenever the layout or anything derived into the snapshot changes
+
+FRAME_FILE = 'frame.feather'
+META_FILE = 'meta.json'
+SORT_ARRAYS = ('desc', 'asc', 'alpha_asc')
+ARRAY_NAMES = (
+    'flag_bitsets',
+    'nutrient_bitsets',
+    *(f'search_{field}' for field in SearchIndex.ARRAY_FIELDS),
+    *(f'similar_{field}' for field in SimilarityIndex.ARRAY_FIELDS),
+    *(f'sort_{mode}' for mode in SORT_ARRAYS),
+)
+
+
+def snapshot_key(path):
+    # One pointer file per source path, e.g. "anti_inflammatory_foods-1a2b3c4d"
+    return f"{path.stem}-{hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:8]}"
+
+
+def snapshot_name(key, version):
+    return f'{key}-{version}-f{SNAPSHOT_FORMAT}'
+
+
+def catalog_arrays(catalog):
+    return dict(zip(ARRAY_NAMES, (
+        catalog.flag_index.bitsets,
+        catalog.nutrient_index.bitsets,
+        *(getattr(catalog.search_index, field) for field in SearchIndex.ARRAY_FIELDS),
+        *(getattr(catalog.similar_index, field) for field in SimilarityIndex.ARRAY_FIELDS),
+        *(catalog.sort_orders[mode] for mode in SORT_ARRAYS),
+    )))
+
+
+def write_snapshot(catalog, directory):
+    # Written to a temporary sibling and renamed into place, so readers never see half a snapshot.
+    # Snapshots are immutable: if another process got there first, keep theirs.
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f'.{directory.name}-', dir=directory.parent))
+    try:
+        os.chmod(staging, 0o755)  # mkdtemp is owner-only; other worker users may need to read it
+        feather.write_feather(catalog.df, staging / FRAME_FILE, compression='uncompressed')
+        for name, array in catalog_arrays(catalog).items():
+            np.save(staging / f'{name}.npy', np.ascontiguousarray(array), allow_pickle=False)
+        meta = {
+            'format': SNAPSHOT_FORMAT,
+            'version': catalog.version,
+            'flag_bits': catalog.flag_index.flag_bits,
+            'nutrient_bits': catalog.nutrient_index.flag_bits,
+        }
+        (staging / META_FILE).write_text(json.dumps(meta), encoding='utf-8')
+        os.rename(staging, directory)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        if not (directory / META_FILE).exists():
+            raise
+
+
+def read_snapshot(directory):
+    meta = json.loads((directory / META_FILE).read_text(encoding='utf-8'))
+    if meta['format'] != SNAPSHOT_FORMAT:
+        raise ValueError(f"snapshot format {meta['format']} is not {SNAPSHOT_FORMAT}")
+    # Arrow columns are mapped, not read; to_pandas() then builds the object columns pandas needs
+    df = feather.read_table(directory / FRAME_FILE, memory_map=True).to_pandas()
+    arrays = {name: np.load(directory / f'{name}.npy', mmap_mode='r', allow_pickle=False) for name in ARRAY_NAMES}
+    flag_index = FlagIndex(meta['flag_bits'], arrays['flag_bitsets'])
+    nutrient_index = FlagIndex(meta['nutrient_bits'], arrays['nutrient_bitsets'])
+    return Catalog(
+        df=df,
+        version=meta['version'],
+        categories=tuple(sorted(df[CATEGORY_COL].cat.categories.tolist())),
+        health_flags=tuple(sorted(flag_index.flag_bits)),
+        nutrients=tuple(sorted(nutrient_index.flag_bits)),
+        sort_orders={mode: arrays[f'sort_{mode}'] for mode in SORT_ARRAYS},
+        flag_index=flag_index,
+        nutrient_index=nutrient_index,
+        search_index=SearchIndex(*(arrays[f'search_{field}'] for field in SearchIndex.ARRAY_FIELDS), len(df)),
+        similar_index=SimilarityIndex(*(arrays[f'similar_{field}'] for field in SimilarityIndex.ARRAY_FIELDS)),
+        id_rows=index_food_ids(df),
+    )
+
+
+def try_read_snapshot(directory):
+    # A missing, partial or outdated snapshot just means "compile again"
+    try:
+        return read_snapshot(directory)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def read_pointer(pointer_path):
+    try:
+        return json.loads(pointer_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def write_pointer(pointer_path, source, stat, version):
+    pointer = {'source': str(source), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'version': version}
+    staging = pointer_path.with_name(f'.{pointer_path.name}.{os.getpid()}')
+    staging.write_text(json.dumps(pointer), encoding='utf-8')
+    os.replace(staging, pointer_path)
+
+
+def prune_snapshots(snapshot_dir, key, keep):
+    for directory in snapshot_dir.glob(f'{key}-*'):
+        if directory.is_dir() and directory.name != keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def load_compiled_catalog(path=CATALOG_PATH, snapshot_dir=SNAPSHOT_DIR):
+    path = Path(path).resolve()
+    if not snapshot_dir or feather is None:
+        return load_catalog(path)
+    snapshot_dir = Path(snapshot_dir)
+    key = snapshot_key(path)
+    pointer_path = snapshot_dir / f'{key}.json'
+    stat = path.stat()
+
+    # Fast path: the CSV has not been touched since the snapshot was made
+    pointer = read_pointer(pointer_path)
+    if pointer.get('mtime_ns') == stat.st_mtime_ns and pointer.get('size') == stat.st_size:
+        catalog = try_read_snapshot(snapshot_dir / snapshot_name(key, pointer['version']))
+        if catalog is not None:
+            return catalog
+
+    raw = path.read_bytes()
+    version = catalog_version(raw)
+    directory = snapshot_dir / snapshot_name(key, version)
+    catalog = try_read_snapshot(directory)  # touched (e.g. by a checkout) but the same content
+    if catalog is None:
+        catalog = build_catalog(read_catalog_csv(raw), version)
+        try:
+            write_snapshot(catalog, directory)
+            prune_snapshots(snapshot_dir, key, keep=directory.name)
+        except OSError as e:
+            warnings.warn(f"Could not write catalog snapshot to {directory}: {e}")
+            return catalog
+    try:
+        write_pointer(pointer_path, path, stat, version)
+    except OSError as e:
+        warnings.warn(f"Could not update catalog snapshot pointer {pointer_path}: {e}")
+    return catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('csv', nargs='*', default=[str(CATALOG_PATH)], help="catalog CSVs to compile (default: the app's catalog)")
+    parser.add_argument('--snapshot-dir', default=SNAPSHOT_DIR or str(Path('.cache') / 'catalog'))
+    args = parser.parse_args()
+    for csv_path in args.csv:
+        started = time.perf_counter()
+        catalog = load_compiled_catalog(csv_path, args.snapshot_dir)
+        compiled = time.perf_counter() - started
+        started = time.perf_counter()
+        load_compiled_catalog(csv_path, args.snapshot_dir)
+        print(f"{csv_path}: {len(catalog)} foods, version {catalog.version}, "
+              f"compile/check {compiled:.3f}s, snapshot load {time.perf_counter() - started:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Local stand-in for the Gemini generateContent endpoint.
+
+    python -m nourishwell.stub_server --port 8765 --latency 0.5 --fail-rate 0.1 --chunk-delay 0.05
+    python -m nourishwell.stub_server --fail-rate 0.5 --retry-after 2
+    LLM_API_BASE=http://127.0.0.1:8765/v1beta streamlit run Home.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from nourishwell.servers import serve_in_background
+
+PATH_RE = re.compile(r'^/v1beta/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)$')
+
+
+def stub_plan_text(prompt):
+    # Echo the selected foods back so callers can tell plans for different selections apart
+    foods = re.findall(r'"food":"([^"]+)"', prompt)
+    lines = ["## Your Anti-Inflammatory Day (stub)", ""]
+    for meal, food in zip(["Breakfast", "Lunch", "Dinner", "Snack"], foods or ["Chef's choice"] * 4):
+        lines.append(f"### {meal}\n- Something delicious with **{food}**.\n")
+    return "\n".join(lines)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=()):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        match = PATH_RE.match(self.path.split('?')[0])
+        if not match:
+            self.send_json(404, {'error': {'code': 404, 'message': f'Unknown path {self.path}'}})
+            return
+
+        server = self.server
+        with server.stats_lock:
+            server.request_count += 1
+        time.sleep(server.latency)
+        if random.random() < server.fail_rate:
+            retry_after = () if server.retry_after is None else (('Retry-After', str(server.retry_after)),)
+            self.send_json(503, {'error': {'code': 503, 'message': 'The model is overloaded.'}}, headers=retry_after)
+            return
+
+        prompt = body['contents'][0]['parts'][0]['text']
+        if match.group('method') == 'streamGenerateContent':
+            self.send_stream(stub_plan_text(prompt))
+        else:
+            self.send_json(200, {'candidates': [{'content': {'role': 'model', 'parts': [{'text': stub_plan_text(prompt)}]}}]})
+
+    def send_stream(self, text):
+        # Server-sent events over chunked transfer encoding, one line of the plan per event
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for line in text.splitlines(keepends=True):
+            event = {'candidates': [{'content': {'role': 'model', 'parts': [{'text': line}]}}]}
+            self.write_chunk(f"data: {json.dumps(event)}\r\n\r\n".encode('utf-8'))
+            time.sleep(self.server.chunk_delay)
+        final = {'candidates': [{'content': {'role': 'model', 'parts': []}, 'finishReason': 'STOP'}]}
+        self.write_chunk(f"data: {json.dumps(final)}\r\n\r\n".encode('utf-8'))
+        self.write_chunk(b'')
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+
+def make_server(host='127.0.0.1', port=0, latency=0.0, fail_rate=0.0, chunk_delay=0.0, retry_after=None):
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.fail_rate = fail_rate
+    server.chunk_delay = chunk_delay
+    server.retry_after = retry_after  # seconds sent as Retry-After with each 503, if any
+    server.request_count = 0
+    server.stats_lock = threading.Lock()
+    return server
+
+
+def start_in_background(**kwargs):
+    return serve_in_background(make_server(**kwargs), '/v1beta')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds to wait before the first byte")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument('--retry-after', type=int, default=None, help="Retry-After seconds sent with each 503")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.latency, args.fail_rate, args.chunk_delay, args.retry_after)
+    print(f"Stub LLM listening on http://{args.host}:{args.port}/v1beta")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
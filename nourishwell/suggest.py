@@ -0,0 +1,155 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from nourishwell.data import CATEGORY_COL, SCORE_COL
+from nourishwell.nutrients import KEY_NUTRIENTS
+
+# "Suggested next" for a plan built one food at a time: the foods not in the plan, ranked by what
+# they would add to it. Each session keeps a small PlanCoverage of its plan: how many of its foods
+# carry each health flag and nutrient, and how many come from each category. Adding or removing a
+# food only updates the counts of that food's features, so the plan is never re-counted from scratch.
+# The gains of every food are worked out from those counts and the shared SuggestionModel when the
+# ranking is needed (one matrix-vector product), and the ranking is cached until the plan changes.
+
+FLAG_POINTS = 10  # per health concern the plan doesn't address yet
+KEY_NUTRIENT_POINTS = 10  # per KEY_NUTRIENTS nutrient it lacks
+NUTRIENT_POINTS = 1  # per other nutrient it lacks (groups, minor compounds)
+CATEGORY_POINTS = 10  # for a category not in the plan yet; divided by 1 + its foods already in the plan
+SCORE_POINTS = 5  # for a score of 10, pro rata
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+class SuggestionModel:
+    # The per-catalog half, shared by every session: the features (health flags, then nutrients) of
+    # each food, as a food x feature matrix and as CSR lists, and the plan-independent gains
+
+    def __init__(self, catalog):
+        self.version = catalog.version
+        self.id_rows = catalog.id_rows
+        flag_names = sorted(catalog.flag_index.flag_bits, key=catalog.flag_index.flag_bits.get)
+        nutrient_names = sorted(catalog.nutrient_index.flag_bits, key=catalog.nutrient_index.flag_bits.get)
+        self.feature_names = flag_names + nutrient_names
+        self.n_flags = len(flag_names)
+        self.key_features = set(range(len(flag_names))) | {
+            len(flag_names) + bit for bit, name in enumerate(nutrient_names) if name in KEY_NUTRIENTS
+        }  # the ones new_features() reports
+        self.feature_points = np.array(
+            [FLAG_POINTS] * len(flag_names)
+            + [KEY_NUTRIENT_POINTS if name in KEY_NUTRIENTS else NUTRIENT_POINTS for name in nutrient_names],
+            dtype=np.int32,
+        )
+        matrix = np.hstack([catalog.flag_index.matrix(), catalog.nutrient_index.matrix()])
+        self.row_offsets, self.row_features = csr(*np.nonzero(matrix), len(matrix))
+        self.feature_matrix = matrix.astype(np.float32)  # float32 so the gains are one BLAS product
+        self.category_codes, self.categories = pd.factorize(catalog.df[CATEGORY_COL].astype(object))  # -1: none
+        scores = pd.to_numeric(catalog.df[SCORE_COL], errors='coerce').fillna(0).to_numpy(dtype=np.float32)
+        self.score_gain = SCORE_POINTS * np.clip(scores, 0, 10) / 10
+
+    def features_of(self, row):
+        return self.row_features[self.row_offsets[row]:self.row_offsets[row + 1]]
+
+
+def csr(owners, members, n_owners):
+    # (offsets, members) from np.nonzero output, which is already sorted by owner
+    offsets = np.zeros(n_owners + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owners, minlength=n_owners), out=offsets[1:])
+    return offsets, members.astype(np.int32)
+
+
+def suggestion_model(catalog):
+    # One model per dataset version, built on first use
+    model = _models.get(catalog.version)
+    if model is None:
+        with _models_lock:
+            model = _models.get(catalog.version)
+            if model is None:
+                model = _models[catalog.version] = SuggestionModel(catalog)
+    return model
+
+
+class PlanCoverage:
+    # One session's plan, counted: updated per food added or removed. Only plan-sized state lives
+    # here (no per-catalog-food arrays), so it is cheap to keep in every session.
+
+    def __init__(self, model):
+        self.model = model  # shared, not copied
+        self.food_rows = {}  # food id -> row, for the foods counted
+        self.feature_counts = np.zeros(len(model.feature_points), dtype=np.int32)
+        self.category_counts = np.zeros(len(model.categories), dtype=np.int32)
+        self._suggested = None  # (k, rows) of the last suggest(), until the plan changes
+
+    def add(self, food_id):
+        row = self.model.id_rows.get(food_id)
+        if row is None or food_id in self.food_rows:
+            return
+        self.food_rows[food_id] = row
+        self._count(row, 1)
+
+    def remove(self, food_id):
+        row = self.food_rows.pop(food_id, None)
+        if row is not None:
+            self._count(row, -1)
+
+    def _count(self, row, delta):
+        self.feature_counts[self.model.features_of(row)] += delta
+        code = self.model.category_codes[row]
+        if code >= 0:
+            self.category_counts[code] += delta
+        self._suggested = None
+
+    def sync(self, food_ids):
+        # Catch up with the plan's ids (an ordered dict or list), counting only what changed
+        food_ids = dict.fromkeys(food_ids)
+        if self.food_rows.keys() == food_ids.keys():
+            return
+        for food_id in self.food_rows.keys() - food_ids.keys():
+            self.remove(food_id)
+        for food_id in food_ids:
+            self.add(food_id)
+
+    def gains(self):
+        # Points each food would add to the plan; -inf for the foods already in it
+        model = self.model
+        open_points = np.where(self.feature_counts == 0, model.feature_points, 0).astype(np.float32)
+        category_points = np.append(CATEGORY_POINTS / (1 + self.category_counts), 0)  # [-1]: no category
+        gain = model.feature_matrix @ open_points + model.score_gain + category_points[model.category_codes]
+        gain[list(self.food_rows.values())] = -np.inf
+        return gain
+
+    def suggest(self, k=5):
+        # Rows of the (at most) k foods that would add most to the plan, best first
+        if self._suggested is None or self._suggested[0] != k:
+            gain = self.gains()
+            k_found = min(k, len(gain) - len(self.food_rows))
+            top = np.argpartition(-gain, k_found - 1)[:k_found] if 0 < k_found < len(gain) else np.arange(len(gain))
+            top = top[np.lexsort((top, -gain[top]))][:max(k_found, 0)]  # equal gains in catalog order
+            self._suggested = (k, top)
+        return self._suggested[1]
+
+    def new_features(self, row):
+        # (health flags, key nutrients) the food at `row` would add to the plan
+        model = self.model
+        features = model.features_of(row)
+        missing = [feature for feature in features[self.feature_counts[features] == 0].tolist()
+                   if feature in model.key_features]
+        return ([model.feature_names[feature] for feature in missing if feature < model.n_flags],
+                [model.feature_names[feature] for feature in missing if feature >= model.n_flags])
+
+    def nutrient_counts(self):
+        # {nutrient: foods in the plan providing it}, like nutrients.nutrient_coverage() but from the counts
+        model = self.model
+        return {name: int(count) for name, count in sorted(zip(model.feature_names[model.n_flags:],
+                                                               self.feature_counts[model.n_flags:])) if count}
+
+
+def plan_coverage(state, catalog):
+    # The PlanCoverage kept in `state` (a session's st.session_state), caught up with its plan
+    coverage = state.get('plan_coverage')
+    if coverage is None or coverage.model.version != catalog.version:
+        coverage = state['plan_coverage'] = PlanCoverage(suggestion_model(catalog))
+    coverage.sync(state.get('selected_foods_for_plan', {}))
+    return coverage
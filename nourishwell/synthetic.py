@@ -0,0 +1,129 @@
+"""Synthetic food catalogs with the same schema as anti_inflammatory_foods.csv, for scaling work.
+
+Rows are recombined from the real catalog: text fields reuse its sentences and list items (so
+lengths, vocabulary and citation noise look like the real thing), flags follow its per-flag
+frequencies and flags-per-food counts, and Category is only written on the first food of each
+group, like the spreadsheet export.
+
+    python -m nourishwell.synthetic 100000 --out .cache/bench/foods_100000.csv --seed 7
+    NOURISHWELL_CATALOG=.cache/bench/foods_100000.csv streamlit run Home.py
+"""
+import argparse
+import csv
+import re
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from nourishwell.data import (
+    BEST_FOR_COL, CATALOG_PATH, CATEGORY_COL, CAUTIONS_COL, FLAGS_COL, FOOD_COL, FORM_COL, MECHANISM_COL,
+    NUTRIENTS_COL, REGION_COL, SCORE_COL, SUBCATEGORY_COL, USAGE_COL, prepare_frame, read_catalog_csv, split_flags,
+)
+
+NAME_PREFIXES = (
+    'Organic', 'Heirloom', 'Wild', 'Sprouted', 'Roasted', 'Smoked', 'Dried', 'Raw', 'Golden', 'Red', 'Black',
+    'Purple', 'Baby', 'Alpine', 'Coastal', 'Highland', 'Cold-pressed', 'Stone-ground', 'Fermented', 'Pasture-raised',
+)
+# How each text column is cut into reusable pieces and joined back: sentences for prose, items for
+# lists; columns not listed here are copied whole from a random real row
+PIECE_SPLITS = {
+    MECHANISM_COL: (re.compile(r'(?<=[.!?])\s+|(?<=\.\d)\s+|(?<=\.\d\d)\s+'), ' '),
+    BEST_FOR_COL: (re.compile(r'(?<=[.!?])\s+'), ' '),
+    CAUTIONS_COL: (re.compile(r'(?<=[.!?])\s+|(?<=\.\d)\s+|(?<=\.\d\d)\s+'), ' '),
+    NUTRIENTS_COL: (re.compile(r',\s*(?![^()]*\))'), ', '),  # commas outside parentheses
+    USAGE_COL: (re.compile(r';\s*'), '; '),
+}
+VARIANTS_PER_COLUMN = 4096  # distinct recombined values per column; rows draw from these
+
+
+def recombined_values(rng, values, col, n_variants):
+    # Each variant takes as many pieces as a randomly chosen real value has, drawn from all real values
+    if col not in PIECE_SPLITS:
+        return [values[i] for i in rng.integers(0, len(values), size=n_variants)]
+    split_re, joiner = PIECE_SPLITS[col]
+    # Bare numbers left over from splitting around citations ("...stress.62 0.5 g...") are dropped
+    pieces = [[piece.strip() for piece in split_re.split(value) if re.search('[A-Za-z]', piece)] for value in values]
+    pool = sorted({piece for value_pieces in pieces for piece in value_pieces}) or ['']
+    lengths = [len(value_pieces) for value_pieces in pieces] or [1]
+    return [
+        joiner.join(pool[i] for i in rng.choice(len(pool), size=min(rng.choice(lengths), len(pool)), replace=False))
+        for _ in range(n_variants)
+    ]
+
+
+def flag_variants(rng, flag_lists, n_variants):
+    frequencies = Counter(flag for flags in flag_lists for flag in flags)
+    names = sorted(frequencies)
+    weights = np.array([frequencies[name] for name in names], dtype=float)
+    weights /= weights.sum()
+    counts = [len(flags) for flags in flag_lists if flags] or [1]
+    variants = []
+    for _ in range(n_variants):
+        picked = rng.choice(len(names), size=min(rng.choice(counts), len(names)), replace=False, p=weights)
+        text = ', '.join(names[i] for i in sorted(picked))
+        variants.append(text + '.' if rng.random() < 0.1 else text)  # trailing full stop, as in the real data
+    return variants
+
+
+def generate_catalog(n_rows, seed=0, template_path=CATALOG_PATH):
+    rng = np.random.default_rng(seed)
+    source = read_catalog_csv(Path(template_path).read_bytes())
+    template = prepare_frame(source)
+    n_variants = min(n_rows, VARIANTS_PER_COLUMN)
+
+    # Category, sub-category, name and score come from one real "donor" row so they stay consistent
+    donors = np.sort(rng.integers(0, len(template), size=n_rows))
+    categories = template[CATEGORY_COL].astype(str).to_numpy()[donors]
+    order = np.argsort(categories, kind='stable')
+    donors, categories = donors[order], categories[order]
+
+    prefixes = np.array(NAME_PREFIXES, dtype=object)[rng.integers(0, len(NAME_PREFIXES), size=n_rows)]
+    base_names = template[FOOD_COL].to_numpy(dtype=object)[donors]
+    names = [f"{prefix} {name} {i + 1}" for i, (prefix, name) in enumerate(zip(prefixes, base_names))]
+    scores = np.clip(template[SCORE_COL].to_numpy()[donors] + rng.integers(-3, 2, size=n_rows), 0, 10)
+
+    columns = {
+        CATEGORY_COL: np.where(np.r_[True, categories[1:] != categories[:-1]], categories, None),
+        FOOD_COL: names,
+        SUBCATEGORY_COL: template[SUBCATEGORY_COL].to_numpy(dtype=object)[donors],
+    }
+    for col in (FORM_COL, MECHANISM_COL, NUTRIENTS_COL):
+        variants = np.array(recombined_values(rng, template[col].tolist(), col, n_variants), dtype=object)
+        columns[col] = variants[rng.integers(0, n_variants, size=n_rows)]
+    columns[SCORE_COL] = scores
+    flags = np.array(flag_variants(rng, [split_flags(value) for value in template[FLAGS_COL]], n_variants), dtype=object)
+    columns[FLAGS_COL] = flags[rng.integers(0, n_variants, size=n_rows)]
+    for col in (BEST_FOR_COL, REGION_COL, CAUTIONS_COL, USAGE_COL):
+        variants = np.array(recombined_values(rng, template[col].tolist(), col, n_variants), dtype=object)
+        columns[col] = variants[rng.integers(0, n_variants, size=n_rows)]
+    # The source's own columns: prepare_frame() adds load-time ones (Food ID) that the CSV doesn't have
+    return pd.DataFrame(columns, columns=list(source.columns))
+
+
+def csv_header(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return next(csv.reader(f), [])
+
+
+def write_catalog(path, n_rows, seed=0, template_path=CATALOG_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    generate_catalog(n_rows, seed, template_path).to_csv(path, index=False, encoding='utf-8-sig')  # BOM, like the real export
+    if csv_header(path) != csv_header(template_path):
+        raise ValueError(f"{path} was written with columns {csv_header(path)}, not the source catalog's {csv_header(template_path)}")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('rows', type=int, help="number of foods to generate")
+    parser.add_argument('--out', required=True, help="CSV path to write")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(f"Wrote {args.rows} foods to {write_catalog(args.out, args.rows, args.seed)}")
+
+
+if __name__ == '__main__':
+    main()
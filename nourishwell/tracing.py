@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+# NOURISHWELL_TRACE=1 traces every rerun of every session and appends it to the JSON-lines log;
+# without it only sessions that opt in (see debug_panel.py) are traced and nothing is written.
+TRACE_ALL = os.environ.get('NOURISHWELL_TRACE', '') not in ('', '0')
+TRACE_LOG_PATH = Path(os.environ.get(
+    'NOURISHWELL_TRACE_LOG',
+    Path(__file__).resolve().parent.parent / '.cache' / 'rerun_traces.jsonl',
+))
+TRACE_HISTORY = 20  # reruns kept per session for the debug panel
+
+_NULL_SPAN = nullcontext()
+_current = threading.local()  # Streamlit runs each session's script on its own thread
+_log_lock = threading.Lock()
+
+
+class RerunTrace:
+    # Timings of one script run: a flat list of (possibly nested) spans plus named counters.
+    # Page scripts are linear, so they mark top-level sections with section(); anything inside
+    # a section can be timed in more detail with `with span(...)`.
+
+    def __init__(self, page):
+        self.page = page
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self._depth = 0
+        self._section = None
+        self.spans = []  # [name, depth, start_ms, duration_ms] in start order
+        self.counts = {}
+        self.total_ms = None
+
+    def _close_section(self, now):
+        if self._section is not None:
+            self._section[3] = (now - self._t0) * 1000 - self._section[2]
+            self._section = None
+            self._depth = 0
+
+    def section(self, name):
+        # Ends the running section (if any) and starts the next one
+        now = time.perf_counter()
+        self._close_section(now)
+        self._section = [name, 0, (now - self._t0) * 1000, None]
+        self.spans.append(self._section)
+        self._depth = 1
+
+    @contextmanager
+    def span(self, name):
+        entry = [name, self._depth, (time.perf_counter() - self._t0) * 1000, None]
+        self.spans.append(entry)
+        self._depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry[3] = (time.perf_counter() - started) * 1000
+            self._depth -= 1
+
+    def count(self, name, value=1):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def finish(self):
+        now = time.perf_counter()
+        self._close_section(now)
+        self.total_ms = (now - self._t0) * 1000
+        return self
+
+    def to_record(self):
+        return {
+            'ts': round(self.started_at, 3),
+            'page': self.page,
+            'total_ms': round(self.total_ms or 0.0, 3),
+            'spans': [
+                {'name': name, 'depth': depth, 'start_ms': round(start, 3), 'ms': round(duration or 0.0, 3)}
+                for name, depth, start, duration in self.spans
+            ],
+            'counts': self.counts,
+        }
+
+
+class NullTrace:
+    # Stand-in when tracing is off: every call is a constant-time no-op
+
+    page = None
+
+    def span(self, name):
+        return _NULL_SPAN
+
+    def section(self, name):
+        pass
+
+    def count(self, name, value=1):
+        pass
+
+    def finish(self):
+        return self
+
+
+NULL_TRACE = NullTrace()
+
+
+def start_trace(page, enabled=TRACE_ALL):
+    trace = RerunTrace(page) if enabled else NULL_TRACE
+    _current.trace = trace
+    return trace
+
+
+def current_trace():
+    return getattr(_current, 'trace', NULL_TRACE)
+
+
+def span(name):
+    # `with span('filters'):` times a block against whichever rerun is running on this thread
+    return current_trace().span(name)
+
+
+def section(name):
+    current_trace().section(name)
+
+
+def count(name, value=1):
+    current_trace().count(name, value)
+
+
+def finish_trace(trace, history=None):
+    # Closes the rerun, keeps it in the session's `history` deque and logs it when TRACE_ALL is on
+    _current.trace = NULL_TRACE
+    if trace is NULL_TRACE:
+        return None
+    trace.finish()
+    if history is not None:
+        history.append(trace)
+    if TRACE_ALL:
+        append_trace_log(trace.to_record())
+    return trace
+
+
+def append_trace_log(record, path=TRACE_LOG_PATH):
+    line = json.dumps(record, ensure_ascii=False) + '\n'
+    with _log_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+def new_history(maxlen=TRACE_HISTORY):
+    return deque(maxlen=maxlen)
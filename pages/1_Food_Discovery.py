@@ -1,5 +1,13 @@
+import math
+
 import streamlit as st
-import pandas as pd
+
+from nourishwell.data import FOOD_ID_COL, get_catalog
+from nourishwell.debug_panel import begin_rerun_trace, end_rerun_trace
+from nourishwell.nutrients import shared_nutrients
+from nourishwell.suggest import plan_coverage
+from nourishwell.query import FoodQuery, query_rows
+from nourishwell.tracing import count, section
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
@@ -7,8 +15,10 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="collapsed" # No sidebar filters needed here
 )
+rerun_trace = begin_rerun_trace("Food Discovery") # no-op unless ?debug=1 / ?profile=<token> or their env flags are set
 
 # --- CUSTOM CSS FOR MODERN UI (Repeated for consistency across pages) ---
+section('css')
 st.markdown("""
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
@@ -184,24 +194,56 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- CSV DATA LOADING ---
-@st.cache_data
-def load_data():
-    try:
-        df = pd.read_csv('anti_inflammatory_foods.csv', encoding='utf-8-sig')
-    except UnicodeDecodeError:
-        df = pd.read_csv('anti_inflammatory_foods.csv', encoding='ISO-8859-1')
-    return df
-
-df = load_data()
+section('load_data')
+# Loaded once per process and shared read-only by every session (see nourishwell/data.py)
+catalog = get_catalog()
+df = catalog.df
 
 # --- SESSION STATE INITIALIZATION ---
 if 'selected_foods_for_plan' not in st.session_state:
-    st.session_state.selected_foods_for_plan = []
+    st.session_state.selected_foods_for_plan = {} # ordered set of food ids: {food_id: None}, in the order added
 if 'detailed_food_id' not in st.session_state:
     st.session_state.detailed_food_id = None
+if 'discovery_page' not in st.session_state:
+    st.session_state.discovery_page = 1
+if 'discovery_similar_to' not in st.session_state:
+    st.session_state.discovery_similar_to = None # id of the food just added, whose alternatives are suggested
+
+# Only one page of the table is rendered per rerun, so payload size is bounded by the page size
+PAGE_SIZE_OPTIONS = [10, 25, 50, 100]
+SIMILAR_SUGGESTIONS = 4 # alternatives shown after adding a food (read from the catalog's precomputed neighbours)
+NEXT_SUGGESTIONS = 5 # "Suggested next" foods under the plan summary
+
+def reset_page():
+    st.session_state.discovery_page = 1
+
+def go_to_page(offset):
+    st.session_state.discovery_page += offset
+
+def reset_filters():
+    st.session_state.discovery_category_filter = 'All Categories'
+    st.session_state.discovery_sort_by = 'Highest Score'
+    st.session_state.discovery_search_term = ''
+    st.session_state.discovery_min_score = 0
+    st.session_state.discovery_concerns = []
+    st.session_state.discovery_concern_mode = 'Any of'
+    st.session_state.discovery_nutrients = []
+    st.session_state.discovery_page = 1
+
+def hide_similar():
+    st.session_state.discovery_similar_to = None
+
+def add_to_plan(food_id, food_item):
+    if food_id not in st.session_state.selected_foods_for_plan:
+        st.session_state.selected_foods_for_plan[food_id] = None
+        st.session_state.discovery_similar_to = food_id
+        st.toast(f"'{food_item}' added to your plan! 🎉", icon="✅")
+    else:
+        st.toast(f"'{food_item}' is already in your plan!", icon="ℹ️")
 
 
 # --- HEADER SECTION ---
+section('header')
 st.title("📊 Anti-Inflammatory Foods Dashboard")
 st.markdown("""
 <p style='font-size: 1.15rem; color: #475569; margin-bottom: 2rem;'>
@@ -211,33 +253,40 @@ st.markdown("""
 
 
 # --- FILTER AND SEARCH BAR (Top of Page, Horizontal Row) ---
+section('filter_widgets')
 st.subheader("Filter & Search")
 
 filter_cols = st.columns([1.5, 1, 1.5, 1, 0.5]) # Adjust column ratios for filter elements
 
-all_categories = ['All Categories'] + sorted(df['Category'].dropna().unique().tolist())
-all_health_flags = ['All Concerns'] + sorted({flag.strip() for row in df['Flags (Female Health Issues)'].dropna() for flag in str(row).split(',') if flag.strip()})
-sort_options = {"Highest Score": "desc", "Lowest Score": "asc", "Alphabetical (A-Z)": "alpha_asc"}
+all_categories = ['All Categories'] + list(catalog.categories)
+all_health_flags = list(catalog.health_flags)
+all_nutrients = list(catalog.nutrients)
+concern_match_modes = {"Any of": "any", "All of": "all"}
+sort_options = {"Highest Score": "desc", "Best Match": "relevance", "Lowest Score": "asc", "Alphabetical (A-Z)": "alpha_asc"}
 
 with filter_cols[0]:
     selected_category = st.selectbox(
         "By Category:",
         options=all_categories,
         index=0,
-        key='discovery_category_filter'
+        key='discovery_category_filter',
+        on_change=reset_page
     )
 with filter_cols[1]:
     sort_by = st.selectbox(
         "Sort By:",
         options=list(sort_options.keys()),
         index=0,
-        key='discovery_sort_by'
+        key='discovery_sort_by',
+        help="Best Match ranks foods by how well they match your search (food name first, then nutrients, then the why text)",
+        on_change=reset_page
     )
 with filter_cols[2]:
     search_term = st.text_input(
         "Search Foods:",
         placeholder="e.g., salmon, magnesium, PCOS",
-        key='discovery_search_term'
+        key='discovery_search_term',
+        on_change=reset_page
     )
 with filter_cols[3]:
     min_score = st.slider(
@@ -245,55 +294,136 @@ with filter_cols[3]:
         min_value=0,
         max_value=10,
         value=0,
-        key='discovery_min_score'
+        key='discovery_min_score',
+        on_change=reset_page
     )
 with filter_cols[4]:
-    if st.button("Reset", key='discovery_reset_filters', type="secondary", help="Clear all filters"):
-        st.session_state.discovery_category_filter = 'All Categories'
-        st.session_state.discovery_sort_by = 'Highest Score'
-        st.session_state.discovery_search_term = ''
-        st.session_state.discovery_min_score = 0
-        st.rerun() # Rerun to apply reset
+    # Reset runs as a callback: widget state can only be changed before the widgets are created
+    st.button("Reset", key='discovery_reset_filters', type="secondary", help="Clear all filters", on_click=reset_filters)
+
+concern_cols = st.columns([4, 1])
+with concern_cols[0]:
+    selected_concerns = st.multiselect(
+        "By Health Concern:",
+        options=all_health_flags,
+        placeholder="e.g., PCOS / Hormonal Balance, Endometriosis",
+        key='discovery_concerns',
+        on_change=reset_page
+    )
+with concern_cols[1]:
+    concern_mode = st.radio(
+        "Match:",
+        options=list(concern_match_modes.keys()),
+        horizontal=True,
+        key='discovery_concern_mode',
+        on_change=reset_page
+    )
+
+selected_nutrients = st.multiselect(
+    "Provides Nutrients (all of):",
+    options=all_nutrients,
+    placeholder="e.g., Magnesium, Folate",
+    help="Foods that provide every selected nutrient. Broad groups include their forms, e.g. Omega-3 covers ALA and EPA/DHA.",
+    key='discovery_nutrients',
+    on_change=reset_page
+)
 
 
 # --- APPLY FILTERS ---
-filtered_df = df.copy()
-
-# Category Filter
-if selected_category != 'All Categories':
-    filtered_df = filtered_df[filtered_df['Category'] == selected_category]
-
-# Minimum Score Filter
-filtered_df = filtered_df[filtered_df['Score (0–10)'] >= min_score]
-
-# Search Filter
-if search_term:
-    search_term_lower = search_term.lower()
-    # Apply search across relevant text columns using .get() for safety
-    filtered_df = filtered_df[
-        filtered_df.apply(lambda row:
-            (str(row.get('Food Item', '')).lower().find(search_term_lower) != -1) or
-            (str(row.get('Why Anti-Inflammatory', '')).lower().find(search_term_lower) != -1) or
-            (str(row.get('Key Vitamins & Minerals', '')).lower().find(search_term_lower) != -1) or
-            (str(row.get('Flags (Female Health Issues)', '')).lower().find(search_term_lower) != -1),
-        axis=1)
-    ]
-
-# Sorting
-if sort_by == "Highest Score":
-    filtered_df = filtered_df.sort_values(by='Score (0–10)', ascending=False)
-elif sort_by == "Lowest Score":
-    filtered_df = filtered_df.sort_values(by='Score (0–10)', ascending=True)
-elif sort_by == "Alphabetical (A-Z)":
-    filtered_df = filtered_df.sort_values(by='Food Item', ascending=True)
-
-
-st.markdown(f"<p style='font-size: 1.1rem; margin-bottom: 1.5rem; color: #475569;'>Showing <b>{len(filtered_df)}</b> foods.</p>", unsafe_allow_html=True)
+section('filter')
+# Filtering and sorting go through a process-wide result cache keyed by the full filter state, so
+# reruns with unchanged filters are a lookup and a longer search narrows the cached shorter one
+food_query = FoodQuery.build(
+    category=None if selected_category == 'All Categories' else selected_category,
+    min_score=min_score,
+    concerns=selected_concerns,
+    concern_mode=concern_match_modes[concern_mode],
+    nutrients=selected_nutrients,
+    search=search_term,
+    sort=sort_options[sort_by],
+)
+result_rows = query_rows(catalog, food_query) # row positions in display order; nothing is copied yet
+result_count = len(result_rows)
+count('foods_matched', result_count)
+
+
+# --- PAGINATION ---
+section('pagination')
+pager_cols = st.columns([1, 1, 1, 1, 2])
+with pager_cols[0]:
+    page_size = st.selectbox(
+        "Rows per page:",
+        options=PAGE_SIZE_OPTIONS,
+        index=1,
+        key='discovery_page_size',
+        on_change=reset_page
+    )
+
+total_pages = max(1, math.ceil(result_count / page_size))
+# Clamp before the widget is created so a shrinking result set never leaves us past the last page
+st.session_state.discovery_page = min(max(st.session_state.discovery_page, 1), total_pages)
+
+with pager_cols[1]:
+    st.number_input(
+        "Page:",
+        min_value=1,
+        max_value=total_pages,
+        step=1,
+        key='discovery_page'
+    )
+with pager_cols[2]:
+    st.button("← Previous", key='discovery_prev_page', type="secondary", use_container_width=True,
+              disabled=st.session_state.discovery_page <= 1, on_click=go_to_page, args=(-1,))
+with pager_cols[3]:
+    st.button("Next →", key='discovery_next_page', type="secondary", use_container_width=True,
+              disabled=st.session_state.discovery_page >= total_pages, on_click=go_to_page, args=(1,))
+
+page_start = (st.session_state.discovery_page - 1) * page_size
+page_end = min(page_start + page_size, result_count)
+page_df = df.iloc[result_rows[page_start:page_end]] # only the visible page is materialized
+
+if result_count == 0:
+    st.markdown("<p style='font-size: 1.1rem; margin-bottom: 1.5rem; color: #475569;'>Showing <b>0</b> foods.</p>", unsafe_allow_html=True)
+else:
+    st.markdown(f"<p style='font-size: 1.1rem; margin-bottom: 1.5rem; color: #475569;'>Showing <b>{page_start + 1}–{page_end}</b> of <b>{result_count}</b> foods (page {st.session_state.discovery_page} of {total_pages}).</p>", unsafe_allow_html=True)
+
+# --- SIMILAR FOODS (after adding a food) ---
+section('similar_foods')
+similar_to = st.session_state.discovery_similar_to
+similar_rows = []
+if similar_to is not None and similar_to in catalog.id_rows:
+    similar_to_row = catalog.id_rows[similar_to]
+    neighbor_rows, _ = catalog.similar_index.similar(similar_to_row) # all stored neighbours, best first
+    neighbor_ids = df[FOOD_ID_COL].to_numpy()[neighbor_rows].tolist()
+    similar_rows = [row for row, food_id in zip(neighbor_rows.tolist(), neighbor_ids)
+                    if food_id not in st.session_state.selected_foods_for_plan][:SIMILAR_SUGGESTIONS]
+
+if similar_rows:
+    with st.container(border=True):
+        similar_header_cols = st.columns([6, 1])
+        with similar_header_cols[0]:
+            st.markdown(f"**Similar to {df.iloc[similar_to_row]['Food Item']}:** alternatives with a comparable nutrient and benefit profile, handy when it isn't available where you live.")
+        with similar_header_cols[1]:
+            st.button("Hide", key='discovery_hide_similar', type="secondary", on_click=hide_similar)
+        for row in similar_rows:
+            similar_food = df.iloc[row]
+            similar_food_id = int(similar_food[FOOD_ID_COL])
+            shared = shared_nutrients(catalog.nutrient_index, similar_to_row, row)
+            similar_cols = st.columns([2, 1, 3, 0.75, 1])
+            similar_cols[0].markdown(f"**{similar_food['Food Item']}**")
+            similar_cols[1].markdown(str(similar_food['Category']))
+            similar_cols[2].markdown(f"Also provides: {', '.join(shared[:3])}" if shared else "Similar benefits")
+            similar_cols[3].markdown(f"**{similar_food['Score (0–10)']}**")
+            with similar_cols[4]:
+                st.button("Add to Plan", key=f"add_similar_{similar_food_id}", type="primary",
+                          on_click=add_to_plan, args=(similar_food_id, similar_food['Food Item']))
 
 # --- MAIN TABLE/LIST DISPLAY (Manually constructed with st.columns and st.button) ---
+section('render_rows')
+count('rows_rendered', len(page_df))
 st.subheader("Food Database")
 
-if filtered_df.empty:
+if result_count == 0:
     st.info("No foods match your current filter and search criteria. Try broadening your selection!")
 else:
     # Define column widths for the manual table to make it responsive
@@ -310,15 +440,16 @@ else:
     header_cols[6].markdown("<div class='table-header'>Action</div>", unsafe_allow_html=True)
 
 
-    # Data Rows
-    for index, food in filtered_df.iterrows():
+    # Data Rows (current page only)
+    for _, food in page_df.iterrows():
         row_cols = st.columns(col_widths)
         
         # Using .get() for robust column access, providing empty string if column is missing/NaN
+        food_id = int(food[FOOD_ID_COL])
         food_item = food.get('Food Item', '')
         category = food.get('Category', '')
         key_nutrients = food.get('Key Vitamins & Minerals', '')
-        why_anti_inflammatory = food.get('Why Anti-Inflammatory', '')
+        why_anti_inflammatory = food.get('Why Anti-Inflammatory (for Women)', '')
         best_for = food.get('Best For', '')
         score = food.get('Score (0–10)', 'N/A')
 
@@ -338,21 +469,36 @@ else:
         with row_cols[5]:
             st.markdown(f"<div class='st_row_item'>**{score}**</div>", unsafe_allow_html=True)
         with row_cols[6]:
-            add_button_key = f"add_to_plan_{food_item}_{index}" # Unique key for each button
-            if st.button("Add to Plan", key=add_button_key, type="primary"):
-                if food_item not in st.session_state.selected_foods_for_plan:
-                    st.session_state.selected_foods_for_plan.append(food_item)
-                    st.toast(f"'{food_item}' added to your plan! 🎉", icon="✅")
-                else:
-                    st.toast(f"'{food_item}' is already in your plan!", icon="ℹ️")
-                st.rerun() # Rerun to update the selected foods list immediately
+            # on_click runs before the next rerun, so the plan is already updated without a second st.rerun()
+            st.button("Add to Plan", key=f"add_to_plan_{food_id}", type="primary", on_click=add_to_plan, args=(food_id, food_item))
 
 # --- VIEW MY PLAN BUTTON (Conditional) ---
+section('plan_summary')
 st.markdown("---") # Separator
 if st.session_state.selected_foods_for_plan:
     st.subheader("Your Meal Plan Awaits!")
     st.markdown(f"<p style='color: #475569;'>You have <b>{len(st.session_state.selected_foods_for_plan)}</b> foods selected for your plan.</p>", unsafe_allow_html=True)
-    st.page_link("pages/2_Meal_Plan.py", label="Go to My Meal Plan →", icon="➡️", type="primary")
+    st.page_link("pages/2_Meal_Plan.py", label="Go to My Meal Plan →", icon="➡️")
+
+    # --- SUGGESTED NEXT (what would add most to the plan) ---
+    section('suggested_next')
+    # The session's coverage counts are updated per food added or removed (see nourishwell/suggest.py)
+    coverage = plan_coverage(st.session_state, catalog)
+    suggested_rows = coverage.suggest(NEXT_SUGGESTIONS)
+    if len(suggested_rows):
+        st.markdown("**Suggested next:** the foods that would add the most health concerns, key nutrients and variety to your plan.")
+        for row in suggested_rows.tolist():
+            suggested_food = df.iloc[row]
+            suggested_food_id = int(suggested_food[FOOD_ID_COL])
+            new_flags, new_nutrients = coverage.new_features(row)
+            suggested_cols = st.columns([2, 1, 4, 1])
+            suggested_cols[0].markdown(f"**{suggested_food['Food Item']}**")
+            suggested_cols[1].markdown(str(suggested_food['Category']))
+            adds = [f"{', '.join(new_flags)} support" if new_flags else "", ", ".join(new_nutrients)]
+            suggested_cols[2].markdown(f"Adds: {'; '.join(part for part in adds if part)}" if any(adds) else "Adds variety")
+            with suggested_cols[3]:
+                st.button("Add to Plan", key=f"add_suggested_{suggested_food_id}", type="primary",
+                          on_click=add_to_plan, args=(suggested_food_id, suggested_food['Food Item']))
 else:
     st.info("Select foods from the list above to start building your personalized meal plan.")
 
@@ -371,3 +517,5 @@ else:
 # mechanism to trigger it (e.g., a multi-select for "view details" and then a global button).
 
 st.caption("Developed by Hanif | Powered by Streamlit")
+
+end_rerun_trace(rerun_trace)
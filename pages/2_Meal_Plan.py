@@ -1,8 +1,16 @@
 import streamlit as st
-import pandas as pd
 import random
-import json # For parsing LLM response
-import requests # For making HTTP requests to LLM API
+import time
+
+from nourishwell.data import get_catalog
+from nourishwell.debug_panel import begin_rerun_trace, end_rerun_trace, profiling_requested
+from nourishwell.jobs import DONE, QueueFullError, default_executor
+from nourishwell.meal_plan import meal_plan_job, selection_fingerprint
+from nourishwell.nutrients import KEY_NUTRIENTS
+from nourishwell.offline_plan import build_offline_meal_plan
+from nourishwell.optimizer import optimize_multi_day_plan
+from nourishwell.suggest import plan_coverage
+from nourishwell.tracing import count, section, span
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
@@ -10,8 +18,10 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="collapsed" # No sidebar needed on meal plan page
 )
+rerun_trace = begin_rerun_trace("Meal Plan") # no-op unless ?debug=1 / ?profile=<token> or their env flags are set
 
 # --- CUSTOM CSS FOR MODERN UI (Repeated for consistency across pages) ---
+section('css')
 st.markdown("""
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
@@ -97,109 +107,80 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- CSV DATA LOADING ---
-@st.cache_data
-def load_data():
-    try:
-        df = pd.read_csv('anti_inflammatory_foods.csv', encoding='utf-8-sig')
-    except UnicodeDecodeError:
-        df = pd.read_csv('anti_inflammatory_foods.csv', encoding='ISO-8859-1')
-    return df
-
-df = load_data()
+section('load_data')
+# Same process-wide catalog object as the Food Discovery page (see nourishwell/data.py)
+catalog = get_catalog()
+df = catalog.df
 
 # --- SESSION STATE INITIALIZATION ---
 if 'selected_foods_for_plan' not in st.session_state:
-    st.session_state.selected_foods_for_plan = []
+    st.session_state.selected_foods_for_plan = {} # ordered set of food ids, see the Food Discovery page
 if 'generated_meal_plan_llm' not in st.session_state: # Renamed to avoid conflict with previous simple plan
     st.session_state.generated_meal_plan_llm = None
-
-
-# --- LLM API Call Function ---
-def get_gemini_meal_plan(selected_foods_df, api_key):
-    if not api_key:
-        st.error("API Key not found. Please set your Google API Key in Streamlit secrets.toml.")
-        return "Error: API Key not configured."
-
-    food_details_list = selected_foods_df.to_dict(orient='records')
-
-    # Constructing a detailed prompt for the LLM
-    prompt = f"""
-    You are an expert nutritionist specializing in anti-inflammatory diets for women's health.
-    Based ONLY on the following list of anti-inflammatory foods selected by the user, create a personalized one-day meal plan.
-    The meal plan should include Breakfast, Lunch, Dinner, and optionally 1-2 snacks.
-    For each meal, suggest a specific dish or usage idea that clearly incorporates 1-3 of the provided foods.
-    Briefly explain *why* the suggested meal is beneficial for women's anti-inflammatory needs, referencing the anti-inflammatory properties of the ingredients from the list.
-    Be creative and practical, using the 'Sample Recipe/Usage' column from the data where appropriate, but feel free to combine ideas.
-    Focus on balancing meals and ensuring they are genuinely anti-inflammatory.
-    The output should be in a clear, easy-to-read Markdown format.
-
-    Selected Anti-Inflammatory Foods (with their properties):
-    {json.dumps(food_details_list, indent=2)}
-
-    Please generate the meal plan:
-    """
-
-    headers = {
-        'Content-Type': 'application/json'
-    }
-    # Using gemini-2.0-flash as specified by general instructions
-    api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
-
-    payload = {
-        "contents": [
-            {
-                "role": "user",
-                "parts": [{"text": prompt}]
-            }
-        ],
-        "generationConfig": {
-            "temperature": 0.7, # Moderate creativity
-            "topK": 40,
-            "topP": 0.95,
-            "maxOutputTokens": 1500 # Sufficient length for a detailed plan
-        }
-    }
-
-    try:
-        response = requests.post(api_url, headers=headers, data=json.dumps(payload))
-        response.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
-        result = response.json()
-
-        if result and 'candidates' in result and result['candidates']:
-            generated_text = result['candidates'][0]['content']['parts'][0]['text']
-            return generated_text
+if 'meal_plan_job_id' not in st.session_state:
+    st.session_state.meal_plan_job_id = None
+if 'multi_day_plan_md' not in st.session_state:
+    st.session_state.multi_day_plan_md = None
+
+# --- BACKGROUND MEAL PLAN GENERATION ---
+# Generation runs on a process-wide bounded worker pool; this session only keeps the job id. While
+# the job runs, the end of the script polls it and redraws just the plan placeholder, then reruns
+# the page once when the job is done. Any click interrupts the polling like any other rerun.
+JOB_POLL_INTERVAL = 0.5 # seconds between status checks while a plan is being generated
+job_executor = default_executor()
+meal_plan_job_running = False
+
+def cancel_meal_plan_job():
+    if st.session_state.meal_plan_job_id:
+        job_executor.forget(st.session_state.meal_plan_job_id)
+        st.session_state.meal_plan_job_id = None
+
+def show_plan_progress(placeholder, job, stream_plan):
+    # What the job has written so far (or a waiting message), drawn in place of the last poll's
+    partial_plan_text = job.partial_text
+    with placeholder.container():
+        if stream_plan and partial_plan_text:
+            st.markdown('<div class="meal-plan-section">', unsafe_allow_html=True)
+            st.markdown(partial_plan_text)
+            st.markdown('</div>', unsafe_allow_html=True)
         else:
-            return "No meal plan could be generated by the AI at this time. Please try again or adjust your selected foods."
-    except requests.exceptions.RequestException as e:
-        return f"Error communicating with AI: {e}"
-    except json.JSONDecodeError:
-        return "Error: Could not decode AI response (invalid JSON)."
-    except KeyError:
-        return "Error: Unexpected AI response format."
+            waited = time.time() - job.submitted_at
+            st.info(f"Generating your personalized meal plan... this might take a moment ({waited:.0f}s).", icon="⏳")
 
 
 # --- HEADER ---
+section('header')
 st.title("🍽️ Your Custom Meal Plan")
 st.markdown("Review your selected foods and generate a personalized meal plan suggestion using AI.")
 
 # --- NAVIGATION BUTTONS ---
 nav_cols = st.columns(2)
 with nav_cols[0]:
-    st.page_link("pages/1_Food_Discovery.py", label="← Back to Food Discovery", icon="⬅️", type="secondary")
+    st.page_link("pages/1_Food_Discovery.py", label="← Back to Food Discovery", icon="⬅️")
 with nav_cols[1]:
     if st.button("Start Over (Clear All)", type="secondary", use_container_width=True):
-        st.session_state.selected_foods_for_plan = []
+        st.session_state.selected_foods_for_plan = {}
         st.session_state.generated_meal_plan_llm = None
+        cancel_meal_plan_job()
         st.toast("Your plan has been reset! 👋", icon="🗑️")
         st.rerun()
 
 st.markdown("---") # Separator
 
 # --- DISPLAY SELECTED FOODS ---
+section('selected_foods')
+count('foods_selected', len(st.session_state.selected_foods_for_plan))
 if not st.session_state.selected_foods_for_plan:
     st.info("Your meal plan is currently empty. Go to 'Food Discovery' to add some foods!")
 else:
-    plan_df = df[df['Food Item'].isin(st.session_state.selected_foods_for_plan)]
+    plan_rows = catalog.rows_for(st.session_state.selected_foods_for_plan) # in the order foods were added
+    plan_df = df.iloc[plan_rows]
+
+    # A job started for a different selection (e.g. foods were added on the discovery page) is stale
+    plan_job = job_executor.get(st.session_state.meal_plan_job_id) if st.session_state.meal_plan_job_id else None
+    if plan_job is not None and plan_job.key != selection_fingerprint(plan_df):
+        cancel_meal_plan_job()
+        plan_job = None
     
     st.subheader("Foods Selected for Your Plan:")
     
@@ -218,40 +199,122 @@ else:
     )
 
     # Allow removing items
+    plan_food_names = dict(zip(plan_df['Food ID'].tolist(), plan_df['Food Item'].tolist()))
     foods_to_remove = st.multiselect(
         "Select foods to remove from your plan:",
-        options=st.session_state.selected_foods_for_plan,
+        options=list(plan_food_names),
+        format_func=plan_food_names.get,
         key='remove_foods_multiselect'
     )
     if foods_to_remove:
         if st.button("Remove Selected Foods", type="secondary"):
-            for food_item in foods_to_remove:
-                if food_item in st.session_state.selected_foods_for_plan:
-                    st.session_state.selected_foods_for_plan.remove(food_item)
+            for food_id in foods_to_remove:
+                st.session_state.selected_foods_for_plan.pop(food_id, None)
             st.session_state.generated_meal_plan_llm = None # Reset generated plan if foods change
+            cancel_meal_plan_job()
             st.toast("Foods removed. Plan updated. 👍", icon="✅")
             st.rerun()
 
+    # --- NUTRIENT COVERAGE ---
+    section('nutrient_coverage')
+    st.subheader("Nutrient Coverage")
+    # The session's running counts over the catalog's food x nutrient matrix (see nourishwell/suggest.py),
+    # updated per food added or removed rather than re-counted
+    plan_nutrients = plan_coverage(st.session_state, catalog).nutrient_counts() # {nutrient: foods in the plan providing it}
+    key_covered = [name for name in KEY_NUTRIENTS if name in plan_nutrients]
+    key_missing = [name for name in KEY_NUTRIENTS if name not in plan_nutrients]
+    st.progress(len(key_covered) / len(KEY_NUTRIENTS),
+                text=f"Your plan provides {len(key_covered)} of {len(KEY_NUTRIENTS)} key anti-inflammatory nutrients")
+    coverage_cols = st.columns(2)
+    with coverage_cols[0]:
+        st.markdown("**Covered** (number of your foods providing each)")
+        st.markdown(", ".join(f"{name} ×{plan_nutrients[name]}" for name in key_covered) or "None yet.")
+    with coverage_cols[1]:
+        st.markdown("**Missing**")
+        if key_missing:
+            st.markdown(", ".join(key_missing))
+            st.caption("Use the nutrient filter on Food Discovery to find foods that fill these gaps.")
+        else:
+            st.markdown("Nothing, well done! 🎉")
+    with st.expander(f"All {len(plan_nutrients)} nutrients in your plan"):
+        nutrient_rows = sorted(plan_nutrients.items(), key=lambda item: -item[1])
+        st.dataframe(
+            {"Nutrient": [name for name, _ in nutrient_rows], "Foods": [foods for _, foods in nutrient_rows]},
+            hide_index=True,
+            use_container_width=True,
+        )
+
     st.markdown("---")
 
     # --- GENERATE MEAL PLAN BUTTON (LLM Integration) ---
+    section('generate')
     st.subheader("Generate Personalized Meal Plan")
     st.markdown("<p style='font-size: 1.1rem; color: #475569;'>Click below to get an AI-powered meal plan suggestion based on your selected anti-inflammatory foods.</p>", unsafe_allow_html=True)
     
-    if st.button("Generate Custom Meal Plan with AI", type="primary", use_container_width=True):
-        if len(st.session_state.selected_foods_for_plan) > 0:
-            with st.spinner("Generating your personalized meal plan... this might take a moment."):
-                google_api_key = st.secrets["GOOGLE_API_KEY"] # Access API key from secrets
-                generated_plan_text = get_gemini_meal_plan(plan_df, google_api_key)
-                st.session_state.generated_meal_plan_llm = generated_plan_text
-            st.toast("Meal plan generated! 🎉", icon="✨")
+    planner_options = {"AI (Gemini)": "ai", "Instant (offline)": "offline"}
+    planner_cols = st.columns(2)
+    with planner_cols[0]:
+        planner = planner_options[st.radio("Plan generator:", options=list(planner_options.keys()), horizontal=True, key='meal_plan_planner')]
+    with planner_cols[1]:
+        stream_plan = st.toggle("Show the plan as it is being written", value=True, key='stream_meal_plan', disabled=planner == "offline")
+
+    try:
+        google_api_key = st.secrets["GOOGLE_API_KEY"] # Access API key from secrets
+    except (KeyError, FileNotFoundError):
+        google_api_key = None
+
+    generate_label = "Generate Custom Meal Plan with AI" if planner == "ai" else "Generate Instant Meal Plan"
+    if st.button(generate_label, type="primary", use_container_width=True):
+        if len(st.session_state.selected_foods_for_plan) > 0 and (planner == "offline" or not google_api_key):
+            if planner == "ai":
+                st.warning("AI planning is unavailable (no Google API Key in Streamlit secrets.toml), so here is an instant plan instead.")
+            # Local and deterministic: takes milliseconds, so no background job needed
+            cancel_meal_plan_job()
+            with span('offline_plan'):
+                st.session_state.generated_meal_plan_llm = build_offline_meal_plan(plan_df)
+        elif len(st.session_state.selected_foods_for_plan) > 0:
+            cancel_meal_plan_job()
+            try:
+                # Identical selections are answered from the shared plan cache (see nourishwell/plan_cache.py)
+                plan_job = job_executor.submit(
+                    meal_plan_job, plan_df, google_api_key,
+                    key=selection_fingerprint(plan_df),
+                    profile="Meal Plan LLM job" if profiling_requested() else None # the LLM call runs off the script thread
+                )
+                st.session_state.meal_plan_job_id = plan_job.id
+                st.session_state.generated_meal_plan_llm = None
+            except QueueFullError as e:
+                st.warning(str(e))
         else:
             st.warning("Please add some foods to your plan first to generate a meal plan!")
-        st.rerun() # Rerun to display the generated plan
+
+    # --- MEAL PLAN JOB STATUS ---
+    section('job_status')
+    if plan_job is not None and plan_job.done:
+        # The LLM call itself runs on a worker thread, so its timings are picked up here
+        if plan_job.started_at:
+            count('llm_queue_ms', round((plan_job.started_at - plan_job.submitted_at) * 1000, 1))
+        if plan_job.started_at and plan_job.finished_at:
+            count('llm_job_ms', round((plan_job.finished_at - plan_job.started_at) * 1000, 1))
+        if plan_job.status == DONE:
+            st.session_state.generated_meal_plan_llm = plan_job.result
+            st.toast("Meal plan generated! 🎉", icon="✨")
+        elif plan_job.error:
+            st.session_state.generated_meal_plan_llm = f"Error: Meal plan generation failed ({plan_job.error})."
+        job_executor.forget(plan_job.id)
+        st.session_state.meal_plan_job_id = None
+    elif plan_job is not None:
+        meal_plan_job_running = True
+        count('llm_partial_chars', len(plan_job.partial_text))
+        st.subheader("Your AI-Suggested Daily Plan:")
+        plan_progress = st.empty() # redrawn by the poll at the end of the page as chunks arrive
+        show_plan_progress(plan_progress, plan_job, stream_plan)
+        st.button("Cancel Generation", type="secondary", on_click=cancel_meal_plan_job)
 
     # --- DISPLAY GENERATED MEAL PLAN ---
+    section('display_plan')
     if st.session_state.generated_meal_plan_llm:
-        st.subheader("Your AI-Suggested Daily Plan:")
+        st.subheader("Your Suggested Daily Plan:")
         st.markdown('<div class="meal-plan-section">', unsafe_allow_html=True)
         st.markdown(st.session_state.generated_meal_plan_llm) # LLM output is already Markdown
         st.markdown('</div>', unsafe_allow_html=True)
@@ -262,10 +325,11 @@ else:
         copy_text_area = st.text_area("Copyable Plan Text:", st.session_state.generated_meal_plan_llm, height=200, label_visibility="collapsed")
         
         copy_button_label = "Copy Plan to Clipboard"
+        escaped_plan_text = copy_text_area.replace('`', '\\`') # Backslashes aren't allowed inside f-string expressions before Python 3.12
         st.markdown(
             f"""
             <button
-                onclick="navigator.clipboard.writeText(`{copy_text_area.replace('`', '\\`')}`); alert('Meal plan copied to clipboard!');"
+                onclick="navigator.clipboard.writeText(`{escaped_plan_text}`); alert('Meal plan copied to clipboard!');"
                 style="
                     background-color: #10B981; /* Green-500 */
                     color: white;
@@ -286,4 +350,47 @@ else:
             unsafe_allow_html=True
         )
 
+# --- MULTI-DAY PLAN (local optimizer, no AI call) ---
+section('multi_day')
+st.markdown("---")
+with st.expander("📅 Plan several days ahead", expanded=st.session_state.multi_day_plan_md is not None):
+    st.markdown("<p style='color: #475569;'>Build a 7–28 day rotation that covers your chosen health concerns every day while keeping foods and categories varied.</p>", unsafe_allow_html=True)
+    multi_day_cols = st.columns([3, 1, 1])
+    with multi_day_cols[0]:
+        multi_day_concerns = st.multiselect("Health concerns to cover daily:", options=list(catalog.health_flags), key='multi_day_concerns')
+    with multi_day_cols[1]:
+        multi_day_days = st.slider("Days:", min_value=7, max_value=28, value=7, key='multi_day_days')
+    with multi_day_cols[2]:
+        multi_day_foods_per_day = st.slider("Foods per day:", min_value=3, max_value=10, value=6, key='multi_day_foods_per_day')
+    multi_day_only_selected = st.checkbox(
+        "Only use foods from my plan",
+        value=bool(st.session_state.selected_foods_for_plan),
+        disabled=not st.session_state.selected_foods_for_plan,
+        key='multi_day_only_selected'
+    )
+    if st.button("Build Multi-Day Plan", type="secondary", use_container_width=True):
+        candidate_rows = None
+        if multi_day_only_selected and st.session_state.selected_foods_for_plan:
+            candidate_rows = catalog.rows_for(st.session_state.selected_foods_for_plan)
+        with span('optimize_multi_day'):
+            multi_day_plan = optimize_multi_day_plan(
+                catalog,
+                multi_day_concerns,
+                days=multi_day_days,
+                foods_per_day=multi_day_foods_per_day,
+                rows=candidate_rows
+            )
+        st.session_state.multi_day_plan_md = multi_day_plan.to_markdown(catalog)
+    if st.session_state.multi_day_plan_md:
+        st.markdown(st.session_state.multi_day_plan_md)
+
 st.caption("Developed by Hanif | Powered by Streamlit")
+end_rerun_trace(rerun_trace)
+
+# --- POLL THE BACKGROUND JOB (after the whole page has rendered) ---
+if meal_plan_job_running:
+    while not plan_job.done:
+        time.sleep(JOB_POLL_INTERVAL)
+        if not plan_job.done:
+            show_plan_progress(plan_progress, plan_job, stream_plan)
+    st.rerun() # once, to show the finished plan
@@ -0,0 +1,151 @@
+import http.client
+import json
+
+import pytest
+import requests
+
+from nourishwell import api
+from nourishwell.data import FOOD_ID_COL, get_catalog
+from nourishwell.jobs import JobExecutor
+from nourishwell.query import FoodQuery, query_rows
+
+TOKEN = 'secret-token'
+
+
+@pytest.fixture(scope='module')
+def executor():
+    return JobExecutor(max_workers=1)
+
+
+@pytest.fixture(scope='module')
+def server(executor):
+    server, base_url = api.start_in_background(api_key='gemini-key', api_token=TOKEN, executor=executor)
+    yield server, base_url
+    server.shutdown()
+
+
+@pytest.fixture
+def base_url(server):
+    return server[1]
+
+
+@pytest.fixture
+def session():
+    with requests.Session() as session:
+        yield session
+
+
+@pytest.fixture(scope='module')
+def food_ids():
+    return get_catalog().df[FOOD_ID_COL].tolist()[:2]
+
+
+@pytest.fixture
+def fake_ai(monkeypatch):
+    # Jobs that finish at once instead of calling Gemini
+    submitted = []
+
+    def submit_meal_plan(catalog, food_ids, api_key, executor=None):
+        submitted.append(food_ids)
+        return executor.submit(lambda job: 'AI plan')
+
+    monkeypatch.setattr(api.engine, 'submit_meal_plan', submit_meal_plan)
+    return submitted
+
+
+def test_catalog_etag_revalidates_with_304(session, base_url):
+    response = session.get(f'{base_url}/catalog')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert get_catalog().version in etag
+
+    revalidated = session.get(f'{base_url}/catalog', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b''
+    assert revalidated.headers['ETag'] == etag
+    assert session.get(f'{base_url}/catalog', headers={'If-None-Match': 'W/"other"'}).status_code == 200
+
+
+@pytest.mark.parametrize('params', [
+    {'sort': 'alpha_asc'},
+    {'q': 'magnesium', 'sort': 'relevance'},
+    {'min_score': 8, 'sort': 'asc'},
+])
+def test_cursor_paging_matches_the_full_query(session, base_url, params):
+    ids, cursor = [], None
+    while True:
+        body = session.get(f'{base_url}/foods', params={**params, 'limit': 4, 'cursor': cursor}).json()
+        assert len(body['foods']) <= 4
+        ids += [food['id'] for food in body['foods']]
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    catalog = get_catalog()
+    query = FoodQuery.build(search=params.get('q', ''), min_score=params.get('min_score', 0), sort=params['sort'])
+    assert ids == catalog.df[FOOD_ID_COL].to_numpy()[query_rows(catalog, query)].tolist()
+    assert body['total'] == len(ids)
+
+
+def test_bad_cursor_is_a_400(session, base_url):
+    response = session.get(f'{base_url}/foods', params={'cursor': '10.abc'})
+    assert response.status_code == 400
+    assert response.json()['error']['code'] == 400
+
+
+def test_ai_plan_needs_the_token(session, base_url, food_ids, fake_ai):
+    response = session.post(f'{base_url}/plans', json={'food_ids': food_ids})
+    assert response.status_code == 401
+    wrong = session.post(f'{base_url}/plans', json={'food_ids': food_ids}, headers={'Authorization': 'Bearer nope'})
+    assert wrong.status_code == 401
+    assert fake_ai == []
+
+    accepted = session.post(f'{base_url}/plans', json={'food_ids': food_ids}, headers={'Authorization': f'Bearer {TOKEN}'})
+    assert accepted.status_code == 202
+    assert fake_ai == [food_ids]
+
+
+def test_offline_plan_needs_no_token(session, base_url, food_ids, fake_ai):
+    response = session.post(f'{base_url}/plans', json={'food_ids': food_ids, 'offline': True})
+    assert response.status_code == 200
+    assert response.json()['source'] == 'offline'
+    assert fake_ai == []
+
+
+def test_no_configured_token_means_offline_plans(executor, food_ids, fake_ai):
+    server, base_url = api.start_in_background(api_key='gemini-key', api_token='', executor=executor)
+    try:
+        response = requests.post(f'{base_url}/plans', json={'food_ids': food_ids}, headers={'Authorization': 'Bearer '})
+    finally:
+        server.shutdown()
+    assert response.status_code == 200
+    assert response.json()['source'] == 'offline'
+    assert fake_ai == []
+
+
+@pytest.mark.parametrize('bad_ids', [[True], 'x', [1.0], None])
+def test_food_ids_must_be_integers(session, base_url, food_ids, bad_ids):
+    body = {'food_ids': [*food_ids, *bad_ids] if isinstance(bad_ids, list) else bad_ids, 'offline': True}
+    response = session.post(f'{base_url}/plans', json=body)
+    assert response.status_code == 400
+
+
+def test_bad_content_length_is_a_json_400(server):
+    host, port = server[0].server_address[:2]
+    connection = http.client.HTTPConnection(host, port)
+    connection.putrequest('POST', '/v1/plans')
+    connection.putheader('Content-Length', 'lots')
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == 400
+    assert json.loads(response.read())['error']['code'] == 400
+    connection.close()
+
+
+def test_unexpected_errors_are_a_json_500(session, base_url, food_ids, monkeypatch):
+    def broken(catalog, food_id):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(api.engine, 'get_food', broken)
+    response = session.get(f'{base_url}/foods/{food_ids[0]}')
+    assert response.status_code == 500
+    assert response.json() == {'error': {'code': 500, 'message': 'Internal server error.'}}
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+from nourishwell import batch
+from nourishwell.data import get_catalog
+from nourishwell.llm_client import LLMClient
+from nourishwell.plan_cache import NullPlanCache
+from nourishwell.stub_server import start_in_background
+
+
+class FakeClock:
+    # Stands in for the time module inside batch, so the bucket can be stepped without sleeping
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class CountingLimiter:
+    def __init__(self):
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(batch, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def stub():
+    server, base_url = start_in_background()
+    yield server, base_url
+    server.shutdown()
+
+
+def test_token_bucket_bursts_then_holds_rate(clock):
+    bucket = batch.TokenBucket(rate=2, capacity=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.now == 0
+    for _ in range(4):
+        bucket.acquire()
+    assert clock.now == pytest.approx(2.0)  # 4 more tokens at 2 per second
+
+
+def test_token_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        batch.TokenBucket(rate=0)
+
+
+def test_every_retry_takes_a_token(stub):
+    server, base_url = stub
+    server.fail_rate = 1.0  # every attempt is a 503
+    client = LLMClient(base_url, max_retries=2, backoff_base=0)
+    limiter = CountingLimiter()
+    profile = {'id': 'p1', 'foods': ['Eggs']}
+    result = batch.run_profile(profile, get_catalog(), 'stub', NullPlanCache(), client, limiter)
+    assert result['status'] == 'error'
+    assert limiter.acquired == server.request_count == 3
+
+
+def test_read_profiles_keeps_falsy_ids(tmp_path):
+    path = tmp_path / 'profiles.jsonl'
+    lines = [{'id': 0, 'foods': ['Eggs']}, {'foods': 'Eggs; Spinach'}, {'id': '', 'foods': []}]
+    path.write_text(''.join(json.dumps(line) + '\n' for line in lines), encoding='utf-8')
+    profiles = batch.read_profiles(path)
+    assert [profile['id'] for profile in profiles] == ['0', '2', '']
+    assert profiles[1]['foods'] == ['Eggs', 'Spinach']
+
+
+def test_completed_profile_ids_skips_non_results(tmp_path):
+    out = tmp_path / 'plans.jsonl'
+    out.write_text('\n'.join([
+        json.dumps({'id': 'a', 'status': 'ok'}),
+        json.dumps({'id': 'b', 'status': 'error'}),
+        json.dumps([1, 2]),
+        json.dumps('ok'),
+        json.dumps({'status': 'ok'}),
+        '{"id": "c", "stat',  # torn by a crash
+    ]), encoding='utf-8')
+    assert batch.completed_profile_ids(out) == {'a'}
+
+
+def test_run_batch_resumes_where_it_stopped(tmp_path, stub):
+    _, base_url = stub
+    profiles = tmp_path / 'profiles.csv'
+    profiles.write_text('id,foods\na,Eggs\nb,Spinach;Broccoli\nc,Blueberries\n', encoding='utf-8')
+    out = tmp_path / 'plans.jsonl'
+    out.write_text(json.dumps({'id': 'a', 'status': 'ok', 'plan': '...'}) + '\n', encoding='utf-8')
+
+    stats = batch.run_batch(profiles, out, 'stub', concurrency=2, rate=100, use_cache=False, api_base=base_url)
+    assert stats['skipped_already_done'] == 1
+    assert stats['ok'] == stats['processed'] == 2
+    assert batch.completed_profile_ids(out) == {'a', 'b', 'c'}
+
+    stats = batch.run_batch(profiles, out, 'stub', use_cache=False, api_base=base_url)
+    assert stats['processed'] == 0 and stats['skipped_already_done'] == 3
+
+
+@pytest.mark.parametrize('option', ['--concurrency', '--rate'])
+def test_cli_rejects_non_positive_limits(option, tmp_path):
+    with pytest.raises(SystemExit):
+        batch.main(['profiles.csv', '--out', str(tmp_path / 'plans.jsonl'), '--api-key', 'stub', option, '0'])
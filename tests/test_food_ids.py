@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+from nourishwell.data import CATALOG_PATH, FOOD_COL, FOOD_ID_COL, FOOD_ID_MASK, assign_food_ids, load_catalog
+from nourishwell.meal_plan import selection_fingerprint
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_catalog(CATALOG_PATH)
+
+
+def ids_by_name(df):
+    return dict(zip(df[FOOD_COL], df[FOOD_ID_COL].tolist()))
+
+
+def test_ids_are_unique_and_json_safe(catalog):
+    ids = catalog.df[FOOD_ID_COL]
+    assert ids.is_unique
+    assert ((ids >= 0) & (ids <= FOOD_ID_MASK)).all()
+
+
+def test_ids_survive_a_reload(catalog):
+    assert load_catalog(CATALOG_PATH).df[FOOD_ID_COL].tolist() == catalog.df[FOOD_ID_COL].tolist()
+
+
+def test_ids_survive_edits_elsewhere_in_the_csv(catalog, tmp_path):
+    raw = pd.read_csv(CATALOG_PATH)
+    edited = raw[raw[FOOD_COL] != 'Eggs'].iloc[::-1]  # one food removed, the rest reordered
+    path = tmp_path / 'foods.csv'
+    edited.to_csv(path, index=False)
+    expected = {name: food_id for name, food_id in ids_by_name(catalog.df).items() if name != 'Eggs'}
+    assert ids_by_name(load_catalog(path).df) == expected
+
+
+def test_duplicate_names_get_distinct_ids(catalog, tmp_path):
+    raw = pd.read_csv(CATALOG_PATH)
+    path = tmp_path / 'foods.csv'
+    pd.concat([raw, raw[raw[FOOD_COL] == 'Kale']]).to_csv(path, index=False)
+    df = load_catalog(path).df
+    kale = df[df[FOOD_COL] == 'Kale']
+    assert len(kale) == 2 and kale[FOOD_ID_COL].is_unique
+    assert kale[FOOD_ID_COL].iloc[0] == ids_by_name(catalog.df)['Kale']  # the first one keeps its id
+    # ...and a plan with either Kale is a different plan
+    assert selection_fingerprint(kale.iloc[[0]]) != selection_fingerprint(kale.iloc[[1]])
+
+
+def test_ids_depend_on_name_and_occurrence_only():
+    first, second, other = assign_food_ids(['Kale', 'Kale', 'Spinach'])
+    assert first != second
+    assert assign_food_ids(['Spinach', 'Kale']).tolist() == [other, first]
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from nourishwell import jobs
+from nourishwell.jobs import CANCELLED, DONE, FAILED, JobExecutor, QueueFullError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def wait_done(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not job.done:
+        assert time.monotonic() < deadline, f"job still {job.status}"
+        time.sleep(0.01)
+    return job
+
+
+def blocking(job, release):
+    # Holds its worker until `release` is set, or stops early once cancelled
+    while not release.wait(0.01):
+        if job.cancelled:
+            return 'stopped'
+    return 'finished'
+
+
+@pytest.fixture
+def release():
+    release = threading.Event()
+    yield release
+    release.set()
+
+
+def test_result_and_error_are_set_with_the_status():
+    executor = JobExecutor(max_workers=1)
+    ok = wait_done(executor.submit(lambda job, text: text.upper(), 'plan'))
+    assert (ok.status, ok.result, ok.error) == (DONE, 'PLAN', None)
+    assert ok.finished_at >= ok.started_at >= ok.submitted_at
+
+    def fails(job):
+        raise RuntimeError('upstream down')
+
+    failed = wait_done(executor.submit(fails))
+    assert (failed.status, failed.result, failed.error) == (FAILED, None, 'upstream down')
+
+
+def test_cancel_running_job(release):
+    executor = JobExecutor(max_workers=1)
+    job = executor.submit(blocking, release)
+    while job.started_at is None:
+        time.sleep(0.01)
+    executor.cancel(job.id)
+    assert wait_done(job).status == CANCELLED
+    assert job.result == 'stopped'
+
+
+def test_cancel_queued_job_never_runs(release):
+    executor = JobExecutor(max_workers=1)
+    running = executor.submit(blocking, release)
+    queued = executor.submit(blocking, release)
+    executor.cancel(queued.id)
+    assert queued.status == CANCELLED and queued.started_at is None
+    release.set()
+    assert wait_done(running).status == DONE
+
+
+def test_forget_drops_the_job(release):
+    executor = JobExecutor(max_workers=1)
+    job = executor.submit(blocking, release)
+    executor.forget(job.id)
+    assert executor.get(job.id) is None
+    assert wait_done(job).status == CANCELLED
+
+
+def test_full_queue_refuses_new_jobs(release):
+    executor = JobExecutor(max_workers=1, max_pending=2)
+    executor.submit(blocking, release)
+    executor.submit(blocking, release)
+    with pytest.raises(QueueFullError):
+        executor.submit(blocking, release)
+    release.set()
+
+
+def test_finished_jobs_are_pruned_after_retention(monkeypatch, release):
+    clock = FakeClock()
+    monkeypatch.setattr(jobs, 'time', clock)
+    executor = JobExecutor(max_workers=1, retention_seconds=60)
+    finished = wait_done(executor.submit(lambda job: 'plan'))
+    running = executor.submit(blocking, release)
+
+    clock.now += 30
+    executor.submit(lambda job: None)  # submitting prunes
+    assert executor.get(finished.id) is finished
+
+    clock.now += 31
+    executor.submit(lambda job: None)
+    assert executor.get(finished.id) is None
+    assert executor.get(running.id) is running  # unfinished jobs are never pruned
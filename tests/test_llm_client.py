@@ -0,0 +1,95 @@
+import pytest
+
+from nourishwell import llm_client
+from nourishwell.llm_client import CircuitBreaker, CircuitOpenError, LLMClient
+from nourishwell.stub_server import start_in_background
+
+PATH = 'models/gemini-2.0-flash:generateContent'
+PAYLOAD = {'contents': [{'role': 'user', 'parts': [{'text': 'plan'}]}]}
+
+
+class FakeClock:
+    # Stands in for the time module inside llm_client: sleeps are recorded, not slept
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_client, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def stub():
+    server, base_url = start_in_background()
+    yield server, base_url
+    server.shutdown()
+
+
+def test_breaker_opens_half_opens_and_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.state == 'closed' and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    clock.now += 30
+    assert breaker.state == 'half-open'
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial call at a time
+    breaker.record_failure()  # the trial failed: open again for another reset_timeout
+    assert breaker.state == 'open'
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_open_circuit_fails_fast_without_a_request(stub, clock):
+    server, base_url = stub
+    server.fail_rate = 1.0
+    client = LLMClient(base_url, max_retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=30))
+    for _ in range(2):
+        assert client.post(PATH, PAYLOAD).status_code == 503
+    with pytest.raises(CircuitOpenError):
+        client.post(PATH, PAYLOAD)
+    assert server.request_count == 2
+
+    server.fail_rate = 0.0
+    clock.now += 30
+    assert client.post(PATH, PAYLOAD).status_code == 200
+    assert client.breaker.state == 'closed'
+
+
+def test_retry_after_sets_the_backoff(stub, clock):
+    server, base_url = stub
+    server.fail_rate, server.retry_after = 1.0, 3
+    client = LLMClient(base_url, max_retries=2, backoff_max=8.0)
+    assert client.post(PATH, PAYLOAD).status_code == 503
+    assert server.request_count == 3
+    assert clock.sleeps == [3.0, 3.0]
+
+    server.retry_after = 60
+    clock.sleeps.clear()
+    client.post(PATH, PAYLOAD)
+    assert clock.sleeps == [8.0, 8.0]  # capped at backoff_max
+
+
+def test_backoff_without_retry_after_is_jittered_and_bounded(stub, clock):
+    server, base_url = stub
+    server.fail_rate = 1.0
+    client = LLMClient(base_url, max_retries=3, backoff_base=0.5, backoff_max=1.5)
+    client.post(PATH, PAYLOAD)
+    assert len(clock.sleeps) == 3
+    assert all(0 <= delay <= bound for delay, bound in zip(clock.sleeps, (0.5, 1.0, 1.5)))
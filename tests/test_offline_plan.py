@@ -0,0 +1,25 @@
+import pytest
+
+from nourishwell.data import FOOD_COL, get_catalog
+from nourishwell.offline_plan import assign_meals, build_offline_meal_plan
+
+
+@pytest.fixture(scope='module')
+def df():
+    return get_catalog().df
+
+
+def select(df, *names):
+    return df[df[FOOD_COL].isin(names)]
+
+
+def test_accent_only_selection_has_no_empty_with_line(df):
+    plan = build_offline_meal_plan(select(df, 'Turmeric', 'Ginger', 'Cinnamon'))
+    assert '**With:**' not in plan
+    assert '**Boost it with:**' in plan
+
+
+def test_every_food_is_placed_once(df):
+    meals, meal_accents, extras = assign_meals(df)
+    placed = [food['name'] for slot_foods in (*meals.values(), *meal_accents.values(), extras) for food in slot_foods]
+    assert sorted(placed) == sorted(df[FOOD_COL])
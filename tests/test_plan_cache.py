@@ -0,0 +1,57 @@
+import pytest
+
+from nourishwell import plan_cache
+from nourishwell.plan_cache import PlanCache, plan_fingerprint
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(plan_cache, 'time', clock)
+    return clock
+
+
+def test_least_recently_used_plan_is_evicted(tmp_path, clock):
+    cache = PlanCache(tmp_path / 'plans.sqlite3', max_entries=2, ttl_seconds=100)
+    cache.put('a', 'plan a')
+    clock.now += 1
+    cache.put('b', 'plan b')
+    clock.now += 1
+    assert cache.get('a') == 'plan a'  # now b is the least recently used
+    clock.now += 1
+    cache.put('c', 'plan c')
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == 'plan a' and cache.get('c') == 'plan c'
+
+
+def test_expired_plan_is_not_served(tmp_path, clock):
+    cache = PlanCache(tmp_path / 'plans.sqlite3', max_entries=10, ttl_seconds=100)
+    cache.put('a', 'plan a')
+    clock.now += 50
+    cache.put('b', 'plan b')
+    clock.now += 51
+    assert cache.get('a') is None  # reading it doesn't extend its life
+    assert cache.get('b') == 'plan b'
+    clock.now += 50
+    cache.put('c', 'plan c')  # writes sweep out everything past its TTL
+    assert len(cache) == 1
+
+
+def test_cache_is_shared_through_the_file(tmp_path):
+    PlanCache(tmp_path / 'plans.sqlite3').put('a', 'plan a')
+    assert PlanCache(tmp_path / 'plans.sqlite3').get('a') == 'plan a'
+
+
+def test_fingerprint_ignores_order_but_not_settings():
+    assert plan_fingerprint([3, 1, 2], model='m') == plan_fingerprint([2, 3, 1, 1], model='m')
+    assert plan_fingerprint([1, 2], model='m') != plan_fingerprint([1, 2], model='other')
+    assert plan_fingerprint([1, 2], model='m') != plan_fingerprint([1, 3], model='m')
@@ -0,0 +1,29 @@
+import os
+
+from nourishwell import profiling
+
+
+def test_prune_keeps_newest_and_ignores_other_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', tmp_path)
+    profiles = []
+    for n in range(3):
+        for suffix in ('.prof', '.txt'):
+            path = tmp_path / f'20240101-12000{n}-meal_plan_job-0042{suffix}'
+            path.write_text('')
+            os.utime(path, (n, n))
+            profiles.append(path.name)
+    others = ['notes-2024.md', 'keep-me.txt', '20240101-120000-x-0001.py']
+    for name in others:
+        (tmp_path / name).write_text('')
+
+    profiling.prune_profiles(keep=1)
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(others + profiles[-2:])
+
+
+def test_written_profiles_match_the_prune_pattern(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', tmp_path)
+    run = profiling.ProfileRun('Meal Plan (page)').start()
+    sum(range(1000))
+    run.stop()
+    assert run.paths
+    assert all(profiling.PROFILE_FILE_RE.fullmatch(path.name) for path in run.paths)
@@ -0,0 +1,53 @@
+import pytest
+
+from nourishwell import query
+from nourishwell.data import get_catalog
+from nourishwell.query import FoodQuery, ResultCache, compute_rows, query_rows
+
+# Searches as they are typed, one keystroke at a time
+TYPED = ['magnesium folate', 'omega-3 salmon', 'anti inflammatory', 'vitamin k2 kale']
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return get_catalog()
+
+
+@pytest.fixture
+def narrowed(monkeypatch):
+    # Counts the queries answered by narrowing a cached result
+    calls = []
+    narrow_by_terms = query.narrow_by_terms
+
+    def counting(*args):
+        calls.append(args)
+        return narrow_by_terms(*args)
+
+    monkeypatch.setattr(query, 'narrow_by_terms', counting)
+    return calls
+
+
+@pytest.mark.parametrize('sort', ['desc', 'asc', 'alpha_asc'])
+@pytest.mark.parametrize('filters', [{}, {'min_score': 8}, {'concerns': ['PCOS / Hormonal Balance']}])
+def test_narrowed_results_match_a_cold_query(catalog, narrowed, sort, filters):
+    cache = ResultCache()
+    for text in TYPED:
+        for end in range(1, len(text) + 1):
+            typed = FoodQuery.build(search=text[:end], sort=sort, **filters)
+            assert query_rows(catalog, typed, cache=cache).tolist() == compute_rows(catalog, typed).tolist(), text[:end]
+    assert narrowed  # the cache was actually used to narrow
+
+
+def test_relevance_is_never_narrowed(catalog, narrowed):
+    cache = ResultCache()
+    for end in range(1, len('magnesium folate') + 1):
+        typed = FoodQuery.build(search='magnesium folate'[:end], sort='relevance')
+        assert query_rows(catalog, typed, cache=cache).tolist() == compute_rows(catalog, typed).tolist()
+    assert not narrowed
+
+
+def test_cached_rows_are_read_only(catalog):
+    cache = ResultCache()
+    rows = query_rows(catalog, FoodQuery.build(search='salmon'), cache=cache)
+    assert not rows.flags.writeable
+    assert query_rows(catalog, FoodQuery.build(search='salmon'), cache=cache) is rows
@@ -0,0 +1,34 @@
+import pytest
+
+from nourishwell.data import FOOD_COL, get_catalog
+
+# Columns the original row-by-row search looked at
+BASELINE_COLUMNS = ('Food Item', 'Why Anti-Inflammatory', 'Key Vitamins & Minerals', 'Flags (Female Health Issues)')
+
+
+def baseline_search(df, query):
+    # The Food Discovery search before the inverted index: a case-insensitive substring scan
+    query = query.lower()
+    return {
+        row[FOOD_COL] for row in df.to_dict('records')
+        if any(query in str(row.get(col, '')).lower() for col in BASELINE_COLUMNS)
+    }
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return get_catalog()
+
+
+def indexed_search(catalog, query):
+    return set(catalog.df[FOOD_COL].to_numpy()[catalog.search_index.search(query)])
+
+
+@pytest.mark.parametrize('query', ['vitamin d', 'vitamin e', 'b12'])
+def test_short_last_term_matches_like_baseline(catalog, query):
+    assert indexed_search(catalog, query) == baseline_search(catalog.df, query)
+
+
+def test_last_term_matches_as_prefix(catalog):
+    assert indexed_search(catalog, 'salm') == {'Wild-caught Salmon'}
+    assert indexed_search(catalog, 'sa') == set()
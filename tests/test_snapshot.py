@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from nourishwell import snapshot
+from nourishwell.data import CATALOG_PATH
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    # Counts full CSV compiles; a load served from a snapshot doesn't add one
+    calls = []
+    build_catalog = snapshot.build_catalog
+
+    def counting_build(*args, **kwargs):
+        calls.append(args)
+        return build_catalog(*args, **kwargs)
+
+    monkeypatch.setattr(snapshot, 'build_catalog', counting_build)
+    return calls
+
+
+def test_second_load_comes_from_snapshot(tmp_path, builds):
+    first = snapshot.load_compiled_catalog(CATALOG_PATH, tmp_path)
+    second = snapshot.load_compiled_catalog(CATALOG_PATH, tmp_path)
+    assert len(builds) == 1
+    assert second.version == first.version
+    assert second.df.equals(first.df)
+    assert np.array_equal(second.similar_index.neighbors, first.similar_index.neighbors)
+
+
+def test_format_bump_replaces_stale_snapshot(tmp_path, builds, monkeypatch):
+    current = snapshot.SNAPSHOT_FORMAT
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_FORMAT', current - 1)
+    snapshot.load_compiled_catalog(CATALOG_PATH, tmp_path)
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_FORMAT', current)
+
+    snapshot.load_compiled_catalog(CATALOG_PATH, tmp_path)  # the old format is rejected and recompiled
+    before = len(builds)
+    catalog = snapshot.load_compiled_catalog(CATALOG_PATH, tmp_path)
+    assert len(builds) == before == 2
+    assert len(catalog) > 0
+    directories = [path.name for path in tmp_path.iterdir() if path.is_dir()]
+    assert directories == [snapshot.snapshot_name(snapshot.snapshot_key(CATALOG_PATH.resolve()), catalog.version)]
+
+
+def test_csv_change_recompiles(tmp_path, builds):
+    source = tmp_path / 'foods.csv'
+    source.write_bytes(CATALOG_PATH.read_bytes())
+    snapshot.load_compiled_catalog(source, tmp_path / 'snapshots')
+    source.write_bytes(CATALOG_PATH.read_bytes().replace(b'Turmeric', b'Turmerik'))
+    catalog = snapshot.load_compiled_catalog(source, tmp_path / 'snapshots')
+    assert len(builds) == 2
+    assert 'Turmerik' in catalog.df['Food Item'].tolist()
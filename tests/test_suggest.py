@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from nourishwell.data import CATEGORY_COL, FOOD_ID_COL, SCORE_COL, get_catalog
+from nourishwell.nutrients import nutrient_coverage
+from nourishwell.suggest import CATEGORY_POINTS, SCORE_POINTS, PlanCoverage, plan_coverage, suggestion_model
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return get_catalog()
+
+
+@pytest.fixture(scope='module')
+def model(catalog):
+    return suggestion_model(catalog)
+
+
+def recomputed_gains(catalog, model, plan_rows):
+    # Every food's gain worked out from scratch from the plan's rows, one food at a time
+    df = catalog.df
+    features = model.feature_matrix.astype(bool)
+    covered = features[plan_rows].any(axis=0)
+    categories = df[CATEGORY_COL].astype(object).tolist()
+    gains = np.empty(len(df))
+    for row in range(len(df)):
+        if row in plan_rows:
+            gains[row] = -np.inf
+            continue
+        gain = model.feature_points[features[row] & ~covered].sum()
+        gain += SCORE_POINTS * min(max(float(df[SCORE_COL].iloc[row]), 0), 10) / 10
+        if isinstance(categories[row], str):
+            gain += CATEGORY_POINTS / (1 + sum(categories[other] == categories[row] for other in plan_rows))
+        gains[row] = gain
+    return gains
+
+
+def test_adds_and_removes_match_a_full_recompute(catalog, model):
+    ids = catalog.df[FOOD_ID_COL].tolist()
+    rng = np.random.default_rng(7)
+    coverage = PlanCoverage(model)
+    plan = []
+    for _ in range(60):
+        food_id = ids[rng.integers(len(ids))]
+        if food_id in plan:
+            plan.remove(food_id)
+            coverage.remove(food_id)
+        else:
+            plan.append(food_id)
+            coverage.add(food_id)
+        plan_rows = [catalog.id_rows[food_id] for food_id in plan]
+
+        fresh = PlanCoverage(model)
+        fresh.sync(plan)
+        assert np.array_equal(coverage.feature_counts, fresh.feature_counts)
+        assert np.array_equal(coverage.category_counts, fresh.category_counts)
+        assert coverage.nutrient_counts() == nutrient_coverage(catalog.nutrient_index, plan_rows)
+        assert np.allclose(coverage.gains(), recomputed_gains(catalog, model, plan_rows), rtol=0, atol=1e-4)
+        assert coverage.suggest(5).tolist() == fresh.suggest(5).tolist()
+
+
+def test_suggestions_are_the_best_foods_not_in_the_plan(catalog, model):
+    coverage = PlanCoverage(model)
+    plan = catalog.df[FOOD_ID_COL].tolist()[:3]
+    coverage.sync(plan)
+    gains = recomputed_gains(catalog, model, [catalog.id_rows[food_id] for food_id in plan])
+    top = coverage.suggest(5)
+    assert len(top) == 5 and not {catalog.id_rows[food_id] for food_id in plan} & set(top.tolist())
+    assert gains[top].min() >= np.sort(gains)[-5] - 1e-4
+
+
+def test_session_coverage_follows_the_plan(catalog):
+    ids = catalog.df[FOOD_ID_COL].tolist()
+    state = {'selected_foods_for_plan': dict.fromkeys(ids[:4])}
+    coverage = plan_coverage(state, catalog)
+    assert coverage.food_rows.keys() == set(ids[:4])
+    state['selected_foods_for_plan'] = dict.fromkeys(ids[2:6])
+    assert plan_coverage(state, catalog) is coverage
+    assert coverage.food_rows.keys() == set(ids[2:6])